@@ -0,0 +1,44 @@
+"""
+可选的Numba JIT支持
+设置环境变量 TESTSTAND_JIT=1 且已安装numba时，用 numba.njit(cache=True) 编译纯数值测试函数；
+否则原样返回函数。只适合在大量参数扫描中被反复调用的函数，单次调用的编译开销远大于收益。
+"""
+import functools
+import os
+
+HAVE_NUMBA = False
+if os.environ.get("TESTSTAND_JIT") == "1":
+    try:
+        from numba import njit as _njit
+        HAVE_NUMBA = True
+    except ImportError:  # numba为可选依赖
+        pass
+
+
+def jit(func):
+    """按需JIT编译纯数值函数
+    
+    返回的包装函数保留原函数的名称、文档和签名（含类型注解），
+    以便TestLoader和参数编辑器照常解析参数。
+    
+    无论是否启用JIT，都会给函数加上 _teststand_jit 标记，声明其为纯数值函数，
+    引擎据此允许相关 for 块走合并快速路径（TESTSTAND_FUSE=1）。
+    
+    Args:
+        func: 纯数值函数
+        
+    Returns:
+        编译后的包装函数，未启用JIT时返回原函数
+    """
+    if not HAVE_NUMBA:
+        func._teststand_jit = True
+        return func
+    
+    compiled = _njit(cache=True)(func)
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return compiled(*args, **kwargs)
+    
+    wrapper._teststand_jit = True
+    return wrapper
@@ -1,3 +1,13 @@
+import functools
+
+import _fast
+
+# 纯函数，序列中重复出现的参数组合直接命中缓存；设置 TESTSTAND_JIT=1 时由numba编译
+# 注意：保留具名的返回变量，TestLoader据此预测步骤的输出名（如 ${#N:sum}）
+
+
+@functools.lru_cache(maxsize=1024)
+@_fast.jit
 def test_add(a: int, b: int) -> int:
     """测试加法函数
     
@@ -12,6 +22,8 @@ def test_add(a: int, b: int) -> int:
 
     return sum 
 
+@functools.lru_cache(maxsize=1024)
+@_fast.jit
 def test_subtract(a: int, b: int) -> int:
     """测试减法函数
     
@@ -25,6 +37,8 @@ def test_subtract(a: int, b: int) -> int:
     sub = a-b
     return sub
 
+@functools.lru_cache(maxsize=1024)
+@_fast.jit
 def test_multiply(a: int, b: int) -> int:
     """测试乘法函数
     
@@ -38,6 +52,8 @@ def test_multiply(a: int, b: int) -> int:
     mul = a * b
     return mul
 
+@functools.lru_cache(maxsize=1024)
+@_fast.jit
 def test_divide(a: int, b: int) -> int:
     """测试除法函数
     
@@ -1,3 +1,6 @@
+import _fast
+
+
 def test_string(str1: str = "", str2: str = "") -> bool:
     """测试字符串连接
     
@@ -13,6 +16,7 @@ def test_string(str1: str = "", str2: str = "") -> bool:
     
     return False
 
+@_fast.jit
 def test_in_range(num: int = 0, start: int = 0, end: int = 10) -> bool:
     """测试数字范围
     
@@ -25,6 +29,7 @@ def test_in_range(num: int = 0, start: int = 0, end: int = 10) -> bool:
         bool: 是否在范围内
     """
     return start <= num <= end
+@_fast.jit
 def test_boolean_logic(a: bool = True, b: bool = False) -> bool:
     """测试布尔逻辑运算
     
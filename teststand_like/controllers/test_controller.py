@@ -2,12 +2,71 @@
 测试控制器
 协调UI和测试引擎之间的交互
 """
-import json
 import os
+import time
+from typing import Optional
 from PyQt6.QtWidgets import QApplication, QFileDialog
 from PyQt6.QtGui import QIcon, QPixmap, QPainter, QColor
-from PyQt6.QtCore import Qt, QTimer
-from core import TestLoader, TestEngine, ConfigManager
+from PyQt6.QtCore import Qt, QTimer, QObject, QEvent
+from core import TestLoader, TestEngine, ConfigManager, json_utils
+
+
+# PASS/FAIL状态图标，首次使用时创建，所有控制器实例共享
+_ICON_PASS = None
+_ICON_FAIL = None
+
+
+def _make_status_icon(color_name):
+    """绘制一个圆形状态图标
+    
+    Args:
+        color_name: 图标颜色
+    
+    Returns:
+        QIcon: 状态图标
+    """
+    size = 16
+    pix = QPixmap(size, size)
+    try:
+        pix.fill(Qt.GlobalColor.transparent)
+    except Exception:
+        pix.fill(QColor(0, 0, 0, 0))
+    p = QPainter(pix)
+    p.setRenderHint(QPainter.RenderHint.Antialiasing)
+    col = QColor(color_name)
+    p.setBrush(col)
+    p.setPen(QColor(0, 0, 0, 0))
+    p.drawEllipse(1, 1, size-3, size-3)
+    p.end()
+    return QIcon(pix)
+
+
+def _get_status_icons():
+    """获取共享的PASS/FAIL状态图标
+    
+    Returns:
+        tuple: (pass图标, fail图标)
+    """
+    global _ICON_PASS, _ICON_FAIL
+    if _ICON_PASS is None:
+        _ICON_PASS = _make_status_icon('#2ecc71')  # 绿色
+        _ICON_FAIL = _make_status_icon('#e74c3c')  # 红色
+    return _ICON_PASS, _ICON_FAIL
+
+
+class _ListShownFilter(QObject):
+    """事件过滤器：序列列表重新显示或窗口从最小化恢复时调用回调"""
+    
+    def __init__(self, callback, parent=None):
+        super().__init__(parent)
+        self._callback = callback
+    
+    def eventFilter(self, obj, event):
+        etype = event.type()
+        if etype == QEvent.Type.Show or (
+                etype == QEvent.Type.WindowStateChange and not obj.isMinimized()):
+            self._callback()
+        return False
 
 
 class TestController:
@@ -16,6 +75,9 @@ class TestController:
     协调UI组件和测试引擎，处理用户交互并更新界面显示
     """
     
+    # 引擎回调刷新到界面的最小间隔（秒）
+    FLUSH_INTERVAL = 0.03
+    
     def __init__(self):
         self.test_loader = TestLoader()
         self.test_engine = TestEngine(self.test_loader)
@@ -32,27 +94,41 @@ class TestController:
         self.icon_pass = None
         self.icon_fail = None
         self._init_status_icons()
+        
+        # 引擎回调缓冲：输出消息合并追加，监视器只保留最新状态
+        self._out_buf = []
+        self._watch_latest = None
+        self._last_flush = 0.0
+        self._flush_timer = QTimer()
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(int(self.FLUSH_INTERVAL * 1000))
+        self._flush_timer.timeout.connect(self._flush_ui)
+        
+        # 配置保存去抖：连续的保存请求合并为一次写盘
+        self._config_save_timer = QTimer()
+        self._config_save_timer.setSingleShot(True)
+        self._config_save_timer.setInterval(500)
+        self._config_save_timer.timeout.connect(self.config_manager.flush_save)
+        
+        # 步骤列表快照缓存（序列变化时失效）
+        self._steps_cache = None
+        
+        # 序列行显示标签缓存（不含执行标记）及当前标记的行
+        self._row_labels = None
+        self._marked_index = None
+        
+        # 界面不可见时暂存的状态图标 {step_index: success} 和执行标记 (index,)
+        self._pending_status = {}
+        self._pending_mark = None
+        
+        # 监视器数据是否有变化（序列、参数或步骤输出改动时置位），定时器只在置位时刷新
+        self.watcher_dirty = True
+        # 监视器数据版本号，每次置位时递增；监视器据此跳过数据未变化的重复刷新
+        self._watch_version = 0
     
     def _init_status_icons(self):
-        """创建PASS/FAIL状态图标"""
-        def make_icon(color_name):
-            size = 16
-            pix = QPixmap(size, size)
-            try:
-                pix.fill(Qt.GlobalColor.transparent)
-            except Exception:
-                pix.fill(QColor(0, 0, 0, 0))
-            p = QPainter(pix)
-            p.setRenderHint(QPainter.RenderHint.Antialiasing)
-            col = QColor(color_name)
-            p.setBrush(col)
-            p.setPen(QColor(0, 0, 0, 0))
-            p.drawEllipse(1, 1, size-3, size-3)
-            p.end()
-            return QIcon(pix)
-        
-        self.icon_pass = make_icon('#2ecc71')  # 绿色
-        self.icon_fail = make_icon('#e74c3c')  # 红色
+        """获取PASS/FAIL状态图标"""
+        self.icon_pass, self.icon_fail = _get_status_icons()
     
     def set_ui_components(self, function_tree, sequence_list, param_editor, 
                          watcher_widget, output_text):
@@ -71,13 +147,21 @@ class TestController:
         self.watcher_widget = watcher_widget
         self.output_text = output_text
         
+        # 列表重新可见时补上暂存的状态图标和执行标记
+        if self.sequence_list:
+            self._list_shown_filter = _ListShownFilter(self._on_sequence_list_shown, self.sequence_list)
+            self.sequence_list.installEventFilter(self._list_shown_filter)
+            window = self.sequence_list.window()
+            if window is not self.sequence_list:
+                window.installEventFilter(self._list_shown_filter)
+        
         # 设置参数编辑器的测试加载器
         if self.param_editor:
             self.param_editor.set_test_loader(self.test_loader)
+            self.param_editor.paramChanged.connect(self._mark_watcher_dirty)
         
         # 初始化监视器
-        if self.watcher_widget:
-            self.watcher_widget.update_watcher({})
+        self._schedule_watcher_update({})
         
         # 设置引擎回调
         self.test_engine.set_callbacks(
@@ -88,24 +172,71 @@ class TestController:
         
         # 连接序列列表的信号
         if self.sequence_list:
+            # 列表模型的任何增删移动都会使步骤缓存失效
+            model = self.sequence_list.model()
+            model.rowsInserted.connect(self._invalidate_steps)
+            model.rowsRemoved.connect(self._invalidate_steps)
+            model.rowsMoved.connect(self._invalidate_steps)
+            model.modelReset.connect(self._invalidate_steps)
             self.sequence_list.itemMoved.connect(self._on_sequence_changed)
-            self.sequence_list.currentItemChanged.connect(self._on_item_selection_changed_wrapper)
+            self.sequence_list.currentStepChanged.connect(self._on_current_step_changed)
             # 连接itemMoved信号到更新显示的方法
             self.sequence_list.itemMoved.connect(self._update_sequence_display)
     
-    def load_test_functions(self, directory=None):
+    def _steps(self):
+        """获取序列中的所有步骤对象（带缓存）
+        
+        返回不可变的元组快照，可直接共享给引擎和各个控件而无需复制。
+        
+        Returns:
+            tuple: 步骤对象元组
+        """
+        if self._steps_cache is None:
+            self._steps_cache = tuple(self.sequence_list.get_all_steps()) if self.sequence_list else ()
+        return self._steps_cache
+    
+    def _broadcast_steps(self):
+        """将同一份步骤快照分发给参数编辑器和监视器"""
+        steps = self._steps()
+        if self.param_editor:
+            self.param_editor.set_all_steps(steps)
+        if self.watcher_widget:
+            self.watcher_widget.set_all_steps(steps)
+    
+    def _invalidate_steps(self, *args):
+        """使步骤缓存失效"""
+        self._steps_cache = None
+        self._row_labels = None
+        self._mark_watcher_dirty()
+        # 序列已变化，暂存的状态图标对应的行不再有效
+        self._pending_status.clear()
+    
+    def _mark_watcher_dirty(self, *args):
+        """标记监视器数据已变化，下一次定时刷新时重建显示"""
+        self.watcher_dirty = True
+        self._watch_version += 1
+    
+    def _commit_param_edits(self):
+        """把参数编辑器中尚未提交的输入写回步骤（运行或保存前调用）"""
+        if self.param_editor:
+            self.param_editor.flush_pending_params()
+    
+    def load_test_functions(self, directory: Optional[str] = None):
         """加载测试函数
         
         Args:
-            directory: 测试函数所在目录，None表示使用默认值'Testcase'
+            directory: 测试函数所在目录，None表示使用配置中的test_directory
         """
-        if directory is None or isinstance(directory, bool):
+        if directory is None:
             directory = self.config_manager.get("test_directory", "Testcase")
         self.test_loader.load_from_directory(directory)
         
         # 更新函数树
         if self.function_tree:
             self.function_tree.populate_from_loader(self.test_loader)
+        # 预测的返回值名称可能已变化
+        if self.param_editor:
+            self.param_editor.invalidate_references()
         
         self._output("测试函数已加载")
         
@@ -114,7 +245,8 @@ class TestController:
     
     def run_sequence(self):
         """运行整个测试序列"""
-        steps = self.sequence_list.get_all_steps() if self.sequence_list else []
+        self._commit_param_edits()
+        steps = self._steps()
         if not steps:
             self._output("序列为空，无法执行")
             return
@@ -124,19 +256,26 @@ class TestController:
         
         self.test_engine.set_steps(steps)
         self.test_engine.run_all()
+        self._flush_ui()
+        if self.param_editor:
+            self.param_editor.invalidate_references()
         
         # 运行结束后更新显示
         self._update_sequence_display()
     
     def step_run(self):
         """单步执行"""
-        steps = self.sequence_list.get_all_steps() if self.sequence_list else []
+        self._commit_param_edits()
+        steps = self._steps()
         if not steps:
             self._output("序列为空，无法执行")
             return
         
         self.test_engine.set_steps(steps)
         self.test_engine.step_run()
+        self._flush_ui()
+        if self.param_editor:
+            self.param_editor.invalidate_references()
         
         # 更新执行标记和显示
         exec_index = self.test_engine.get_execution_index()
@@ -144,16 +283,16 @@ class TestController:
     
     def clear_sequence(self):
         """清空测试序列"""
+        self._invalidate_steps()
         if self.sequence_list:
             self.sequence_list.clear_all_steps()
         
         if self.param_editor:
             self.param_editor.clear_params()
         
-        if self.watcher_widget:
-            # 确保清除监视器显示
-            self.watcher_widget.set_all_steps([])
-            self.watcher_widget.update_watcher({})
+        # 确保清除监视器显示
+        self._broadcast_steps()
+        self._schedule_watcher_update({})
         
         if self.output_text:
             self.output_text.clear()
@@ -166,9 +305,13 @@ class TestController:
     
     def reset_execution(self):
         """重置执行状态"""
-        steps = self.sequence_list.get_all_steps() if self.sequence_list else []
+        steps = self._steps()
         self.test_engine.set_steps(steps)
         self.test_engine.reset_execution()
+        self._mark_watcher_dirty()
+        if self.param_editor:
+            self.param_editor.invalidate_references()
+        self._flush_ui()
         
         # 清除状态图标
         self._clear_all_status_icons()
@@ -177,8 +320,7 @@ class TestController:
         self._mark_execution_index(0)
         
         # 更新监视器显示
-        if self.watcher_widget:
-            self.watcher_widget.update_watcher({})
+        self._schedule_watcher_update({})
             
         # 更新序列显示（包含缩进）
         self._update_sequence_display()
@@ -192,8 +334,9 @@ class TestController:
         if not self.sequence_list:
             self._output("序列列表未初始化")
             return False
-            
-        steps = self.sequence_list.get_all_steps()
+        
+        self._commit_param_edits()
+        steps = self._steps()
         if not steps:
             self._output("序列为空，无需保存")
             return False
@@ -222,12 +365,12 @@ class TestController:
                 sequence_data.append(step_data)
             
             # 保存到文件
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(sequence_data, f, ensure_ascii=False, indent=2)
+            with open(file_path, 'wb') as f:
+                f.write(json_utils.dumps(sequence_data))
             
             # 更新配置中的最后序列文件路径
             self.config_manager.set_last_sequence_file(file_path)
-            self.config_manager.save_config()
+            self._request_config_save()
             
             self._output(f"测试序列已保存到: {file_path}")
             return True
@@ -241,6 +384,8 @@ class TestController:
         Args:
             file_path: 加载文件路径，如果为None则弹出文件选择对话框
         """
+        from core.step_model import StepObject
+        
         # 如果没有提供文件路径，则弹出文件选择对话框
         if not file_path:
             file_path, _ = QFileDialog.getOpenFileName(
@@ -255,13 +400,14 @@ class TestController:
             
         try:
             # 从文件读取数据
-            with open(file_path, 'r', encoding='utf-8') as f:
-                sequence_data = json.load(f)
+            with open(file_path, 'rb') as f:
+                sequence_data = json_utils.loads(f.read())
             
             # 清空当前序列
             self.clear_sequence()
             
-            # 反序列化步骤并添加到列表
+            # 反序列化步骤，先构建全部步骤对象
+            steps = []
             for step_data in sequence_data:
                 # 创建步骤对象
                 step = StepObject(
@@ -275,60 +421,94 @@ class TestController:
                 step.params = step_data.get('params', {})
                 step.outputs = step_data.get('outputs', {})
                 step.id = step_data.get('id', step.id)  # 尽可能保持原有ID
-                
-                # 创建列表项
-                if step.type == 'function':
-                    display_text = f"{step.module}.{step.function}"
-                else:
-                    display_text = step.control
-                
-                from PyQt6.QtWidgets import QListWidgetItem
-                item = QListWidgetItem(display_text)
-                item.setData(Qt.ItemDataRole.UserRole, step)
-                item.setData(Qt.ItemDataRole.UserRole + 1, step.id)
-                
-                # 添加到序列列表
-                self.sequence_list.addItem(item)
+                steps.append(step)
+            
+            # 批量添加到序列列表：一次插入全部列表项，
+            # 结束时发出的 itemMoved 触发序列变更处理和显示更新（包括缩进）
+            self.sequence_list.add_steps_bulk(steps)
             
             # 更新配置中的最后序列文件路径
             self.config_manager.set_last_sequence_file(file_path)
-            self.config_manager.save_config()
+            self._request_config_save()
             
             self._output(f"测试序列已从 {file_path} 加载")
-            self._on_sequence_changed()  # 触发序列变更处理
-            self._update_sequence_display()  # 确保更新显示（包括缩进）
             return True
         except Exception as e:
             self._output(f"加载序列失败: {str(e)}")
             return False
     
+    def _request_config_save(self):
+        """请求保存配置（500ms内的多次请求只写盘一次）"""
+        self.config_manager.request_save()
+        self._config_save_timer.start()
+    
     def _on_sequence_changed(self):
         """序列改变时的处理"""
+        self._invalidate_steps()
         # 更新参数编辑器和监视器的步骤引用
-        steps = self.sequence_list.get_all_steps() if self.sequence_list else []
-        
-        if self.param_editor:
-            self.param_editor.set_all_steps(steps)
-        
-        if self.watcher_widget:
-            self.watcher_widget.set_all_steps(steps)
-            # 重要：更新监视器显示，而不仅仅是在清空时更新
-            self.watcher_widget.update_watcher({})
+        self._broadcast_steps()
+        # 重要：更新监视器显示，而不仅仅是在清空时更新
+        self._schedule_watcher_update({})
         
         # 更新输出显示
         self._update_sequence_display()
     
     def _on_engine_watcher_update(self, runtime_vars: dict):
-        """引擎监视器更新回调"""
+        """引擎监视器更新回调（只保留最新状态，等待合并刷新）"""
+        # 引擎写入了步骤输出：引用菜单条目随之变化
+        if self.param_editor:
+            self.param_editor.invalidate_references()
         if self.watcher_widget:
-            self.watcher_widget.update_watcher(runtime_vars)
-            QApplication.processEvents()
+            self._watch_latest = runtime_vars
+            self._mark_watcher_dirty()
+            self._request_flush()
     
     def _on_engine_output(self, message: str):
-        """引擎输出回调"""
+        """引擎输出回调（先写入缓冲，等待合并刷新）"""
         if self.output_text:
-            self.output_text.append(message)
+            self._out_buf.append(message)
+            self._request_flush()
+    
+    def _request_flush(self):
+        """请求刷新界面
+        
+        距上次刷新已超过FLUSH_INTERVAL时立即刷新并处理一次事件循环，
+        否则启动单次定时器，由定时器负责刷新剩余的缓冲内容。
+        """
+        if time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+            self._flush_ui()
             QApplication.processEvents()
+        elif not self._flush_timer.isActive():
+            self._flush_timer.start()
+    
+    def _schedule_watcher_update(self, runtime_vars: dict):
+        """标记监视器需要刷新，由下一次_flush_ui统一重建
+        
+        同一刷新周期内的多次请求只保留最后一次的runtime_vars。
+        """
+        if not self.watcher_widget:
+            return
+        self._watch_latest = runtime_vars
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+    
+    def _flush_ui(self):
+        """将缓冲的输出消息和最新的监视器状态一次性写入界面"""
+        self._flush_timer.stop()
+        self._last_flush = time.monotonic()
+        
+        if self._out_buf:
+            if self.output_text:
+                self.output_text.append("\n".join(self._out_buf))
+            self._out_buf.clear()
+        
+        if self._watch_latest is not None:
+            if self.watcher_widget:
+                self.watcher_widget.update_watcher(self._watch_latest, self._watch_version)
+            self._watch_latest = None
+        
+        if self.sequence_list:
+            self._on_sequence_list_shown()
     
     def _on_engine_status_update(self, step_index: int, success: bool):
         """引擎状态更新回调"""
@@ -338,45 +518,62 @@ class TestController:
         if step_index >= self.sequence_list.count():
             return
         
-        item = self.sequence_list.item(step_index)
-        if item:
-            icon = self.icon_pass if success else self.icon_fail
-            item.setIcon(icon)
-            QApplication.processEvents()
-    
-    def _on_item_selection_changed_wrapper(self):
-        """序列项选择改变时的处理包装器（用于itemSelectionChanged信号）"""
-        if not self.sequence_list:
-            return
-            
-        current = self.sequence_list.currentItem()
-        # 注意：这里我们没有previous项的引用，所以传递None
-        self._on_item_selection_changed(current, None)
-    
-    def _on_item_selection_changed(self, current, previous):
-        """序列项选择改变时的处理"""
-        if not current or not self.param_editor:
-            if self.param_editor:
-                self.param_editor.clear_params()
+        # 界面不可见时暂存状态，待重新可见后统一设置
+        if self._list_hidden():
+            self._pending_status[step_index] = success
             return
         
-        # 获取步骤对象和索引
-        step = current.data(Qt.ItemDataRole.UserRole)
-        index = self.sequence_list.row(current) if self.sequence_list else -1
+        self._set_item_status(step_index, success)
+        self._request_flush()
+    
+    def _set_item_status(self, step_index: int, success: bool):
+        """设置序列项的状态图标（图标未变化时跳过）"""
+        self.sequence_list.set_status_icon(step_index, self.icon_pass if success else self.icon_fail)
+    
+    def _list_hidden(self):
+        """序列列表当前是否看不到（自身隐藏或所在窗口最小化）"""
+        return not self.sequence_list.isVisible() or self.sequence_list.window().isMinimized()
+    
+    def _on_sequence_list_shown(self):
+        """补上暂存的更新（列表仍看不到时继续暂存）"""
+        if (self._pending_status or self._pending_mark is not None) and not self._list_hidden():
+            self._apply_pending_list_updates()
+    
+    def _apply_pending_list_updates(self):
+        """补上界面不可见期间暂存的状态图标和执行标记"""
+        count = self.sequence_list.count()
+        for step_index, success in self._pending_status.items():
+            if step_index < count:
+                self._set_item_status(step_index, success)
+        self._pending_status.clear()
+        
+        if self._pending_mark is not None:
+            index = self._pending_mark[0]
+            self._pending_mark = None
+            self._mark_execution_index(index)
+    
+    def _on_current_step_changed(self, index: int):
+        """序列当前项改变时的处理
+        
+        Args:
+            index: 当前项的行号，-1表示没有当前项
+        """
+        if not self.param_editor:
+            return
         
-        # 验证步骤对象的有效性
-        if not step:
+        # 获取步骤对象
+        steps = self._steps()
+        if not 0 <= index < len(steps):
             self.param_editor.clear_params()
             return
+        step = steps[index]
             
         # 确保参数编辑器的test_loader已设置
         if not self.param_editor.test_loader and self.test_loader:
             self.param_editor.set_test_loader(self.test_loader)
             
         # 确保参数编辑器有所有步骤的引用
-        if self.param_editor and self.sequence_list:
-            steps = self.sequence_list.get_all_steps()
-            self.param_editor.set_all_steps(steps)
+        self.param_editor.set_all_steps(steps)
         
         # 加载到参数编辑器
         self.param_editor.load_step(step, index)
@@ -387,26 +584,57 @@ class TestController:
     def update_watcher_display(self):
         """主动更新监视器显示"""
         if self.watcher_widget:
-            steps = self.sequence_list.get_all_steps() if self.sequence_list else []
+            steps = self._steps()
             self.watcher_widget.set_all_steps(steps)
-            self.watcher_widget.update_watcher({})
+            self._schedule_watcher_update({})
+        self.watcher_dirty = False
+    
+    def refresh_watcher_if_dirty(self):
+        """监视器数据有变化时才刷新显示（供主窗口定时器调用）"""
+        if self.watcher_dirty:
+            self.update_watcher_display()
     
     def _output(self, message: str):
         """输出消息到输出框"""
         if self.output_text:
+            # 先刷新引擎缓冲，保证消息顺序
+            if self._out_buf:
+                self._flush_ui()
             self.output_text.append(message)
     
     def _mark_execution_index(self, index):
         """标记当前执行索引
         
+        只更新上一次标记的行和新标记的行；显示标签未就绪时回退到全量刷新。
+        
         Args:
             index: 要标记的索引，None表示清除所有标记
         """
         if not self.sequence_list:
             return
         
-        # 更新所有项的显示（包括缩进）
-        self._update_sequence_display(index)
+        # 界面不可见时只记录标记位置，待重新可见后补上
+        if self._list_hidden():
+            self._pending_mark = (index,)
+            return
+        self._pending_mark = None
+        
+        labels = self._row_labels
+        count = self.sequence_list.count()
+        if labels is None or len(labels) != count:
+            # 更新所有项的显示（包括缩进）
+            self._update_sequence_display(index)
+            return
+        
+        for i in (self._marked_index, index):
+            if i is None or i < 0 or i >= count:
+                continue
+            display = labels[i]
+            if i == index:
+                display = f"{display}  <-"
+            self.sequence_list.update_item_display(i, display)
+        
+        self._marked_index = index
     
     def _update_sequence_display(self, highlight_index=None):
         """更新序列显示，包括缩进和高亮标记
@@ -417,33 +645,34 @@ class TestController:
         if not self.sequence_list:
             return
         
-        steps = self.sequence_list.get_all_steps()
+        steps = self._steps()
         
         # 如果没有步骤，直接返回
         if not steps:
+            self._row_labels = None
+            self._marked_index = None
             return
             
         # 计算每个步骤的缩进级别
         indent_levels = self._calculate_indent_levels(steps)
         
-        for i in range(self.sequence_list.count()):
-            item = self.sequence_list.item(i)
-            if i < len(steps):
-                step = steps[i]
-                # 构建基础标签
-                if step.type == 'function':
-                    base = f"{step.module}.{step.function}"
-                else:
-                    base = step.control
-                
-                # 应用缩进
-                indent = "    " * indent_levels[i]  # 每级缩进2个空格
-                
-                display = f"{i+1}. {indent}{base}"
-                if highlight_index is not None and i == highlight_index:
-                    display = f"{display}  <-"
-                
-                item.setText(display)
+        labels = []
+        for i, step in enumerate(steps):
+            # 应用缩进
+            indent = "    " * indent_levels[i]  # 每级缩进2个空格
+            labels.append(f"{i+1}. {indent}{step.display_label}")
+        
+        displays = labels
+        if highlight_index is not None and 0 <= highlight_index < len(labels):
+            displays = list(labels)
+            displays[highlight_index] = f"{labels[highlight_index]}  <-"
+        # 一次写入所有行的显示文本，模型只通知有变化的行
+        self.sequence_list.set_all_displays(displays)
+        
+        # 缓存不含标记的显示标签，供_mark_execution_index增量更新
+        self._row_labels = labels
+        self._marked_index = highlight_index
+        self._pending_mark = None
     
     def _calculate_indent_levels(self, steps):
         """计算每个步骤的缩进级别
@@ -481,13 +710,8 @@ class TestController:
     
     def _clear_all_status_icons(self):
         """清除所有状态图标"""
+        self._pending_status.clear()
         if not self.sequence_list:
             return
         
-        for i in range(self.sequence_list.count()):
-            item = self.sequence_list.item(i)
-            if item:
-                item.setIcon(QIcon())
-
-# 导入StepObject以确保在load_sequence中可用
-from core.step_model import StepObject
\ No newline at end of file
+        self.sequence_list.clear_status_icons()
@@ -2,9 +2,9 @@
 配置管理器
 负责管理测试序列运行器的配置文件
 """
-import json
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+from . import json_utils
 
 
 class ConfigManager:
@@ -34,6 +34,8 @@ class ConfigManager:
                 "sequence_watcher": [600, 400]
             }
         }
+        self._path_cache: Dict[str, Tuple[str, ...]] = {}  # 键名 -> 拆分后的路径
+        self._dirty = False  # 是否有尚未写盘的修改
         self.load_config()
     
     def load_config(self) -> bool:
@@ -44,30 +46,65 @@ class ConfigManager:
         """
         try:
             if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    loaded_config = json.load(f)
-                    # 合并默认配置和加载的配置
-                    self.config.update(loaded_config)
+                with open(self.config_file, 'rb') as f:
+                    loaded_config = json_utils.loads(f.read())
+                    # 合并默认配置和加载的配置（嵌套字典逐层合并，保留缺失的默认项）
+                    self._deep_update(self.config, loaded_config)
                 return True
             return False
         except Exception as e:
             print(f"加载配置文件失败: {e}")
             return False
     
+    def _deep_update(self, base: Dict[str, Any], override: Dict[str, Any]) -> None:
+        """将override递归合并到base中
+        
+        Args:
+            base: 被合并的字典（原地修改）
+            override: 覆盖值
+        """
+        for k, v in override.items():
+            if isinstance(v, dict) and isinstance(base.get(k), dict):
+                self._deep_update(base[k], v)
+            else:
+                base[k] = v
+    
     def save_config(self) -> bool:
         """保存配置到文件
         
+        先写入临时文件再原子替换，避免写入中断导致配置文件损坏。
+        
         Returns:
             bool: 保存成功返回True，否则返回False
         """
+        tmp_file = self.config_file + ".tmp"
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
+            with open(tmp_file, 'wb') as f:
+                f.write(json_utils.dumps(self.config))
+            os.replace(tmp_file, self.config_file)
+            self._dirty = False
             return True
         except Exception as e:
             print(f"保存配置文件失败: {e}")
             return False
     
+    def request_save(self) -> None:
+        """标记配置需要保存
+        
+        实际写盘由调用方择机调用flush_save()完成，便于合并连续的保存请求。
+        """
+        self._dirty = True
+    
+    def flush_save(self) -> bool:
+        """如果有尚未写盘的修改则立即保存
+        
+        Returns:
+            bool: 无需保存或保存成功返回True，否则返回False
+        """
+        if not self._dirty:
+            return True
+        return self.save_config()
+    
     def get(self, key: str, default: Any = None) -> Any:
         """获取配置项的值
         
@@ -78,7 +115,7 @@ class ConfigManager:
         Returns:
             配置项的值或默认值
         """
-        keys = key.split('.')
+        keys = self._split_key(key)
         value = self.config
         
         try:
@@ -95,7 +132,7 @@ class ConfigManager:
             key: 配置项键名（支持点号分隔的嵌套键，如"window_geometry.width"）
             value: 要设置的值
         """
-        keys = key.split('.')
+        keys = self._split_key(key)
         config = self.config
         
         # 遍历到倒数第二个键，创建缺失的嵌套字典
@@ -107,6 +144,21 @@ class ConfigManager:
         # 设置最后一个键的值
         config[keys[-1]] = value
     
+    def _split_key(self, key: str) -> Tuple[str, ...]:
+        """将点号分隔的键名拆分为路径（结果按键名缓存）
+        
+        Args:
+            key: 配置项键名
+            
+        Returns:
+            tuple: 各级键名
+        """
+        keys = self._path_cache.get(key)
+        if keys is None:
+            keys = tuple(key.split('.'))
+            self._path_cache[key] = keys
+        return keys
+    
     def update_window_geometry(self, x: int, y: int, width: int, height: int) -> None:
         """更新窗口几何信息
         
@@ -0,0 +1,44 @@
+"""
+JSON读写工具
+安装了orjson时使用orjson加速序列化，否则回退到标准库json
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """将对象序列化为缩进2格的UTF-8 JSON字节串
+    
+    orjson无法处理的对象（如超出64位的整数）会回退到标准库json。
+    
+    Args:
+        obj: 要序列化的对象
+        
+    Returns:
+        bytes: JSON字节串
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def loads(data: bytes) -> Any:
+    """解析JSON字节串
+    
+    Args:
+        data: JSON字节串
+        
+    Returns:
+        解析得到的对象
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
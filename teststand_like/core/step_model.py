@@ -10,8 +10,14 @@ Description: 这是默认设置,请设置`customMade`, 打开koroFileHeader查
 测试步骤数据模型
 定义步骤对象和相关数据结构
 """
+import itertools
 import uuid
 
+# 步骤ID = 进程级随机前缀 + 递增序号：每个进程只取一次随机数，
+# 前缀保证与已保存序列文件中其他会话生成的ID不冲突
+_ID_PREFIX = uuid.uuid4().hex[:8]
+_ID_COUNTER = itertools.count(1)
+
 
 class StepObject:
     """代表测试序列中的一个步骤。
@@ -27,8 +33,10 @@ class StepObject:
         params: 参数字典 {参数名: 字符串值}
         outputs: 输出字典 {输出名: 值}
     """
+    __slots__ = ('id', 'type', 'module', 'function', 'control', 'params', 'outputs')
+    
     def __init__(self, type_, module=None, function=None, control=None):
-        self.id = str(uuid.uuid4())
+        self.id = f"{_ID_PREFIX}-{next(_ID_COUNTER)}"
         self.type = type_
         self.module = module
         self.function = function
@@ -36,6 +44,13 @@ class StepObject:
         self.params = {}
         self.outputs = {}
     
+    @property
+    def display_label(self):
+        """步骤的显示标签：函数步骤为"模块.函数"，控制步骤为控制类型"""
+        if self.type == 'function':
+            return f"{self.module}.{self.function}"
+        return self.control
+    
     def __repr__(self):
         if self.type == 'function':
             return f"StepObject(function={self.module}.{self.function})"
@@ -50,9 +65,26 @@ class BreakLoop(Exception):
     
     Attributes:
         actions: 消耗的动作数
-        runtime_vars: 运行时变量字典
+        runtime_vars: 运行时变量字典（与抛出处的执行块共享同一对象）
     """
     def __init__(self, actions=0, runtime_vars=None):
         super().__init__()
         self.actions = actions
         self.runtime_vars = runtime_vars
+
+
+class ExecState:
+    """单步执行的状态
+    
+    Attributes:
+        index: 下一个要执行的步骤索引
+        vars: 运行时变量字典
+        loop_stack: 正在执行的for循环栈，每项为
+            {'start', 'end', 'iterator', 'pos', 'var'} 字典
+    """
+    __slots__ = ('index', 'vars', 'loop_stack')
+    
+    def __init__(self):
+        self.index = 0
+        self.vars = {}
+        self.loop_stack = []
@@ -2,10 +2,114 @@
 测试执行引擎
 负责执行测试序列、处理控制流、管理变量
 """
-import inspect
+import ast
+import copy
+import functools
+import os
 import re
+from types import MappingProxyType
 from typing import List, Dict, Any, Tuple, Callable, Optional
-from .step_model import StepObject, BreakLoop
+from .step_model import StepObject, BreakLoop, ExecState
+
+_STEP_REF_RE = re.compile(r"\$\{#(\d+):([^}]+)\}")
+# ${#N:key} 与 ${@var} 的合并模式：一次扫描完成两种替换
+_REF_RE = re.compile(r"\$\{(?:#(\d+):([^}]+)|@([^}]+))\}")
+
+
+@functools.lru_cache(maxsize=4096)
+def _try_literal(text: str) -> Tuple[bool, Any]:
+    """尝试将字符串按Python字面量解析（结果按字符串缓存）
+    
+    Returns:
+        (是否解析成功, 解析结果)
+    """
+    try:
+        return (True, ast.literal_eval(text))
+    except Exception:
+        return (False, None)
+
+
+# 步骤种类，在 set_steps 时预先分类，执行时按整数分派
+_K_UNKNOWN, _K_FUNC, _K_IF, _K_FOR, _K_END, _K_BREAK = range(6)
+_CONTROL_KINDS = {'if': _K_IF, 'for': _K_FOR, 'end': _K_END, 'break': _K_BREAK}
+
+
+def _classify_step(step) -> int:
+    """返回步骤的种类常量"""
+    if not isinstance(step, StepObject):
+        return _K_UNKNOWN
+    if step.type == 'function':
+        return _K_FUNC
+    if step.type == 'control':
+        return _CONTROL_KINDS.get(step.control, _K_UNKNOWN)
+    return _K_UNKNOWN
+
+
+_KEYWORD_LITERALS = {'True': True, 'False': False, 'None': None}
+
+
+def _parse_plain(text: str) -> Any:
+    """将不含引用的字符串解析为Python值，无法解析时原样返回
+    
+    True/False/None 与十进制整数直接转换，其余交给带缓存的 literal_eval，
+    结果与 ast.literal_eval 保持一致（例如 "007" 仍按字符串处理）。
+    """
+    if text in _KEYWORD_LITERALS:
+        return _KEYWORD_LITERALS[text]
+    digits = text[1:] if text.startswith('-') else text
+    if digits.isascii() and digits.isdigit() and (digits == '0' or digits[0] != '0'):
+        return int(text)
+    ok, val = _literal(text)
+    return val if ok else text
+
+
+def _literal(text: str) -> Tuple[bool, Any]:
+    """带缓存的 literal_eval，返回 (是否解析成功, 值)"""
+    ok, val = _try_literal(text)
+    # 缓存中的可变对象不能直接交给调用者，避免被测试函数修改后污染缓存
+    if ok and isinstance(val, (list, dict, set, tuple)):
+        val = copy.deepcopy(val)
+    return (ok, val)
+
+
+# 可以安全地在多次调用之间共享的参数值类型
+_IMMUTABLE_TYPES = (int, float, bool, str, bytes, complex, type(None))
+
+# 表示"没有值"的哨兵（None 本身是合法的返回值）
+_MISSING = object()
+
+def _is_success(result) -> bool:
+    """判断函数步骤的返回值是否表示成功：None或真值为成功
+    
+    常见的标量结果按类型直接判断，不调用 bool()；真值有歧义的数组类结果（如 numpy 数组）
+    非空即视为成功，不再因 ValueError 被判为错误。
+    """
+    if result is None:
+        return True
+    t = type(result)
+    if t is bool:
+        return result
+    if t is int or t is float:
+        return result != 0
+    try:
+        return bool(result)
+    except (ValueError, TypeError):
+        try:
+            return len(result) > 0
+        except TypeError:
+            return True
+
+
+# 表达式求值使用的全局命名空间（禁用内置函数），所有调用共享
+_SAFE_GLOBALS = {"__builtins__": None, 'True': True, 'False': False, 'None': None}
+# 未传入变量时使用的只读空字典，避免每次调用新建
+_EMPTY_VARS = MappingProxyType({})
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_expr(expr: str):
+    """编译表达式为代码对象（按字符串缓存，同一条件在循环中只编译一次）"""
+    return compile(expr, '<teststand-expr>', 'eval')
 
 
 class TestEngine:
@@ -26,14 +130,59 @@ class TestEngine:
         self.output_callback: Optional[Callable[[str], None]] = None
         self.watcher_callback: Optional[Callable[[Dict], None]] = None
         self.status_callback: Optional[Callable[[int, bool], None]] = None
+        self._end_map: Dict[int, int] = {}  # 控制块头索引 -> 匹配的end索引
+        self._step_kinds: List[int] = []  # 与 steps 平行的步骤种类表（_K_*）
+        # 函数步骤中不含引用的参数的最终值 {步骤索引: {参数名: (原始字符串, 转换函数, 转换后的值)}}
+        self._literal_params: Dict[int, Dict[str, Tuple[str, Any, Any]]] = {}
+        self._tables_dirty = True
+        # run_all 期间的输出合并：攒够 flush_every 条或离开 for 块时一次性回调
+        self.flush_every = 64
+        self._out_buf: List[str] = []
+        self._batching = False
+        # 监视器去重：同一变量字典且版本号未变时不重复回调
+        self._vars_version = 0
+        self._watch_last: Optional[Tuple[Dict, int]] = None
+        # 设置 TESTSTAND_FUSE=1 时，run_all 中满足条件的 for 块走合并快速路径（见 _build_fused_plan）
+        self.fuse_loops = os.environ.get("TESTSTAND_FUSE") == "1"
     
     def set_steps(self, steps: List[StepObject]):
         """设置要执行的步骤列表
         
+        传入与当前相同的序列对象时保留已建立的步骤种类表和 end 索引表。
+        
         Args:
             steps: StepObject列表
         """
-        self.steps = steps
+        if steps is not self.steps:
+            self.steps = steps
+            self._tables_dirty = True
+        self._ensure_step_tables()
+    
+    def invalidate_steps(self):
+        """标记步骤列表已被原地修改，下次执行时重建种类表和 end 索引表"""
+        self._tables_dirty = True
+    
+    def _ensure_step_tables(self):
+        """步骤表失效时重建"""
+        if self._tables_dirty:
+            self._build_step_tables()
+    
+    def _build_step_tables(self):
+        """单遍扫描步骤列表，建立步骤种类表以及控制块头（if/for）到匹配 end 的索引表"""
+        kinds = []
+        end_map = {}
+        open_stack = []
+        for i, step in enumerate(self.steps):
+            kind = _classify_step(step)
+            kinds.append(kind)
+            if kind == _K_IF or kind == _K_FOR:
+                open_stack.append(i)
+            elif kind == _K_END and open_stack:
+                end_map[open_stack.pop()] = i
+        self._step_kinds = kinds
+        self._end_map = end_map
+        self._literal_params = {}
+        self._tables_dirty = False
     
     def set_callbacks(self, output_cb=None, watcher_cb=None, status_cb=None):
         """设置回调函数
@@ -48,14 +197,34 @@ class TestEngine:
         self.status_callback = status_cb
     
     def _output(self, message: str):
-        """输出消息"""
-        if self.output_callback:
+        """输出消息（run_all 期间先写入缓冲）"""
+        if not self.output_callback:
+            return
+        if self._batching:
+            self._out_buf.append(message)
+            if len(self._out_buf) >= self.flush_every:
+                self.flush_output()
+        else:
             self.output_callback(message)
     
+    def flush_output(self):
+        """将缓冲的输出消息合并为一次回调"""
+        if self._out_buf:
+            message = "\n".join(self._out_buf)
+            self._out_buf.clear()
+            if self.output_callback:
+                self.output_callback(message)
+    
     def _update_watcher(self, runtime_vars: Dict):
-        """更新监视器"""
-        if self.watcher_callback:
-            self.watcher_callback(runtime_vars)
+        """更新监视器（变量与步骤输出自上次回调后未变化时跳过）"""
+        if not self.watcher_callback:
+            return
+        last = self._watch_last
+        if last is not None and last[0] is runtime_vars and last[1] == self._vars_version:
+            return
+        # 保存字典本身而非 id()，避免临时字典被回收后 id 复用导致误判
+        self._watch_last = (runtime_vars, self._vars_version)
+        self.watcher_callback(runtime_vars)
     
     def _set_status(self, step_index: int, success: bool):
         """设置步骤状态"""
@@ -65,6 +234,9 @@ class TestEngine:
     def run_all(self):
         """运行整个测试序列"""
         self._output("开始执行测试序列...\n")
+        self._ensure_step_tables()
+        self._watch_last = None
+        self._batching = True
         try:
             self._run_block(0, len(self.steps) - 1, {})
             self._output("测试序列执行完成。\n")
@@ -72,25 +244,31 @@ class TestEngine:
             self._output("遇到 break（未在循环内），已忽略。\n")
         except Exception as e:
             self._output(f"执行过程中发生错误: {str(e)}\n")
+        finally:
+            self._batching = False
+            self.flush_output()
     
     def step_run(self):
         """执行单步（一个操作）"""
         if self.exec_state is None:
-            self.exec_state = {'index': 0, 'vars': {}, 'loop_stack': []}
+            self.exec_state = ExecState()
+        state = self.exec_state
         
-        start = self.exec_state['index']
+        start = state.index
         end = len(self.steps) - 1
         
         if start > end:
             self._output("已到序列末尾；请重置执行以重新开始。")
             return
         
+        self._ensure_step_tables()
         step = self.steps[start]
+        kind = self._step_kinds[start]
         
         # 处理for循环头
-        if isinstance(step, StepObject) and step.type == 'control' and step.control == 'for':
+        if kind == _K_FOR:
             existing = None
-            for e in self.exec_state.get('loop_stack', []):
+            for e in state.loop_stack:
                 if e['start'] == start:
                     existing = e
                     break
@@ -98,75 +276,71 @@ class TestEngine:
             match = self._find_matching_end(start)
             iterable_raw = step.params.get('iterable', '')
             varname = step.params.get('var', '_loop')
-            iterable_val = self.resolve_references(iterable_raw, dict(self.exec_state['vars']))
+            iterable_val = self.resolve_references(iterable_raw, state.vars)
             
             if isinstance(iterable_val, int):
-                iterator = list(range(iterable_val))
+                iterator = range(iterable_val)  # range 支持按位置取值，无需展开
             elif isinstance(iterable_val, (list, tuple)):
                 iterator = list(iterable_val)
             else:
                 try:
-                    iterator = list(self._safe_eval(str(iterable_val), dict(self.exec_state['vars'])))
+                    iterator = list(self._safe_eval(str(iterable_val), state.vars))
                 except Exception:
                     iterator = []
             
             if not iterator:
                 ni = match + 1 if match != -1 else start + 1
-                self.exec_state['index'] = ni
+                state.index = ni
                 self._output(f"单步执行: 空迭代对象，跳过 for-block，下一索引 {ni}")
                 return
             
             if existing is None:
                 entry = {'start': start, 'end': match, 'iterator': iterator, 'pos': 0, 'var': varname}
-                self.exec_state.setdefault('loop_stack', []).append(entry)
+                state.loop_stack.append(entry)
             else:
                 entry = existing
             
-            new_vars = dict(self.exec_state['vars'])
-            new_vars[varname] = entry['iterator'][entry['pos']]
-            self.exec_state['vars'] = new_vars
-            self.exec_state['index'] = start + 1 if match != -1 else start + 1
-            self._output(f"进入 for: 设 {varname} = {entry['iterator'][entry['pos']]}，下一索引 {self.exec_state['index']}")
+            state.vars[varname] = entry['iterator'][entry['pos']]
+            self._vars_version += 1
+            state.index = start + 1 if match != -1 else start + 1
+            self._output(f"进入 for: 设 {varname} = {entry['iterator'][entry['pos']]}，下一索引 {state.index}")
             return
         
         # 处理if语句
-        if isinstance(step, StepObject) and step.type == 'control' and step.control == 'if':
+        if kind == _K_IF:
             match = self._find_matching_end(start)
             cond_raw = step.params.get('condition', '')
-            cond_val = self.resolve_references(cond_raw, dict(self.exec_state['vars']))
-            cond_bool = cond_val if isinstance(cond_val, bool) else self._safe_eval(str(cond_val), dict(self.exec_state['vars']))
+            cond_val = self.resolve_references(cond_raw, state.vars)
+            cond_bool = cond_val if isinstance(cond_val, bool) else self._safe_eval(str(cond_val), state.vars)
             
             self._output(f"IF condition ({cond_raw}) -> {cond_bool}")
-            self._update_watcher(dict(self.exec_state['vars']))
+            self._update_watcher(state.vars)
             
             if cond_bool:
                 # 条件为真，进入if块
-                self.exec_state['index'] = start + 1
-                self._output(f"条件为真，进入 if 块，下一索引 {self.exec_state['index']}")
+                state.index = start + 1
+                self._output(f"条件为真，进入 if 块，下一索引 {state.index}")
             else:
                 # 条件为假，跳过整个if块
-                self.exec_state['index'] = match + 1 if match != -1 else start + 1
-                self._output(f"条件为假，跳过 if 块，下一索引 {self.exec_state['index']}")
+                state.index = match + 1 if match != -1 else start + 1
+                self._output(f"条件为假，跳过 if 块，下一索引 {state.index}")
             return
             
         # 处理break语句
-        if isinstance(step, StepObject) and step.type == 'control' and step.control == 'break':
+        if kind == _K_BREAK:
             # 查找包含的循环
             enclosing = self._find_enclosing_loop(start)
             if enclosing is not None:
                 # 从循环中移除
-                try:
-                    self.exec_state['loop_stack'].remove(enclosing)
-                except Exception:
-                    pass
+                self._pop_loop(enclosing)
                 # 跳转到循环结束位置
                 ni = enclosing['end'] + 1
-                self.exec_state['index'] = ni
+                state.index = ni
                 self._output(f"在循环内遇到 break，跳至索引 {ni}")
                 return
             else:
                 # 不在循环内，简单地跳过break语句
-                self.exec_state['index'] = start + 1
+                state.index = start + 1
                 self._output("遇到 break（未在循环内），已忽略。")
                 return
         
@@ -174,63 +348,57 @@ class TestEngine:
         enclosing = self._find_enclosing_loop(start)
         if enclosing is not None:
             try:
-                ni, nv, a = self._run_block(start, enclosing['end'], dict(self.exec_state['vars']), max_actions=1)
+                ni, nv, a = self._run_single(start, enclosing['end'])
             except BreakLoop as ex:
-                try:
-                    self.exec_state['vars'] = ex.runtime_vars or dict(self.exec_state['vars'])
-                except Exception:
-                    pass
-                try:
-                    self.exec_state['loop_stack'].remove(enclosing)
-                except Exception:
-                    pass
+                if ex.runtime_vars is not None:
+                    state.vars = ex.runtime_vars
+                self._pop_loop(enclosing)
                 ni = enclosing['end'] + 1
-                self.exec_state['index'] = ni
+                state.index = ni
                 self._output(f"在循环内遇到 break，跳至索引 {ni}")
                 return
             
-            self.exec_state['vars'] = nv
+            state.vars = nv
             
             if ni > enclosing['end']:
                 enclosing['pos'] += 1
                 if enclosing['pos'] < len(enclosing['iterator']):
-                    self.exec_state['vars'][enclosing['var']] = enclosing['iterator'][enclosing['pos']]
-                    self.exec_state['index'] = enclosing['start'] + 1
-                    self._output(f"循环下次迭代: 设 {enclosing['var']} = {enclosing['iterator'][enclosing['pos']]}，下一索引 {self.exec_state['index']}")
+                    state.vars[enclosing['var']] = enclosing['iterator'][enclosing['pos']]
+                    self._vars_version += 1
+                    state.index = enclosing['start'] + 1
+                    self._output(f"循环下次迭代: 设 {enclosing['var']} = {enclosing['iterator'][enclosing['pos']]}，下一索引 {state.index}")
                     return
                 else:
-                    try:
-                        self.exec_state['loop_stack'].remove(enclosing)
-                    except Exception:
-                        pass
-                    self.exec_state['index'] = enclosing['end'] + 1
-                    self._output(f"循环完成，下一索引 {self.exec_state['index']}")
+                    self._pop_loop(enclosing)
+                    state.index = enclosing['end'] + 1
+                    self._output(f"循环完成，下一索引 {state.index}")
                     return
             else:
-                self.exec_state['index'] = ni
+                state.index = ni
                 self._output(f"单步执行: 完成 {a} 个操作，下一索引 {ni}")
                 return
         
         # 默认情况：执行一个操作
         try:
-            ni, nv, a = self._run_block(start, end, dict(self.exec_state['vars']), max_actions=1)
+            ni, nv, a = self._run_single(start, end)
         except BreakLoop as ex:
             ni = start + 1
-            nv = ex.runtime_vars or dict(self.exec_state['vars'])
+            nv = ex.runtime_vars if ex.runtime_vars is not None else state.vars
             a = ex.actions
         
-        self.exec_state['index'] = ni
-        self.exec_state['vars'] = nv
+        state.index = ni
+        state.vars = nv
         self._output(f"单步执行: 完成 {a} 个操作，下一索引 {ni}")
     
     def reset_execution(self):
         """重置执行状态"""
-        self.exec_state = {'index': 0, 'vars': {}, 'loop_stack': []}
+        self.exec_state = ExecState()
         
         # 清除所有步骤的输出
         for step in self.steps:
             if isinstance(step, StepObject):
                 step.outputs.clear()
+        self._vars_version += 1
         
         self._update_watcher({})
         self._output("执行状态已重置；已清除运行时变量与步骤输出")
@@ -242,7 +410,7 @@ class TestEngine:
         Args:
             start_idx: 起始索引
             end_idx: 结束索引
-            runtime_vars: 运行时变量
+            runtime_vars: 运行时变量（原地修改，for 循环变量在循环结束后恢复）
             max_actions: 最大操作数（用于单步执行）
         
         Returns:
@@ -251,98 +419,120 @@ class TestEngine:
         actions = 0
         i = start_idx
         
+        kinds = self._step_kinds
+        n_steps = len(self.steps)
+        
         while i <= end_idx:
-            if i >= len(self.steps):
+            if i >= n_steps:
                 break
             
             step = self.steps[i]
+            kind = kinds[i]
             
             # 处理控制流
-            if isinstance(step, StepObject) and step.type == 'control':
-                ctrl = step.control
+            if kind == _K_IF:
+                match = self._find_matching_end(i)
+                cond_raw = step.params.get('condition', '')
+                cond_val = self.resolve_references(cond_raw, runtime_vars)
+                cond_bool = cond_val if isinstance(cond_val, bool) else self._safe_eval(str(cond_val), runtime_vars)
                 
-                if ctrl == 'if':
-                    match = self._find_matching_end(i)
-                    cond_raw = step.params.get('condition', '')
-                    cond_val = self.resolve_references(cond_raw, runtime_vars)
-                    cond_bool = cond_val if isinstance(cond_val, bool) else self._safe_eval(str(cond_val), runtime_vars)
-                    
-                    self._output(f"IF condition ({cond_raw}) -> {cond_bool}")
-                    self._update_watcher(runtime_vars)
-                    actions += 1
-                    
-                    if max_actions is not None and actions >= max_actions:
-                        return (i + 1, runtime_vars, actions)
-                    
-                    if cond_bool:
-                        if match != -1 and match > i:
-                            ni, nv, a = self._run_block(i + 1, match - 1, runtime_vars, 
-                                                       None if max_actions is None else (max_actions - actions))
-                            actions += a
-                            runtime_vars = nv
-                            i = match + 1
-                            if max_actions is not None and actions >= max_actions:
-                                return (i, runtime_vars, actions)
-                            continue
-                    else:
-                        i = match + 1 if match != -1 else i + 1
+                self._output(f"IF condition ({cond_raw}) -> {cond_bool}")
+                self._update_watcher(runtime_vars)
+                actions += 1
+                
+                if max_actions is not None and actions >= max_actions:
+                    return (i + 1, runtime_vars, actions)
+                
+                if cond_bool:
+                    if match != -1 and match > i:
+                        ni, nv, a = self._run_block(i + 1, match - 1, runtime_vars, 
+                                                   None if max_actions is None else (max_actions - actions))
+                        actions += a
+                        runtime_vars = nv
+                        i = match + 1
+                        if max_actions is not None and actions >= max_actions:
+                            return (i, runtime_vars, actions)
                         continue
+                else:
+                    i = match + 1 if match != -1 else i + 1
+                    continue
+            
+            elif kind == _K_FOR:
+                match = self._find_matching_end(i)
+                iterable_raw = step.params.get('iterable', '')
+                varname = step.params.get('var', '_loop')
+                iterable_val = self.resolve_references(iterable_raw, runtime_vars)
                 
-                elif ctrl == 'for':
-                    match = self._find_matching_end(i)
-                    iterable_raw = step.params.get('iterable', '')
-                    varname = step.params.get('var', '_loop')
-                    iterable_val = self.resolve_references(iterable_raw, runtime_vars)
-                    
-                    if isinstance(iterable_val, int):
-                        iterator = range(iterable_val)
-                    elif isinstance(iterable_val, (list, tuple)):
-                        iterator = iterable_val
-                    else:
-                        try:
-                            iterator = list(self._safe_eval(str(iterable_val), runtime_vars))
-                        except Exception:
-                            iterator = []
-                    
-                    self._output(f"FOR over {iterable_raw} -> {list(iterator)}")
-                    self._update_watcher(runtime_vars)
-                    actions += 1
-                    
-                    if max_actions is not None and actions >= max_actions:
-                        return (i + 1, runtime_vars, actions)
+                if isinstance(iterable_val, int):
+                    iterator = range(iterable_val)
+                elif isinstance(iterable_val, (list, tuple)):
+                    iterator = iterable_val
+                else:
+                    try:
+                        iterator = list(self._safe_eval(str(iterable_val), runtime_vars))
+                    except Exception:
+                        iterator = []
+                
+                # 只输出迭代长度，避免为打印日志而把 range 展开成列表
+                self._output(f"FOR over {iterable_raw} (len={len(iterator)})")
+                self._update_watcher(runtime_vars)
+                actions += 1
+                
+                if max_actions is not None and actions >= max_actions:
+                    return (i + 1, runtime_vars, actions)
+                
+                if match != -1 and match > i:
+                    plan = None
+                    if self.fuse_loops and max_actions is None:
+                        plan = self._build_fused_plan(i, match, varname, runtime_vars)
+                    if plan is not None:
+                        actions += self._run_fused(i, match, plan, iterator, runtime_vars)
+                        self.flush_output()
+                        i = match + 1
+                        continue
                     
-                    if match != -1 and match > i:
+                    # 循环变量直接写入当前作用域，循环结束（含 break/异常）后恢复原绑定，
+                    # 避免每次迭代复制整个变量字典
+                    had_var = varname in runtime_vars
+                    prev_val = runtime_vars.get(varname)
+                    try:
                         for val in iterator:
-                            new_vars = dict(runtime_vars)
-                            new_vars[varname] = val
+                            runtime_vars[varname] = val
+                            self._vars_version += 1
                             try:
-                                ni, nv, a = self._run_block(i + 1, match - 1, new_vars, 
+                                ni, nv, a = self._run_block(i + 1, match - 1, runtime_vars, 
                                                            None if max_actions is None else (max_actions - actions))
                                 actions += a
                             except BreakLoop as ex:
                                 actions += ex.actions
-                                runtime_vars = ex.runtime_vars or runtime_vars
                                 if max_actions is not None and actions >= max_actions:
                                     return (match + 1, runtime_vars, actions)
                                 break
-                        i = match + 1
-                        continue
-                    else:
-                        i += 1
-                        continue
-                
-                elif ctrl == 'break':
-                    actions += 1
-                    self._output("BREAK")
-                    self._update_watcher(runtime_vars)
-                    raise BreakLoop(actions=1, runtime_vars=runtime_vars)
-                
-                elif ctrl == 'end':
+                    finally:
+                        if had_var:
+                            runtime_vars[varname] = prev_val
+                        else:
+                            runtime_vars.pop(varname, None)
+                        self._vars_version += 1
+                    self.flush_output()
+                    i = match + 1
+                    continue
+                else:
                     i += 1
                     continue
             
+            elif kind == _K_BREAK:
+                actions += 1
+                self._output("BREAK")
+                self._update_watcher(runtime_vars)
+                raise BreakLoop(actions=1, runtime_vars=runtime_vars)
+            
+            elif kind == _K_END:
+                i += 1
+                continue
+            
             # 执行函数步骤
-            if isinstance(step, StepObject) and step.type == 'function':
+            elif kind == _K_FUNC:
                 module_name = step.module
                 func_name = step.function
                 func = self.test_loader.get_function(module_name, func_name)
@@ -353,60 +543,7 @@ class TestEngine:
                     i += 1
                     continue
                 
-                self._output(f"执行: {module_name}.{func_name}... ")
-                self._update_watcher(runtime_vars)
-                
-                # 准备参数
-                sig = inspect.signature(func)
-                params = sig.parameters
-                args = {}
-                
-                for param_name in params.keys():
-                    raw = step.params.get(param_name, '')
-                    resolved = self.resolve_references(raw, runtime_vars)
-                    
-                    param_type = params[param_name].annotation
-                    if param_type != inspect.Parameter.empty:
-                        try:
-                            if param_type == bool:
-                                value = bool(resolved) if isinstance(resolved, bool) else str(resolved).lower() in ('true', '1', 'yes', 'on')
-                            elif param_type in (int, float):
-                                value = param_type(resolved)
-                            else:
-                                value = resolved
-                        except Exception as e:
-                            self._output(f"参数 '{param_name}' 类型转换失败: {e}")
-                            value = resolved
-                    else:
-                        value = resolved
-                    args[param_name] = value
-                
-                # 执行函数
-                try:
-                    result = func(**args)
-                    
-                    # 存储输出
-                    if isinstance(result, dict):
-                        step.outputs.update(result)
-                    else:
-                        step.outputs['return'] = result
-                        try:
-                            # 将返回值与函数中使用的变量名关联
-                            preds = self.test_loader.get_return_names(module_name, func_name)
-                            for pred in preds:
-                                step.outputs[pred] = result
-                        except Exception:
-                            pass
-                    
-                    success = (result is None) or bool(result)
-                    self._output(f"{'成功' if success else '失败'}")
-                    self._set_status(i, success)
-                
-                except Exception as e:
-                    self._output(f"错误: {str(e)}")
-                    self._set_status(i, False)
-                
-                self._update_watcher(runtime_vars)
+                self._exec_function(i, step, func, runtime_vars)
                 actions += 1
                 
                 if max_actions is not None and actions >= max_actions:
@@ -416,28 +553,241 @@ class TestEngine:
         
         return (i, runtime_vars, actions)
     
+    def _exec_function(self, i: int, step: StepObject, func: Callable, runtime_vars: Dict):
+        """执行一个函数步骤：解析参数、调用函数、保存输出并设置状态
+        
+        Args:
+            i: 步骤索引
+            step: 函数步骤
+            func: 已解析的函数对象
+            runtime_vars: 运行时变量（只读）
+        """
+        self._output(f"执行: {step.module}.{step.function}... ")
+        self._update_watcher(runtime_vars)
+        
+        # 准备参数（优先使用加载时缓存的参数表）
+        spec = self.test_loader.get_param_spec(step.module, step.function)
+        if spec is None:
+            spec = self.test_loader.build_param_spec(func)
+        entries, positional = spec
+        values = []
+        literals = self._literal_params.get(i)
+        if literals is None:
+            literals = self._literal_params[i] = {}
+        
+        for param_name, coerce in entries:
+            raw = step.params.get(param_name, '')
+            # 不含引用的参数只需解析、转换一次；原始字符串被编辑或重新加载后类型注解改变时缓存自动失效
+            hit = literals.get(param_name)
+            if hit is not None and hit[0] == raw and hit[1] is coerce:
+                values.append(hit[2])
+                continue
+            
+            resolved = self.resolve_references(raw, runtime_vars)
+            if coerce is None:
+                value = resolved
+            else:
+                try:
+                    value = coerce(resolved)
+                except Exception as e:
+                    self._output(f"参数 '{param_name}' 类型转换失败: {e}")
+                    values.append(resolved)
+                    continue
+            values.append(value)
+            if type(raw) is str and '${' not in raw and type(value) in _IMMUTABLE_TYPES:
+                literals[param_name] = (raw, coerce, value)
+        
+        # 执行函数（参数顺序与签名一致时按位置传参）
+        try:
+            if positional:
+                result = func(*values)
+            else:
+                result = func(**{name: v for (name, _), v in zip(entries, values)})
+            
+            success = self._store_result(step, result)
+            self._output(f"{'成功' if success else '失败'}")
+            self._set_status(i, success)
+        
+        except Exception as e:
+            self._output(f"错误: {str(e)}")
+            self._set_status(i, False)
+        
+        # 步骤输出可能已变化
+        self._vars_version += 1
+        self._update_watcher(runtime_vars)
+    
+    def _store_result(self, step: StepObject, result: Any) -> bool:
+        """保存函数步骤的返回值到 step.outputs
+        
+        Returns:
+            bool: 步骤是否成功（返回None或真值）
+        """
+        if isinstance(result, dict):
+            step.outputs.update(result)
+        else:
+            step.outputs['return'] = result
+            try:
+                # 将返回值与函数中使用的变量名关联
+                preds = self.test_loader.get_return_names(step.module, step.function)
+                for pred in preds:
+                    step.outputs[pred] = result
+            except Exception:
+                pass
+        return _is_success(result)
+    
+    def _build_fused_plan(self, start: int, end: int, varname: str, runtime_vars: Dict):
+        """判断 for 块能否走合并快速路径，能则返回执行计划
+        
+        条件：循环体只包含函数步骤；函数带有 _teststand_jit 标记（由 Testcase/_fast.jit 设置，
+        表示纯数值函数，可选由 numba 编译）且可按位置传参；每个参数要么恰好是 ${@循环变量}，
+        要么在整个循环中保持不变（不引用循环变量或循环体内步骤的输出），且其值为不可变类型。
+        
+        Args:
+            start: for 头索引
+            end: 匹配的 end 索引
+            varname: 循环变量名
+            runtime_vars: 运行时变量
+        
+        Returns:
+            list: [(步骤索引, 步骤, 函数, 参数列表, [(循环变量所在位置, 转换函数), ...]), ...]，
+                不满足条件时返回None
+        """
+        var_ref = '${@' + varname + '}'
+        plan = []
+        for j in range(start + 1, end):
+            if self._step_kinds[j] != _K_FUNC:
+                return None
+            step = self.steps[j]
+            func = self.test_loader.get_function(step.module, step.function)
+            if func is None or not getattr(func, '_teststand_jit', False):
+                return None
+            spec = self.test_loader.get_param_spec(step.module, step.function)
+            if spec is None or not spec[1]:
+                return None
+            
+            args = []
+            var_slots = []
+            for pos, (param_name, coerce) in enumerate(spec[0]):
+                raw = step.params.get(param_name, '')
+                if raw == var_ref:
+                    var_slots.append((pos, coerce))
+                    args.append(None)
+                    continue
+                if isinstance(raw, str):
+                    if var_ref in raw:
+                        return None
+                    for m in _STEP_REF_RE.finditer(raw):
+                        if start < int(m.group(1)) - 1 < end:
+                            return None
+                value = self.resolve_references(raw, runtime_vars)
+                if coerce is not None:
+                    try:
+                        value = coerce(value)
+                    except Exception:
+                        # 交给逐步执行路径输出转换失败信息
+                        return None
+                if type(value) not in _IMMUTABLE_TYPES:
+                    return None
+                args.append(value)
+            plan.append((j, step, func, args, var_slots))
+        return plan or None
+    
+    def _run_fused(self, start: int, end: int, plan: List, iterator, runtime_vars: Dict) -> int:
+        """按执行计划运行整个 for 块
+        
+        不再逐次迭代地解释步骤、输出日志和刷新监视器，只在结束时保存最后一次迭代的输出，
+        每个步骤的状态为所有迭代是否都成功，每个步骤只报告第一次出现的错误。
+        
+        Returns:
+            int: 完成的操作数
+        """
+        ok = [True] * len(plan)
+        errors = [None] * len(plan)
+        # 每个步骤最后一次正常返回的结果，循环结束后才写入 step.outputs
+        last = [_MISSING] * len(plan)
+        iterations = 0
+        for val in iterator:
+            iterations += 1
+            # 与 resolve_references("${@var}") 的结果一致
+            loop_value = _parse_plain(str(val))
+            for k, (j, step, func, args, var_slots) in enumerate(plan):
+                for pos, coerce in var_slots:
+                    if coerce is None:
+                        args[pos] = loop_value
+                    else:
+                        try:
+                            args[pos] = coerce(loop_value)
+                        except Exception:
+                            args[pos] = loop_value
+                try:
+                    result = func(*args)
+                    last[k] = result
+                    if not _is_success(result):
+                        ok[k] = False
+                except Exception as e:
+                    ok[k] = False
+                    if errors[k] is None:
+                        errors[k] = e
+        
+        self._output(f"FOR 块 {start + 1}-{end + 1} 走合并快速路径: {iterations} 次迭代 × {len(plan)} 个函数步骤")
+        for k, (j, step, func, args, var_slots) in enumerate(plan):
+            if last[k] is not _MISSING:
+                self._store_result(step, last[k])
+            if errors[k] is not None:
+                self._output(f"{step.module}.{step.function} 错误: {errors[k]}")
+            self._set_status(j, ok[k])
+        self._vars_version += 1
+        self._update_watcher(runtime_vars)
+        return iterations * len(plan)
+    
+    def _run_single(self, start: int, end_idx: int) -> Tuple[int, Dict, int]:
+        """单步执行时执行从 start 开始的一个操作
+        
+        已知函数步骤直接执行，不再进入 _run_block 的通用循环；
+        其他情况交给 _run_block(max_actions=1)。两种情况都直接使用 exec_state.vars，不复制。
+        
+        Returns:
+            (next_index, runtime_vars, actions_done)
+        """
+        if self._step_kinds[start] == _K_FUNC:
+            step = self.steps[start]
+            func = self.test_loader.get_function(step.module, step.function)
+            if func is not None:
+                runtime_vars = self.exec_state.vars
+                self._exec_function(start, step, func, runtime_vars)
+                return (start + 1, runtime_vars, 1)
+        return self._run_block(start, end_idx, self.exec_state.vars, max_actions=1)
+    
     def _find_matching_end(self, start_index: int) -> int:
-        """查找匹配的end索引"""
-        depth = 0
-        for i in range(start_index, len(self.steps)):
-            step = self.steps[i]
-            if isinstance(step, StepObject) and step.type == "control":
-                if step.control in ("if", "for"):
-                    depth += 1
-                elif step.control == "end":
-                    depth -= 1
-                    if depth == 0:
-                        return i
-        return -1
+        """查找匹配的end索引，没有匹配时返回-1"""
+        self._ensure_step_tables()
+        return self._end_map.get(start_index, -1)
     
     def _find_enclosing_loop(self, start_idx: int):
-        """查找包含指定索引的循环"""
-        ls = self.exec_state.get('loop_stack', [])
+        """查找包含指定索引的循环
+        
+        循环按进入顺序压栈，正常情况下栈顶就是最内层的包含循环，直接判断栈顶；
+        只有序列不完整（如 for 缺少 end）导致栈顶不包含该索引时才回退到逐个查找。
+        """
+        ls = self.exec_state.loop_stack
+        if not ls:
+            return None
+        top = ls[-1]
+        if top['start'] < start_idx <= top['end']:
+            return top
         for entry in reversed(ls):
             if entry['start'] < start_idx <= entry['end']:
                 return entry
         return None
     
+    def _pop_loop(self, entry):
+        """将循环从循环栈中移除（通常位于栈顶）"""
+        ls = self.exec_state.loop_stack
+        if ls and ls[-1] is entry:
+            ls.pop()
+        elif entry in ls:
+            ls.remove(entry)
+    
     def resolve_references(self, text: str, runtime_vars: Dict = None) -> Any:
         """解析引用
         
@@ -452,55 +802,48 @@ class TestEngine:
         Returns:
             解析后的值
         """
-        if runtime_vars is None:
-            runtime_vars = {}
-        
         if not isinstance(text, str):
             return text
         
-        def repl_step(m):
-            idx = int(m.group(1)) - 1
+        # 不含引用的普通字面量（最常见的情况）直接解析，不进入正则替换
+        if '${' not in text:
+            return _parse_plain(text)
+        
+        if runtime_vars is None:
+            runtime_vars = _EMPTY_VARS
+        
+        steps = self.steps
+        
+        def repl(m):
+            index = m.group(1)
+            if index is None:
+                return str(runtime_vars.get(m.group(3), ""))
+            idx = int(index) - 1
             key = m.group(2)
-            if 0 <= idx < len(self.steps):
-                step = self.steps[idx]
+            if 0 <= idx < len(steps):
+                step = steps[idx]
                 if isinstance(step, StepObject):
                     if key in step.outputs:
                         return str(step.outputs.get(key))
                     return str(step.params.get(key, ""))
             return ""
         
-        def repl_var(m):
-            name = m.group(1)
-            return str(runtime_vars.get(name, ""))
-        
-        text2 = re.sub(r"\$\{#(\d+):([^}]+)\}", repl_step, text)
-        text3 = re.sub(r"\$\{@([^}]+)\}", repl_var, text2)
-        
-        try:
-            import ast
-            val = ast.literal_eval(text3)
-            return val
-        except Exception:
-            pass
-        
-        return text3
+        return _parse_plain(_REF_RE.sub(repl, text))
     
     def _safe_eval(self, expr: str, local_vars: Dict = None) -> Any:
-        """安全地求值表达式"""
+        """安全地求值表达式（字面量解析与编译结果均按表达式字符串缓存）"""
         if local_vars is None:
-            local_vars = {}
+            local_vars = _EMPTY_VARS
+        ok, val = _literal(expr)
+        if ok:
+            return val
         try:
-            import ast
-            return ast.literal_eval(expr)
+            return eval(_compile_expr(expr), _SAFE_GLOBALS, local_vars)
         except Exception:
-            try:
-                safe_globals = {"__builtins__": None, 'True': True, 'False': False, 'None': None}
-                return eval(expr, safe_globals, local_vars)
-            except Exception:
-                return False
+            return False
     
     def get_execution_index(self) -> Optional[int]:
         """获取当前执行索引"""
-        if self.exec_state:
-            return self.exec_state.get('index')
+        if self.exec_state is not None:
+            return self.exec_state.index
         return None
@@ -3,9 +3,26 @@
 负责动态加载和解析测试模块
 """
 import os
+import sys
 import importlib.util
 import ast
 import inspect
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+_TRUTHY = frozenset(('true', '1', 'yes', 'on'))
+
+
+def _coerce_bool(value):
+    """将参数值转换为bool，字符串 'true'/'1'/'yes'/'on'（不分大小写）视为True"""
+    if type(value) is bool:
+        return value
+    return str(value).lower() in _TRUTHY
+
+
+# 参数类型注解 -> 转换函数；不在表中的注解不做转换
+_COERCERS = {bool: _coerce_bool, int: int, float: float}
 
 
 class TestLoader:
@@ -17,77 +34,157 @@ class TestLoader:
     def __init__(self):
         self.test_functions = {}  # {module_name: {func_name: function_obj}}
         self.func_return_names = {}  # {module_name: {func_name: [return_var_names]}}
+        self.func_sigs = {}  # {module_name: {func_name: ([(param_name, coerce_fn), ...], positional)}}
+        self._dir_signature = None  # 上次加载时目录的签名 (目录, ((文件路径, mtime, 大小), ...))
+        self._parse_cache = {}  # {file_path: (mtime_ns, size, {func_name: [return_var_names]})}
     
-    def load_from_directory(self, directory='Testcase'):
+    def load_from_directory(self, directory='Testcase', force=False, parallel=True):
         """从目录加载所有测试模块
         
+        目录中的测试文件与上次加载时相比没有变化（文件列表、修改时间、大小均相同）时，
+        直接返回已加载的结果，不再重新导入模块。
+        
         Args:
             directory: 测试模块所在目录，默认为'Testcase'
+            force: 为True时忽略缓存，强制重新加载
+            parallel: 为True时用线程池并行导入模块（结果仍按文件名顺序合并）；
+                测试模块的顶层代码之间有顺序依赖时传False
         
         Returns:
             dict: 加载的函数字典 {module_name: {func_name: function}}
         """
-        self.test_functions.clear()
-        self.func_return_names.clear()
-        
         # 查找目录
         test_dir = os.path.join(os.getcwd(), directory)
         base_dir = test_dir if os.path.isdir(test_dir) else os.getcwd()
         
         if not os.path.exists(base_dir):
+            self.test_functions.clear()
+            self.func_return_names.clear()
+            self.func_sigs.clear()
+            self._dir_signature = None
+            return self.test_functions
+        
+        test_files = self._discover_test_files(base_dir)
+        signature = (base_dir, tuple((path, st.st_mtime_ns, st.st_size) for _, path, st in test_files))
+        if not force and signature == self._dir_signature:
             return self.test_functions
         
-        # 遍历目录中的Python文件
-        for fname in os.listdir(base_dir):
-            if fname.endswith('.py') and fname.startswith('test_') and fname != 'test_functions.py':
-                file_path = os.path.join(base_dir, fname)
-                module_name = os.path.splitext(os.path.basename(file_path))[0]
+        self.test_functions.clear()
+        self.func_return_names.clear()
+        self.func_sigs.clear()
+        self._dir_signature = signature
+        
+        # 允许测试模块导入同目录下的辅助模块（如 _fast.py）
+        if base_dir not in sys.path:
+            sys.path.insert(0, base_dir)
+        
+        # 导入模块：模块执行期间的文件读取和 C 扩展导入可以在线程间重叠
+        paths = [(module_name, file_path) for module_name, file_path, _ in test_files]
+        if parallel and len(paths) > 1:
+            with ThreadPoolExecutor(max_workers=min(8, len(paths))) as ex:
+                loaded = list(ex.map(lambda item: self._import_module(*item), paths))
+        else:
+            loaded = [self._import_module(*item) for item in paths]
+        
+        # 在当前线程中按文件名顺序合并结果，无需加锁
+        for (module_name, file_path, st), (module, error) in zip(test_files, loaded):
+            if error is not None:
+                print(f"无法加载模块 {module_name}: {error}")
+                continue
+            try:
+                # 解析源码以获取返回值名称
+                self._parse_return_names(file_path, module_name, st)
                 
-                try:
-                    # 动态加载模块
-                    spec = importlib.util.spec_from_file_location(module_name, file_path)
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-                    
-                    # 解析源码以获取返回值名称
-                    self._parse_return_names(file_path, module_name)
-                    
-                    # 获取模块中的函数
-                    functions = []
-                    for name in dir(module):
-                        obj = getattr(module, name)
-                        if callable(obj) and not name.startswith("_"):
-                            functions.append(name)
-                            # 保存函数引用
-                            if module_name not in self.test_functions:
-                                self.test_functions[module_name] = {}
-                            self.test_functions[module_name][name] = obj
-                    
-                except Exception as e:
-                    print(f"无法加载模块 {module_name}: {e}")
+                # 获取模块中的函数：只取本文件定义的公开函数（含 lru_cache 等包装后的函数），
+                # 导入的名字和类不算测试函数
+                for name, obj in vars(module).items():
+                    if name.startswith("_"):
+                        continue
+                    if (callable(obj) and not inspect.isclass(obj)
+                            and getattr(obj, '__module__', None) == module_name):
+                        # 保存函数引用
+                        if module_name not in self.test_functions:
+                            self.test_functions[module_name] = {}
+                        self.test_functions[module_name][name] = obj
+                        # 预先解析参数表，执行时不必每次调用 inspect.signature
+                        try:
+                            param_spec = self.build_param_spec(obj)
+                        except (TypeError, ValueError):
+                            continue
+                        self.func_sigs.setdefault(module_name, {})[name] = param_spec
+                
+            except Exception as e:
+                print(f"无法加载模块 {module_name}: {e}")
         
         return self.test_functions
     
-    def _parse_return_names(self, file_path, module_name):
+    @staticmethod
+    def _import_module(module_name, file_path):
+        """从文件导入一个测试模块
+        
+        Args:
+            module_name: 模块名
+            file_path: 模块文件路径
+        
+        Returns:
+            tuple: (module, None)，导入失败时为 (None, exception)
+        """
+        try:
+            spec = importlib.util.spec_from_file_location(module_name, file_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            return (module, None)
+        except Exception as e:
+            return (None, e)
+    
+    def _discover_test_files(self, base_dir):
+        """列出目录中的测试文件
+        
+        Args:
+            base_dir: 测试模块所在目录
+        
+        Returns:
+            list: [(module_name, file_path, stat_result), ...]，按文件名排序
+        """
+        test_files = []
+        with os.scandir(base_dir) as it:
+            for entry in it:
+                name = entry.name
+                if not (name.startswith('test_') and name.endswith('.py') and name != 'test_functions.py'):
+                    continue
+                if not entry.is_file():
+                    continue
+                test_files.append((name[:-3], entry.path, entry.stat()))
+        test_files.sort(key=lambda item: item[0])
+        return test_files
+    
+    def _parse_return_names(self, file_path, module_name, st=None):
         """解析源码以提取函数返回值的变量名
         
+        解析结果按 (文件路径, 修改时间, 大小) 缓存，文件未变化时不再重新解析。
+        
         Args:
             file_path: 源码文件路径
             module_name: 模块名
+            st: 文件的 os.stat 结果，为None时自行获取
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                src = f.read()
-            
-            tree = ast.parse(src)
-            func_returns = {}
-            
-            for node in tree.body:
-                if isinstance(node, ast.FunctionDef):
-                    ret_names = []
-                    for st in ast.walk(node):
-                        if isinstance(st, ast.Return) and st.value is not None:
-                            v = st.value
+            if st is None:
+                st = os.stat(file_path)
+            cached = self._parse_cache.get(file_path)
+            if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                func_returns = cached[2]
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    src = f.read()
+                
+                tree = ast.parse(src)
+                func_returns = {}
+                
+                for node in tree.body:
+                    if isinstance(node, ast.FunctionDef):
+                        ret_names = []
+                        for v in self._iter_return_values(node):
                             # 返回简单变量名: return sum
                             if isinstance(v, ast.Name):
                                 ret_names.append(v.id)
@@ -96,17 +193,37 @@ class TestLoader:
                                 for key in v.keys:
                                     if isinstance(key, ast.Constant):
                                         ret_names.append(str(key.value))
-                    
-                    if ret_names:
-                        func_returns[node.name] = list(dict.fromkeys(ret_names))
+                        
+                        if ret_names:
+                            func_returns[node.name] = list(dict.fromkeys(ret_names))
+                
+                self._parse_cache[file_path] = (st.st_mtime_ns, st.st_size, func_returns)
             
             if func_returns:
-                self.func_return_names[module_name] = func_returns
+                self.func_return_names[module_name] = {k: list(v) for k, v in func_returns.items()}
         
         except Exception:
             # 忽略解析错误
             pass
     
+    @staticmethod
+    def _iter_return_values(func_node):
+        """遍历函数体中 return 语句的返回值节点
+        
+        按与 ast.walk 相同的广度优先顺序遍历，但不进入嵌套的函数、lambda 和类定义，
+        它们的 return 不属于外层函数。
+        """
+        queue = deque(func_node.body)
+        while queue:
+            node = queue.popleft()
+            if isinstance(node, ast.Return):
+                if node.value is not None:
+                    yield node.value
+                continue
+            for child in ast.iter_child_nodes(node):
+                if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+                    queue.append(child)
+    
     def get_function(self, module_name, func_name):
         """获取指定的函数对象
         
@@ -134,6 +251,44 @@ class TestLoader:
             return inspect.signature(func)
         return None
     
+    @staticmethod
+    def build_param_spec(func):
+        """根据函数签名生成参数表
+        
+        每个参数按类型注解预先选好转换函数（bool/int/float），执行时无需再判断类型。
+        
+        Args:
+            func: 函数对象
+        
+        Returns:
+            tuple: ([(参数名, 转换函数或None), ...], 能否按位置传参)，
+                转换函数为None表示不做转换；含仅限关键字参数或 *args/**kwargs 时不能按位置传参
+        """
+        entries = []
+        positional = True
+        for pname, p in inspect.signature(func).parameters.items():
+            try:
+                coerce = _COERCERS.get(p.annotation)
+            except TypeError:
+                # 不可哈希的注解
+                coerce = None
+            entries.append((pname, coerce))
+            if p.kind not in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD):
+                positional = False
+        return (entries, positional)
+    
+    def get_param_spec(self, module_name, func_name):
+        """获取加载时缓存的函数参数表
+        
+        Args:
+            module_name: 模块名
+            func_name: 函数名
+        
+        Returns:
+            tuple: 同 build_param_spec 的返回值，无法解析签名时返回None
+        """
+        return self.func_sigs.get(module_name, {}).get(func_name)
+    
     def get_return_names(self, module_name, func_name):
         """获取函数的预测返回值名称列表
         
@@ -164,3 +319,14 @@ class TestLoader:
             list: 函数名列表
         """
         return list(self.test_functions.get(module_name, {}).keys())
+    
+    def iter_modules_and_functions(self):
+        """按加载顺序遍历所有模块及其函数名
+        
+        一次遍历即可取得全部模块和函数，无需对每个模块再调用 get_module_functions。
+        
+        Yields:
+            tuple: (module_name, [func_name, ...])
+        """
+        for module_name, funcs in self.test_functions.items():
+            yield module_name, list(funcs)
@@ -1,16 +1,220 @@
 import sys
 import os
+import ast
+import functools
 import importlib.util
+import inspect
+import itertools
+import json
+import re
+import time
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QTreeWidget, QTreeWidgetItem, 
-                             QListWidget, QListWidgetItem, QSplitter, QVBoxLayout, 
+                             QListView, QSplitter, QVBoxLayout, 
                              QWidget, QPushButton, QFileDialog, QTextEdit, QHBoxLayout,
                              QMessageBox, QAbstractItemView, QMenu, QLabel, QLineEdit)
-from PyQt6.QtCore import Qt, QMimeData, QDataStream, QIODevice, pyqtSignal, QByteArray, QPoint
+from PyQt6.QtCore import (Qt, QMimeData, QDataStream, QIODevice, pyqtSignal, QByteArray, QPoint, QTimer,
+                          QAbstractListModel, QModelIndex)
 from PyQt6.QtGui import QDrag, QIcon, QPixmap, QPainter, QColor
-import uuid
 
 # 定义MIME类型
 MIME_TYPE = "application/x-test-item"
+# application-wide stylesheet, set once in main() instead of on each widget
+_APP_STYLE_SHEET = "QLabel#outputParams { background-color: #f0f0f0; padding: 5px; border: 1px solid #ccc; }"
+# separates function and module inside one drag record ("func\x1fmodule", written with writeBytes)
+_DRAG_SEP = "\x1f"
+
+
+# bump when the parsing rules change so stale on-disk results are not reused
+_AST_CACHE_VERSION = 3
+
+
+class _ReturnCollector(ast.NodeVisitor):
+    """Collect the values of return statements belonging to one function.
+
+    Nested functions, lambdas and classes are not entered: their returns are not
+    outputs of the outer function.
+    """
+    def __init__(self):
+        self.returns = []
+
+    def visit_FunctionDef(self, node):
+        pass
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+    visit_Lambda = visit_FunctionDef
+    visit_ClassDef = visit_FunctionDef
+
+    def visit_Return(self, node):
+        if node.value is not None:
+            self.returns.append(node.value)
+
+
+# reference tokens inside parameter strings: ${#N:key} (step output/param) and ${@var} (runtime var)
+_REF_RE = re.compile(r"\$\{#(\d+):([^}]+)\}|\$\{@([^}]+)\}")
+
+
+# first characters a Python literal can start with (after leading blanks, which literal_eval strips);
+# sign/digits/dot for numbers, brackets and quotes, True/False/None and string prefixes
+_LITERAL_START = frozenset("+-0123456789.([{'\"TFNbBrRuU")
+
+
+def _parse_literal(text):
+    """ast.literal_eval(text), or text unchanged when it is not a literal.
+
+    Strings that cannot start a literal skip the parser (and the SyntaxError it raises).
+    """
+    head = text.lstrip(" \t")[:1]
+    if head and head in _LITERAL_START:
+        try:
+            return ast.literal_eval(text)
+        except Exception:
+            pass
+    return text
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_template(text):
+    """Split a parameter string into literal text and reference tokens, cached per string.
+
+    Returns a tuple whose items are either str (literal text), (step_index, key) for
+    ${#N:key} (step_index is 0-based) or a 1-tuple (var_name,) for ${@var}.
+    """
+    parts = []
+    pos = 0
+    for m in _REF_RE.finditer(text):
+        if m.start() > pos:
+            parts.append(text[pos:m.start()])
+        if m.group(3) is None:
+            parts.append((int(m.group(1)) - 1, m.group(2)))
+        else:
+            parts.append((m.group(3),))
+        pos = m.end()
+    if pos < len(text):
+        parts.append(text[pos:])
+    return tuple(parts)
+
+def _is_success(result):
+    """A function step passes when it returns None or a truthy value.
+
+    Common scalar results are decided by type without calling bool(). Array-like results
+    whose truth value is ambiguous (e.g. numpy arrays) count as passed when non-empty
+    instead of failing the step with a ValueError.
+    """
+    if result is None:
+        return True
+    t = type(result)
+    if t is bool:
+        return result
+    if t is int or t is float:
+        return result != 0
+    try:
+        return bool(result)
+    except (ValueError, TypeError):
+        try:
+            return len(result) > 0
+        except TypeError:
+            return True
+
+
+def _insert_ref(edit, action):
+    """Reference-menu handler (connected once per menu to QMenu.triggered): insert the
+    pre-formatted ${#N:key} token stored in the action's data at the edit's cursor."""
+    token = action.data()
+    if token:
+        edit.insert(token)
+
+
+# minimum time between event-loop passes while run_sequence is executing (seconds)
+_PUMP_INTERVAL = 0.03
+
+# marks a runtime variable that had no binding before a for-loop set it
+_MISSING = object()
+
+
+def _restore_var(runtime_vars, name, saved):
+    """Put back the binding a for-loop variable had before the loop (or remove it)."""
+    if saved is _MISSING:
+        runtime_vars.pop(name, None)
+    else:
+        runtime_vars[name] = saved
+
+
+@functools.lru_cache(maxsize=None)
+def _sig_info(func):
+    """Return (param_names, output_name) for a test function, cached per function object.
+
+    output_name is None when the function has no return annotation.
+    """
+    sig = inspect.signature(func)
+    ret = sig.return_annotation
+    if ret is inspect.Signature.empty:
+        output_name = None
+    else:
+        output_name = getattr(ret, '__name__', None) or str(ret)
+    return (tuple(sig.parameters.keys()), output_name)
+
+
+_TRUTHY = frozenset(('true', '1', 'yes', 'on'))
+
+
+def _coerce_bool(value):
+    """bool parameters: 'true'/'1'/'yes'/'on' (any case) are True, real bools pass through."""
+    if type(value) is bool:
+        return value
+    return str(value).lower() in _TRUTHY
+
+
+# parameter annotation -> conversion applied to the resolved value; other annotations are passed as-is
+_COERCERS = {bool: _coerce_bool, int: int, float: float}
+
+# argument values of these types can be shared between calls without the callee being able to change them
+_IMMUTABLE_TYPES = (int, float, bool, str, bytes, complex, type(None))
+
+
+@functools.lru_cache(maxsize=None)
+def _param_coercers(func):
+    """Return ((param_name, coerce_fn or None), ...) for a test function, cached per function object.
+
+    The conversion is picked from the annotation once here instead of on every call.
+    """
+    entries = []
+    for name, p in inspect.signature(func).parameters.items():
+        try:
+            coerce = _COERCERS.get(p.annotation)
+        except TypeError:
+            # unhashable annotation
+            coerce = None
+        entries.append((name, coerce))
+    return tuple(entries)
+
+
+def _build_tree_item(text, children, parent=None):
+    """Create a tree item (attached to parent when given) and its subtree from a (text, children) spec."""
+    item = QTreeWidgetItem([text]) if parent is None else QTreeWidgetItem(parent, [text])
+    for child_text, grandchildren in children:
+        _build_tree_item(child_text, grandchildren, item)
+    return item
+
+
+def _sync_tree_items(parent, spec):
+    """Make parent's children match spec, a list of (text, children) pairs, touching only what differs.
+
+    Existing items are matched by position: their text is set only when it changed, surplus
+    items are removed and missing ones are built detached and added in one call.
+    """
+    count = parent.childCount()
+    n = len(spec)
+    for idx in range(min(count, n)):
+        text, children = spec[idx]
+        item = parent.child(idx)
+        if item.text(0) != text:
+            item.setText(0, text)
+        if children or item.childCount():
+            _sync_tree_items(item, children)
+    for idx in range(count - 1, n - 1, -1):
+        parent.takeChild(idx)
+    if n > count:
+        parent.addChildren([_build_tree_item(text, children) for text, children in spec[count:]])
 
 
 class BreakLoop(Exception):
@@ -25,6 +229,33 @@ class BreakLoop(Exception):
         self.runtime_vars = runtime_vars
 
 
+# step kinds, fixed when a StepObject is created so the runners dispatch on an int
+_K_UNKNOWN, _K_FUNC, _K_IF, _K_FOR, _K_END, _K_BREAK = range(6)
+_CONTROL_KINDS = {'if': _K_IF, 'for': _K_FOR, 'end': _K_END, 'break': _K_BREAK}
+
+
+class _LoopFrame:
+    """State of one for-loop entered while single-stepping (an entry of exec_state['loop_stack']).
+
+    Attributes:
+        start: index of the 'for' header
+        end: index of its matching 'end' (-1 if unmatched)
+        iterator: the loop values (range, list or tuple; indexed by pos)
+        length: len(iterator)
+        pos: index of the current value in iterator
+        var: loop variable name
+    """
+    __slots__ = ('start', 'end', 'iterator', 'length', 'pos', 'var')
+
+    def __init__(self, start, end, iterator, var):
+        self.start = start
+        self.end = end
+        self.iterator = iterator
+        self.length = len(iterator)
+        self.pos = 0
+        self.var = var
+
+
 class StepObject:
     """Represent a step in the sequence. Holds parameters as attributes so each
     dropped item owns its own param state.
@@ -34,15 +265,32 @@ class StepObject:
         module: module name (for functions)
         control: control token (for control items)
         params: dict of parameter name -> string value
+        display_text: label shown in the sequence list ("module.func" or the control token)
+        kind: one of the _K_* constants derived from type/control
+        ref_keys: cached reference-menu keys (see MainWindow._ref_keys); None when stale
     """
+    __slots__ = ('id', 'type', 'module', 'function', 'control', 'params', 'outputs', 'display_text', 'kind',
+                 'ref_keys')
+
+    # ids only need to be unique within this process
+    _next_id = itertools.count(1).__next__
+
     def __init__(self, type_, module=None, function=None, control=None):
-        self.id = str(uuid.uuid4())
+        self.id = f"s{StepObject._next_id()}"
         self.type = type_
         self.module = module
         self.function = function
         self.control = control
         self.params = {}
         self.outputs = {}
+        self.display_text = f"{module}.{function}" if type_ == "function" else control
+        if type_ == "function":
+            self.kind = _K_FUNC
+        elif type_ == "control":
+            self.kind = _CONTROL_KINDS.get(control, _K_UNKNOWN)
+        else:
+            self.kind = _K_UNKNOWN
+        self.ref_keys = None
 
 
 class DraggableTreeWidget(QTreeWidget):
@@ -73,24 +321,163 @@ class DraggableTreeWidget(QTreeWidget):
             # 创建自定义数据格式
             item_data = QByteArray()
             data_stream = QDataStream(item_data, QIODevice.OpenModeFlag.WriteOnly)
-            data_stream.writeString(current_item.text(0).encode('utf-8'))
-            data_stream.writeString(current_item.parent().text(0).encode('utf-8'))
+            # one packed record per item: a single encode and a single stream write
+            data_stream.writeBytes(
+                f"{current_item.text(0)}{_DRAG_SEP}{current_item.parent().text(0)}".encode('utf-8'))
             
             mime_data.setData(MIME_TYPE, item_data)
             drag.setMimeData(mime_data)
             
             drag.exec(Qt.DropAction.CopyAction)
 
-class DroppableListWidget(QListWidget):
-    """可接收拖拽的测试序列列表"""
+class SequenceModel(QAbstractListModel):
+    """List model backing the test sequence: one StepObject per row.
+
+    Row labels ("N. module.func" plus the exec marker) and pass/fail icons are computed
+    in data() from the step and the model's own state, so the view only asks for the
+    rows it actually paints.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._steps = []
+        self._status = {}  # step id -> True (PASS) / False (FAIL)
+        self._exec_index = None
+        self.icon_pass = None
+        self.icon_fail = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._steps)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        step = self._steps[row]
+        if role == Qt.ItemDataRole.DisplayRole:
+            text = f"{row+1}. {step.display_text}"
+            if row == self._exec_index:
+                text = f"{text}  <-"
+            return text
+        if role == Qt.ItemDataRole.DecorationRole:
+            status = self._status.get(step.id)
+            if status is None:
+                return None
+            return self.icon_pass if status else self.icon_fail
+        if role == Qt.ItemDataRole.UserRole:
+            return step
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid():
+            return flags | Qt.ItemFlag.ItemIsDragEnabled
+        # drops land between rows, never onto a row
+        return flags | Qt.ItemFlag.ItemIsDropEnabled
+
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction | Qt.DropAction.CopyAction
+
+    def step(self, row):
+        return self._steps[row]
+
+    def steps(self):
+        """The step objects in row order. Treat as read-only; edit through the methods below."""
+        return self._steps
+
+    def insert_steps(self, steps, row=None):
+        """Insert steps before row (append when row is None) with a single rowsInserted."""
+        if not steps:
+            return
+        if row is None:
+            row = len(self._steps)
+        self.beginInsertRows(QModelIndex(), row, row + len(steps) - 1)
+        self._steps[row:row] = steps
+        self.endInsertRows()
+        self._renumber(row + len(steps))
+
+    def remove_step(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        step = self._steps.pop(row)
+        self.endRemoveRows()
+        self._status.pop(step.id, None)
+        self._renumber(row)
+
+    def move_step(self, src, dst):
+        """Move the step at row src in front of the row currently at dst (dst == rowCount appends)."""
+        if dst == src or dst == src + 1:
+            return False
+        if not self.beginMoveRows(QModelIndex(), src, src, QModelIndex(), dst):
+            return False
+        step = self._steps.pop(src)
+        self._steps.insert(dst - 1 if dst > src else dst, step)
+        self.endMoveRows()
+        self._renumber(min(src, dst), max(src, dst))
+        return True
+
+    def clear(self):
+        self.beginResetModel()
+        self._steps.clear()
+        self._status.clear()
+        self._exec_index = None
+        self.endResetModel()
+
+    def set_status(self, row, success):
+        """Record PASS/FAIL for a row; only that row is repainted, and only if the status changed."""
+        step = self._steps[row]
+        if self._status.get(step.id) == success:
+            return
+        self._status[step.id] = success
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.ItemDataRole.DecorationRole])
+
+    def clear_status(self):
+        if not self._status:
+            return
+        self._status.clear()
+        if self._steps:
+            self.dataChanged.emit(self.index(0), self.index(len(self._steps) - 1), [Qt.ItemDataRole.DecorationRole])
+
+    def set_exec_index(self, idx):
+        """Move the exec marker; only the rows it leaves and enters are repainted."""
+        old = self._exec_index
+        if old == idx:
+            return
+        self._exec_index = idx
+        for row in (old, idx):
+            if row is not None and 0 <= row < len(self._steps):
+                i = self.index(row)
+                self.dataChanged.emit(i, i, [Qt.ItemDataRole.DisplayRole])
+
+    def _renumber(self, first, last=None):
+        """Rows first..last (default: to the end) changed position; refresh their "N." prefix."""
+        last = len(self._steps) - 1 if last is None else min(last, len(self._steps) - 1)
+        if first <= last:
+            self.dataChanged.emit(self.index(first), self.index(last), [Qt.ItemDataRole.DisplayRole])
+
+
+class SequenceListView(QListView):
+    """可接收拖拽的测试序列列表（数据保存在 SequenceModel 中）"""
     itemMoved = pyqtSignal()
     
     def __init__(self):
         super().__init__()
+        self.setModel(SequenceModel(self))
         self.setAcceptDrops(True)
         self.setDragEnabled(True)
         self.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
         self.setDefaultDropAction(Qt.DropAction.MoveAction)
+        self.setDropIndicatorShown(True)
+        # every row is a single line of text, so one size hint serves all rows
+        self.setUniformItemSizes(True)
+
+    def count(self):
+        return self.model().rowCount()
+
+    def step(self, row):
+        return self.model().step(row)
+
+    def steps(self):
+        return self.model().steps()
     
     def dragEnterEvent(self, event):
         if event.mimeData().hasFormat(MIME_TYPE) or event.mimeData().hasText():
@@ -105,41 +492,61 @@ class DroppableListWidget(QListWidget):
             super().dragMoveEvent(event)
             
     def dropEvent(self, event):
-        if event.mimeData().hasFormat(MIME_TYPE):
+        if event.source() is self:
+            # internal move: reorder the model directly
+            src = self.currentIndex().row()
+            pos = event.position().toPoint()
+            target = self.indexAt(pos)
+            if target.isValid():
+                dst = target.row()
+                if pos.y() > self.visualRect(target).center().y():
+                    dst += 1
+            else:
+                dst = self.count()
+            if src >= 0:
+                self.model().move_step(src, dst)
+            # the row is already in place; a MoveAction would make the drag source remove it
+            event.setDropAction(Qt.DropAction.CopyAction)
+            event.accept()
+        elif event.mimeData().hasFormat(MIME_TYPE):
             item_data = event.mimeData().data(MIME_TYPE)
             data_stream = QDataStream(item_data, QIODevice.OpenModeFlag.ReadOnly)
-            func_name = bytes(data_stream.readString()).decode('utf-8')
-            module_name = bytes(data_stream.readString()).decode('utf-8')
-            
-            # If the item came from the special control category, create a control step
-            if module_name == "流程控制":
-                item = QListWidgetItem(func_name)
-                step = StepObject(type_="control", control=func_name)
-            else:
-                item = QListWidgetItem(f"{module_name}.{func_name}")
-                step = StepObject(type_="function", module=module_name, function=func_name)
-            item.setData(Qt.ItemDataRole.UserRole, step)
-            item.setData(Qt.ItemDataRole.UserRole + 1, step.id)  # 唯一ID
-            self.addItem(item)
+            # decode every (function, module) pair first, then insert them in one batch
+            steps = []
+            while not data_stream.atEnd():
+                func_name, _, module_name = data_stream.readBytes().decode('utf-8').partition(_DRAG_SEP)
+                # If the item came from the special control category, create a control step
+                if module_name == "流程控制":
+                    steps.append(StepObject(type_="control", control=func_name))
+                else:
+                    steps.append(StepObject(type_="function", module=module_name, function=func_name))
             event.acceptProposedAction()
+            self.add_steps_batch(steps)
+            return
         elif event.mimeData().hasText():
             text = event.mimeData().text()
             if text in ["if", "for", "end", "break"]:
-                item = QListWidgetItem(text)
-                step = StepObject(type_="control", control=text)
-                item.setData(Qt.ItemDataRole.UserRole, step)
-                item.setData(Qt.ItemDataRole.UserRole + 1, step.id)  # 唯一ID
-                self.addItem(item)
                 event.acceptProposedAction()
+                self.add_steps_batch([StepObject(type_="control", control=text)])
+                return
         else:
             super().dropEvent(event)
         self.itemMoved.emit()
 
+    def add_steps_batch(self, steps):
+        """Append several steps at once.
+
+        The model inserts them with a single rowsInserted, and itemMoved is emitted
+        a single time afterwards.
+        """
+        if not steps:
+            return
+        self.model().insert_steps(steps)
+        self.itemMoved.emit()
+
     def keyPressEvent(self, event):
-        if event.key() == Qt.Key.Key_Delete and self.currentItem():
-            row = self.currentRow()
-            item = self.takeItem(row)
-            del item
+        if event.key() == Qt.Key.Key_Delete and self.currentIndex().isValid():
+            self.model().remove_step(self.currentIndex().row())
             self.itemMoved.emit()  # 触发更新
         else:
             super().keyPressEvent(event)
@@ -166,7 +573,38 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.test_functions = {}
         self.current_param_widgets = {}  # 缓存当前参数控件
-        self.step_params_cache = {}      # 缓存每个步骤的参数值，key: "module.func", value: dict
+        # parsed return names per test file, persisted across runs:
+        # key (file_path, mtime_ns, size) -> {func_name: [return_var_names]}
+        # kept in the user's own cache directory, never in the shared temp dir
+        cache_root = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        self._ast_cache_path = os.path.join(cache_root, 'teststand_like',
+                                             f'ast_cache_v{_AST_CACHE_VERSION}.json')
+        self._ast_cache = self._load_ast_cache()
+        # matching 'end' index for every if/for row; rebuilt whenever the sequence changes
+        self._block_pairs = {}
+        # compiled code objects for evaluated expressions, keyed by source text
+        self._expr_code_cache = {}
+        # per-step argument plans: step id -> (func, ((name, raw, coerce_fn, const), ...)); dropped on edit
+        self._step_arg_plans = {}
+        # "步骤 N: label" titles for the watcher's step nodes; None until built, dropped on structure change
+        self._watcher_step_labels = None
+        # built reference menus per parameter edit: edit -> (version, QMenu); any change to the
+        # sequence, a step's params/outputs or the loaded functions bumps the version
+        self._ref_menus = {}
+        self._ref_menu_version = 0
+        # step whose parameters are shown in the editor (saved back when the selection moves)
+        self._editing_step = None
+        # pooled parameter rows (row widget, label, edit); the first _param_rows_used are in use
+        self._param_row_pool = []
+        self._param_rows_used = 0
+        # log lines and the latest watcher state are queued during execution and pushed
+        # to the widgets together, at most once per timer interval
+        self._pending_log = []
+        self._pending_vars = None
+        self._ui_flush_timer = QTimer(self)
+        self._ui_flush_timer.setSingleShot(True)
+        self._ui_flush_timer.setInterval(16)
+        self._ui_flush_timer.timeout.connect(self._flush_pending_ui)
         self.init_ui()
         # initialize pass/fail icons
         self.init_status_icons()
@@ -175,9 +613,13 @@ class MainWindow(QMainWindow):
 
     def init_status_icons(self):
         """Create small green/red round icons used to mark PASS/FAIL on steps."""
+        # render at the screen's device pixel ratio so HiDPI rows don't rescale the icon on every paint
+        dpr = self.devicePixelRatioF()
+
         def make_icon(color_name):
             size = 16
-            pix = QPixmap(size, size)
+            pix = QPixmap(round(size * dpr), round(size * dpr))
+            pix.setDevicePixelRatio(dpr)
             try:
                 pix.fill(Qt.GlobalColor.transparent)
             except Exception:
@@ -194,19 +636,16 @@ class MainWindow(QMainWindow):
 
         self.icon_pass = make_icon('#2ecc71')  # green
         self.icon_fail = make_icon('#e74c3c')  # red
+        self.sequence_model.icon_pass = self.icon_pass
+        self.sequence_model.icon_fail = self.icon_fail
 
-    def set_item_status(self, item, success: bool):
-        """Set the status icon for a QListWidgetItem. Pass True for PASS, False for FAIL.
+    def set_item_status(self, row, success: bool):
+        """Set the status icon for a sequence row. Pass True for PASS, False for FAIL.
 
-        If item is None or not a QListWidgetItem, the method is a no-op.
+        The model skips the repaint when the row already shows that status.
         """
         try:
-            if not item:
-                return
-            if success:
-                item.setIcon(self.icon_pass)
-            else:
-                item.setIcon(self.icon_fail)
+            self.sequence_model.set_status(row, success)
         except Exception:
             # non-fatal: do not break execution on icon failures
             pass
@@ -312,7 +751,8 @@ class MainWindow(QMainWindow):
         seq_layout.addLayout(control_bar)
 
         # 测试序列列表
-        self.sequence_list = DroppableListWidget()
+        self.sequence_list = SequenceListView()
+        self.sequence_model = self.sequence_list.model()
         seq_layout.addWidget(self.sequence_list)
 
         # --- 步骤设置区域 ---
@@ -322,7 +762,12 @@ class MainWindow(QMainWindow):
 
         self.current_param_widgets = {}  # 缓存当前参数控件
 
-        step_layout.addWidget(QLabel("<b>步骤设置</b>"))
+        # plain-text label with a bold font: no rich-text parsing
+        step_title = QLabel("步骤设置")
+        title_font = step_title.font()
+        title_font.setBold(True)
+        step_title.setFont(title_font)
+        step_layout.addWidget(step_title)
 
         # 输入参数区
         self.input_params_layout = QVBoxLayout()
@@ -336,7 +781,8 @@ class MainWindow(QMainWindow):
 
         # 输出参数区
         self.output_params_label = QLabel("-")
-        self.output_params_label.setStyleSheet("QLabel { background-color: #f0f0f0; padding: 5px; border: 1px solid #ccc; }")
+        # styled by _APP_STYLE_SHEET through its object name
+        self.output_params_label.setObjectName("outputParams")
         step_layout.addWidget(QLabel("输出参数:"))
         step_layout.addWidget(self.output_params_label)
 
@@ -354,7 +800,6 @@ class MainWindow(QMainWindow):
         watcher_layout = QVBoxLayout(watcher_widget)
         watcher_layout.setContentsMargins(0, 0, 0, 0)
         watcher_layout.addWidget(QLabel("变量监视器"))
-        from PyQt6.QtWidgets import QTreeWidget, QTreeWidgetItem
         self.watcher_tree = QTreeWidget()
         self.watcher_tree.setHeaderLabel("变量")
         watcher_layout.addWidget(self.watcher_tree)
@@ -382,73 +827,53 @@ class MainWindow(QMainWindow):
         self.step_button.clicked.connect(self.step_run)
         self.reset_exec_button.clicked.connect(self.reset_executor)
         self.clear_button.clicked.connect(self.clear_sequence)
-        self.sequence_list.itemMoved.connect(self.update_output)
-        # 使用 currentItemChanged 来获取上一个选中项（previous）以便在切换时保存它的参数
-        self.sequence_list.currentItemChanged.connect(self.on_current_item_changed)
+        self.sequence_list.itemMoved.connect(self._rebuild_block_pairs)
+        self.sequence_list.itemMoved.connect(self._rebuild_sequence_text)
+        # 选中行变化时保存上一个步骤的参数并显示当前步骤的参数
+        self.sequence_list.selectionModel().currentChanged.connect(self.on_current_item_changed)
+        # reference menus list every step with its row number, so structural changes make them stale
+        model = self.sequence_model
+        for sig in (model.rowsInserted, model.rowsRemoved, model.rowsMoved, model.modelReset):
+            sig.connect(self._invalidate_ref_menus)
 
     def on_current_item_changed(self, current, previous):
-        """在选中项变化时触发：先保存 previous 的参数，然后为 current 显示/恢复参数"""
-        # 保存之前选中项的参数（如果有）
-        if previous:
-            self.save_current_params(previous)
+        """在选中行变化时触发：先保存上一个步骤的参数，然后为 current 显示/恢复参数"""
+        # 保存之前选中步骤的参数（如果有）；按步骤对象而不是 previous 行号保存，
+        # 行在移动/删除后 previous 可能已指向别的步骤
+        if self._editing_step is not None:
+            self.save_current_params(self._editing_step)
+        self._editing_step = None
 
         # 清除旧输入框
         self.clear_param_inputs()
 
-        if not current:
+        if not current.isValid():
             self.output_params_label.setText("-")
             return
 
-        print(f"[DEBUG] 当前已选测试项: {current.text()}")
+        print(f"[DEBUG] 当前已选测试项: {current.data()}")
         data = current.data(Qt.ItemDataRole.UserRole)
-        # 支持新的 StepObject 或旧的 dict（向后兼容）
-        if isinstance(data, StepObject):
-            item_id = data.id
-            print(f"[DEBUG] 当前项唯一ID: {item_id}")
-            print(f"[DEBUG] 当前项参数: {data.params}")
-            is_function = (data.type == "function")
-            module_name = data.module
-            func_name = data.function
-            func = self.test_functions.get(module_name, {}).get(func_name) if is_function else None
-        else:
-            item_id = current.data(Qt.ItemDataRole.UserRole + 1)
-            print(f"[DEBUG] 当前项唯一ID: {item_id}")
-            print(f"[DEBUG] 当前缓存内容: {list(self.step_params_cache.keys())}")
-            is_function = data.get("type") == "function"
-            module_name = data.get("module") if is_function else None
-            func_name = data.get("function") if is_function else None
-            func = self.test_functions.get(module_name, {}).get(func_name) if is_function else None
-
-        if is_function:
+        self._editing_step = data
+        print(f"[DEBUG] 当前项唯一ID: {data.id}")
+        print(f"[DEBUG] 当前项参数: {data.params}")
+
+        if data.type == "function":
+            func = self.test_functions.get(data.module, {}).get(data.function)
             if func is None:
                 self.add_input_row("error", "函数未找到", read_only=True)
                 return
 
-            import inspect
             try:
-                sig = inspect.signature(func)
-                params = list(sig.parameters.keys())
+                params, output_name = _sig_info(func)
 
-                # 创建输入框，并填入该item专属的缓存值（从 StepObject.params 或旧缓存读取）
+                # 创建输入框，并填入该步骤 StepObject.params 中保存的值
                 for param_name in params:
-                    if isinstance(data, StepObject):
-                        cached_value = data.params.get(param_name, "")
-                    else:
-                        cached_value = self.step_params_cache.get(item_id, {}).get(param_name, "")
-                    print(f"[DEBUG] 参数 '{param_name}' 的缓存值: '{cached_value}'")  # 调试
-                    edit = self.add_input_row(param_name, cached_value)
-                    # 连接实时修改：当用户修改输入框时更新该项的 StepObject.params
-                    if isinstance(data, StepObject):
-                        # connect after creation
-                        edit.textChanged.connect(lambda val, it=current, p=param_name: self.on_param_changed(it, p, val))
+                    cached_value = data.params.get(param_name, "")
+                    # 编辑完成时由 _on_param_editing_finished 更新该步骤的 StepObject.params
+                    self.add_input_row(param_name, cached_value)
 
                 # 显示输出参数
-                return_annotation = sig.return_annotation
-                if return_annotation != inspect.Signature.empty:
-                    if hasattr(return_annotation, '__name__'):
-                        output_name = return_annotation.__name__
-                    else:
-                        output_name = str(return_annotation)
+                if output_name is not None:
                     self.output_params_label.setText(output_name)
                 else:
                     self.output_params_label.setText("未知（无类型注解）")
@@ -456,118 +881,195 @@ class MainWindow(QMainWindow):
                 self.add_input_row("error", f"解析失败: {str(e)}", read_only=True)
         else:
             # control item: show appropriate param inputs
-            if isinstance(data, StepObject):
-                control_type = data.control
-            else:
-                control_type = data.get("control")
-
+            control_type = data.control
             if control_type == "if":
                 # condition expression, can reference other steps via ${#N:key} or loop vars via ${@var}
-                cond = data.params.get("condition", "") if isinstance(data, StepObject) else self.step_params_cache.get(item_id, {}).get("condition", "")
-                edit = self.add_input_row("condition", cond)
-                if isinstance(data, StepObject):
-                    edit.textChanged.connect(lambda val, it=current: self.on_param_changed(it, "condition", val))
+                self.add_input_row("condition", data.params.get("condition", ""))
             elif control_type == "for":
-                iterable = data.params.get("iterable", "") if isinstance(data, StepObject) else self.step_params_cache.get(item_id, {}).get("iterable", "")
-                varname = data.params.get("var", "_loop") if isinstance(data, StepObject) else self.step_params_cache.get(item_id, {}).get("var", "_loop")
-                edit1 = self.add_input_row("iterable", iterable)
-                edit2 = self.add_input_row("var", varname)
-                if isinstance(data, StepObject):
-                    edit1.textChanged.connect(lambda val, it=current: self.on_param_changed(it, "iterable", val))
-                    edit2.textChanged.connect(lambda val, it=current: self.on_param_changed(it, "var", val))
+                self.add_input_row("iterable", data.params.get("iterable", ""))
+                self.add_input_row("var", data.params.get("var", "_loop"))
             else:
                 # end or unknown control
                 self.output_params_label.setText("-")
 
     def load_test_functions(self):
         """加载当前目录下的测试函数"""
-        self.function_tree.clear()
+        tree = self.function_tree
+        tree.clear()
         self.test_functions = {}
-        # reset parsed return names
+        # reset parsed return names (predicted keys in the reference menus change with them)
         self.func_return_names = {}
+        self._ref_menu_version += 1
         
         # 查找 Testcase/ 目录（优先），否则回退到当前目录
         base_dir = os.path.join(os.getcwd(), 'Testcase') if os.path.isdir(os.path.join(os.getcwd(), 'Testcase')) else os.getcwd()
-        for fname in os.listdir(base_dir):
-            if fname.endswith('.py') and fname.startswith('test_') and fname != 'test_functions.py':
-                file_path = os.path.join(base_dir, fname)
-                module_name = os.path.splitext(os.path.basename(file_path))[0]
+        # 允许测试模块导入同目录下的辅助模块（如 _fast.py）
+        if base_dir not in sys.path:
+            sys.path.insert(0, base_dir)
+        seen_keys = set()
+        cache_changed = False
+        # tree items are built detached and inserted in one call at the end, so the tree
+        # lays out once instead of once per module/function
+        top_items = []
+        for module_name, file_path, st_info in self._discover_test_files(base_dir):
+            try:
+                spec = importlib.util.spec_from_file_location(module_name, file_path)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                # attempt to parse source to find return variable names or dict keys;
+                # unchanged files reuse the cached result without being read again
                 try:
-                    spec = importlib.util.spec_from_file_location(module_name, file_path)
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-                    # attempt to parse source to find return variable names or dict keys
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            src = f.read()
-                        import ast
-                        tree = ast.parse(src)
-                        func_returns = {}
-                        for node in tree.body:
-                            if isinstance(node, ast.FunctionDef):
-                                ret_names = []
-                                for st in ast.walk(node):
-                                    if isinstance(st, ast.Return) and st.value is not None:
-                                        v = st.value
-                                        # return of a simple name: return sum
-                                        if isinstance(v, ast.Name):
-                                            ret_names.append(v.id)
-                                        # return of a dict literal: return {'k': val}
-                                        elif isinstance(v, ast.Dict):
-                                            for key in v.keys:
-                                                if isinstance(key, ast.Constant):
-                                                    ret_names.append(str(key.value))
-                                if ret_names:
-                                    func_returns[node.name] = list(dict.fromkeys(ret_names))
-                        if func_returns:
-                            self.func_return_names[module_name] = func_returns
-                    except Exception:
-                        # ignore parsing errors
-                        pass
+                    key = (file_path, st_info.st_mtime_ns, st_info.st_size)
+                    seen_keys.add(key)
+                    func_returns = self._ast_cache.get(key)
+                    if func_returns is None:
+                        func_returns = self._parse_return_names(file_path)
+                        self._ast_cache[key] = func_returns
+                        cache_changed = True
+                    if func_returns:
+                        self.func_return_names[module_name] = {k: list(v) for k, v in func_returns.items()}
+                except Exception:
+                    # ignore parsing errors
+                    pass
 
-                    # 获取模块中的函数
-                    functions = []
-                    for name in dir(module):
-                        if callable(getattr(module, name)) and not name.startswith("_"):
-                            functions.append(name)
-                            # 保存函数引用
-                            if module_name not in self.test_functions:
-                                self.test_functions[module_name] = {}
-                            self.test_functions[module_name][name] = getattr(module, name)
-
-                    # 添加到函数树
-                    if functions:
-                        module_item = QTreeWidgetItem([module_name])
-                        self.function_tree.addTopLevelItem(module_item)
-                        for func_name in functions:
-                            func_item = QTreeWidgetItem([func_name])
-                            module_item.addChild(func_item)
-                except Exception as e:
-                    print(f"无法加载模块 {module_name}: {e}")
-        
-        self.function_tree.expandAll()
+                # 获取模块中的函数：只取本文件定义的公开函数（含 lru_cache 等包装后的函数），
+                # 不含导入的名字和类
+                functions = []
+                for name, value in vars(module).items():
+                    if name.startswith("_"):
+                        continue
+                    if (callable(value) and not inspect.isclass(value)
+                            and getattr(value, '__module__', None) == module_name):
+                        functions.append(name)
+                        # 保存函数引用
+                        self.test_functions.setdefault(module_name, {})[name] = value
+
+                # 添加到函数树（传入父项即完成挂接，无需逐个 addChild）
+                if functions:
+                    module_item = QTreeWidgetItem([module_name])
+                    for func_name in functions:
+                        QTreeWidgetItem(module_item, [func_name])
+                    top_items.append(module_item)
+            except Exception as e:
+                print(f"无法加载模块 {module_name}: {e}")
+
+        # drop entries for files from this directory that changed or were removed, then persist
+        stale = [k for k in self._ast_cache if os.path.dirname(k[0]) == base_dir and k not in seen_keys]
+        for k in stale:
+            del self._ast_cache[k]
+        if cache_changed or stale:
+            self._save_ast_cache()
 
         # 添加流程控制分类（可拖拽到序列中作为控制节点）
         control_item = QTreeWidgetItem(["流程控制"])
         for ctrl in ["if", "for", "end", "break"]:
-            child = QTreeWidgetItem([ctrl])
-            control_item.addChild(child)
-        self.function_tree.addTopLevelItem(control_item)
-        self.function_tree.expandItem(control_item)
+            QTreeWidgetItem(control_item, [ctrl])
+        top_items.append(control_item)
+
+        tree.setUpdatesEnabled(False)
+        tree.blockSignals(True)
+        try:
+            tree.addTopLevelItems(top_items)
+            tree.expandAll()
+        finally:
+            tree.blockSignals(False)
+            tree.setUpdatesEnabled(True)
         
+    @staticmethod
+    def _discover_test_files(base_dir):
+        """List test modules in base_dir as (module_name, file_path, stat_result), sorted by name.
+
+        os.scandir hands back the directory entries with their type and stat info,
+        so no separate stat call is needed per file.
+        """
+        test_files = []
+        with os.scandir(base_dir) as it:
+            for entry in it:
+                name = entry.name
+                if not (name.startswith('test_') and name.endswith('.py') and name != 'test_functions.py'):
+                    continue
+                if not entry.is_file():
+                    continue
+                test_files.append((name[:-3], entry.path, entry.stat()))
+        test_files.sort(key=lambda item: item[0])
+        return test_files
+
+    def _load_ast_cache(self):
+        """Load the persisted return-name cache; a missing or unreadable file gives an empty cache.
+
+        On disk the cache is a JSON list of [file_path, mtime_ns, size, {func_name: [names]}].
+        """
+        try:
+            with open(self._ast_cache_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            cache = {}
+            for file_path, mtime_ns, size, func_returns in entries:
+                if isinstance(func_returns, dict):
+                    cache[(file_path, mtime_ns, size)] = func_returns
+            return cache
+        except Exception:
+            return {}
+
+    def _save_ast_cache(self):
+        """Write the return-name cache to disk. Failures are ignored; the cache is only an optimization.
+
+        Written to a temporary file first and moved into place, so an interrupted write
+        never leaves a truncated cache behind.
+        """
+        entries = [[file_path, mtime_ns, size, func_returns]
+                   for (file_path, mtime_ns, size), func_returns in self._ast_cache.items()]
+        tmp_path = self._ast_cache_path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self._ast_cache_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self._ast_cache_path)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _parse_return_names(file_path):
+        """Parse a test file and return {func_name: [return_var_names]} for its top-level functions."""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            src = f.read()
+        tree = ast.parse(src)
+        func_returns = {}
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef):
+                collector = _ReturnCollector()
+                for stmt in node.body:
+                    collector.visit(stmt)
+                ret_names = []
+                for v in collector.returns:
+                    # return of a simple name: return sum
+                    if isinstance(v, ast.Name):
+                        ret_names.append(v.id)
+                    # return of a dict literal: return {'k': val}
+                    elif isinstance(v, ast.Dict):
+                        for key in v.keys:
+                            if isinstance(key, ast.Constant):
+                                ret_names.append(str(key.value))
+                if ret_names:
+                    func_returns[node.name] = list(dict.fromkeys(ret_names))
+        return func_returns
+
     def clear_sequence(self):
         """清空测试序列"""
         # first clear stored params/outputs on each step object
-        for i in range(self.sequence_list.count()):
-            it = self.sequence_list.item(i)
-            data = it.data(Qt.ItemDataRole.UserRole)
-            if isinstance(data, StepObject):
-                data.params.clear()
-                data.outputs.clear()
-
-        # clear the visual list and caches
-        self.sequence_list.clear()
-        self.step_params_cache.clear()
+        for data in self.sequence_list.steps():
+            data.params.clear()
+            data.outputs.clear()
+            data.ref_keys = None
+
+        # clear the visual list and caches; a model reset does not report a current-row
+        # change, so drop the parameter editor explicitly
+        self.sequence_model.clear()
+        self._editing_step = None
+        self.clear_param_inputs()
+        self._block_pairs = {}
+        self._expr_code_cache.clear()
+        self._step_arg_plans.clear()
+        self._watcher_step_labels = None
         # reset execution state and clear any markers
         self.exec_state = None
         try:
@@ -576,229 +1078,271 @@ class MainWindow(QMainWindow):
             pass
 
         # clear watcher and output
-        self.update_output()
+        self._pending_log.clear()
+        self._rebuild_sequence_text()
         self.update_watcher({})
         self.output_text.clear()
         
-    def update_output(self):
-        """更新输出显示"""
-        sequence_text = "当前测试序列:\n"
-        for i in range(self.sequence_list.count()):
-            item = self.sequence_list.item(i)
-            # item.text() may include an exec marker; strip any marker suffix before building the output
-            base = item.text().split('  ')[0]
-            sequence_text += f"{i+1}. {base}\n"
-        self.output_text.setText(sequence_text)
-        # refresh visible numbering and exec marker
-        try:
-            idx = None
-            if hasattr(self, 'exec_state') and self.exec_state is not None:
-                idx = self.exec_state.get('index')
-            self.mark_exec_index(idx)
-        except Exception:
-            try:
-                self.mark_exec_index(None)
-            except Exception:
-                pass
+    def _rebuild_sequence_text(self):
+        """Rewrite the sequence listing in the output pane.
+
+        Only structural changes (drops, moves, deletes, clear) call this. Execution never
+        does: moving the exec marker goes through mark_exec_index, which repaints at most
+        the old and new marker rows.
+        """
+        parts = ["当前测试序列:"]
+        for i, data in enumerate(self.sequence_list.steps()):
+            parts.append(f"{i+1}. {data.display_text}")
+        # build the text once instead of growing a string with +=
+        parts.append("")
+        txt = "\n".join(parts)
+        # queued log lines would otherwise land after the listing that replaces them
+        self._flush_pending_ui()
+        # skip the document re-layout when the listing is already what is shown
+        if self.output_text.toPlainText() != txt:
+            self.output_text.setText(txt)
 
     # Executor helpers and state for step execution
     def _safe_eval(self, expr, local_vars=None):
         if local_vars is None:
             local_vars = {}
         try:
-            import ast
             return ast.literal_eval(expr)
         except Exception:
             try:
+                # conditions and iterables are re-evaluated on every loop pass; compile each source string once
+                code = self._expr_code_cache.get(expr)
+                if code is None:
+                    code = compile(expr, '<teststand>', 'eval')
+                    self._expr_code_cache[expr] = code
                 safe_globals = {"__builtins__": None, 'True': True, 'False': False, 'None': None}
-                return eval(expr, safe_globals, local_vars)
+                return eval(code, safe_globals, local_vars)
             except Exception:
                 return False
 
+    def _for_iterator(self, iterable_val, runtime_vars):
+        """Normalize a resolved for-iterable without copying values that are already sequences.
+
+        An int n loops over range(n) and lists/tuples are used as they are. Only text is
+        evaluated again as an expression; anything that cannot be iterated gives an empty loop.
+        """
+        if isinstance(iterable_val, int):
+            return range(iterable_val)
+        if isinstance(iterable_val, (list, tuple, range)):
+            return iterable_val
+        if isinstance(iterable_val, str):
+            # try to eval as python expression
+            iterable_val = self._safe_eval(iterable_val, runtime_vars)
+        try:
+            return list(iterable_val)
+        except Exception:
+            return []
+
+    def _build_args(self, step_data, func, runtime_vars):
+        """Resolve and convert the keyword arguments for one function step.
+
+        The (name, raw value, conversion, constant) plan is built on the step's first run and
+        reused until its parameters are edited or the function object changes (reload).
+        Raw values without references always resolve to the same literal, so those are
+        resolved and converted once here and stored as the entry's constant.
+        """
+        plan = self._step_arg_plans.get(step_data.id)
+        if plan is None or plan[0] is not func:
+            plan = (func, self._make_arg_plan(step_data, func))
+            self._step_arg_plans[step_data.id] = plan
+
+        resolve = self.resolve_references
+        args = {}
+        for param_name, raw, coerce, const in plan[1]:
+            if const is not _MISSING:
+                args[param_name] = const
+                continue
+            value = resolve(raw, runtime_vars)
+            if coerce is not None:
+                try:
+                    value = coerce(value)
+                except Exception as e:
+                    self._log(f"参数 '{param_name}' 类型转换失败: {e}")
+            args[param_name] = value
+        return args
+
+    def _make_arg_plan(self, step_data, func):
+        """Build the argument plan entries used by _build_args for one step."""
+        params = step_data.params
+        entries = []
+        for name, coerce in _param_coercers(func):
+            raw = params.get(name, '')
+            const = _MISSING
+            if type(raw) is str and '${' not in raw:
+                value = self.resolve_references(raw)
+                try:
+                    if coerce is not None:
+                        value = coerce(value)
+                except Exception:
+                    # leave it to _build_args so the conversion failure is logged on every run
+                    pass
+                else:
+                    if type(value) in _IMMUTABLE_TYPES:
+                        const = value
+            entries.append((name, raw, coerce, const))
+        return tuple(entries)
+
+    def _store_outputs(self, step_data, args, result):
+        """Record a function step's result in step_data.outputs.
+
+        A dict result is merged as-is. Any other value is stored under 'return', under every
+        parameter whose passed value equals it (the common "returns an input" pattern) and
+        under the return names predicted from the source.
+        """
+        outputs = step_data.outputs
+        # the output keys may change, so the reference-menu keys and menus have to be rebuilt
+        step_data.ref_keys = None
+        self._ref_menu_version += 1
+        if isinstance(result, dict):
+            outputs.update(result)
+            return
+        outputs['return'] = result
+        try:
+            # hashable arguments go through a reverse lookup; only unhashable ones are compared one by one
+            value_to_names = {}
+            unhashable = []
+            for pn, pv in args.items():
+                try:
+                    value_to_names.setdefault(pv, []).append(pn)
+                except TypeError:
+                    unhashable.append((pn, pv))
+            try:
+                matched = value_to_names.get(result, ())
+            except TypeError:
+                matched = ()
+            for pn in matched:
+                outputs[pn] = result
+            for pn, pv in unhashable:
+                if pv == result:
+                    outputs[pn] = result
+            # also map any predicted return names (parsed from source) to the returned value
+            for pred in self.func_return_names.get(step_data.module, {}).get(step_data.function, ()):
+                if pred not in outputs:
+                    outputs[pred] = result
+        except Exception:
+            # don't break execution on mapping issues
+            pass
+
     def _run_block(self, start_idx, end_idx, runtime_vars, max_actions=None):
         """Execute items from start_idx..end_idx. If max_actions is set, stop after that many actions (control evaluations or function calls).
 
+        runtime_vars is updated in place (for-loop variables are restored on exit), so callers
+        pass their own dict rather than a copy.
+
         Returns (new_index, runtime_vars, actions_done)
         """
         actions = 0
         i = start_idx
         while i <= end_idx:
-            item = self.sequence_list.item(i)
-            step_data = item.data(Qt.ItemDataRole.UserRole)
+            step_data = self.sequence_list.step(i)
 
             # Determine control or function
-            if isinstance(step_data, StepObject):
-                if step_data.type == 'control':
-                    ctrl = step_data.control
-                else:
-                    ctrl = None
-            else:
-                ctrl = step_data.get('control') if isinstance(step_data, dict) else None
+            kind = step_data.kind
 
-            if ctrl == 'if':
-                match = self.find_matching_end(i)
-                cond_raw = step_data.params.get('condition', '') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('condition', '')
+            if kind == _K_IF:
+                match = self._block_pairs.get(i, -1)
+                cond_raw = step_data.params.get('condition', '')
                 cond_val = self.resolve_references(cond_raw, runtime_vars)
                 cond_bool = cond_val if isinstance(cond_val, bool) else self._safe_eval(str(cond_val), runtime_vars)
-                self.output_text.append(f"IF condition ({cond_raw}) -> {cond_bool}")
-                self.update_watcher(runtime_vars)
+                self._log(f"IF condition ({cond_raw}) -> {cond_bool}")
+                self._queue_watcher(runtime_vars)
                 actions += 1
                 if max_actions is not None and actions >= max_actions:
                     return (i+1, runtime_vars, actions)
                 if cond_bool:
-                    if match != -1 and match > i:
-                        ni, nv, a = self._run_block(i+1, match-1, runtime_vars, None if max_actions is None else (max_actions - actions))
-                        actions += a
-                        runtime_vars = nv
-                        i = match + 1
-                        if max_actions is not None and actions >= max_actions:
-                            return (i, runtime_vars, actions)
-                        continue
-                    else:
-                        i += 1
-                        continue
+                    # the body runs in this same loop; its matching 'end' is a no-op step,
+                    # so no nested _run_block call is needed
+                    i += 1
+                    continue
                 else:
                     i = match + 1 if match != -1 else i + 1
                     continue
-            elif ctrl == 'for':
-                match = self.find_matching_end(i)
-                iterable_raw = step_data.params.get('iterable', '') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('iterable', '')
-                varname = step_data.params.get('var', '_loop') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('var', '_loop')
+            elif kind == _K_FOR:
+                match = self._block_pairs.get(i, -1)
+                iterable_raw = step_data.params.get('iterable', '')
+                varname = step_data.params.get('var', '_loop')
                 iterable_val = self.resolve_references(iterable_raw, runtime_vars)
-                if isinstance(iterable_val, int):
-                    iterator = range(iterable_val)
-                elif isinstance(iterable_val, (list, tuple)):
-                    iterator = iterable_val
-                else:
-                    try:
-                        iterator = list(self._safe_eval(str(iterable_val), runtime_vars))
-                    except Exception:
-                        iterator = []
+                iterator = self._for_iterator(iterable_val, runtime_vars)
 
-                self.output_text.append(f"FOR over {iterable_raw} -> {list(iterator)}")
-                self.update_watcher(runtime_vars)
+                self._log(f"FOR over {iterable_raw} (len={len(iterator)})")
+                self._queue_watcher(runtime_vars)
                 actions += 1
                 if max_actions is not None and actions >= max_actions:
                     return (i+1, runtime_vars, actions)
                 if match != -1 and match > i:
-                    for val in iterator:
-                        new_vars = dict(runtime_vars)
-                        new_vars[varname] = val
-                        try:
-                            ni, nv, a = self._run_block(i+1, match-1, new_vars, None if max_actions is None else (max_actions - actions))
-                            actions += a
-                        except BreakLoop as ex:
-                            # inner block requested a break: consume its reported actions and stop iterating
-                            actions += ex.actions
-                            runtime_vars = ex.runtime_vars or runtime_vars
-                            # if we've hit the max actions for a step-run, resume after the for-block
-                            if max_actions is not None and actions >= max_actions:
-                                return (match+1, runtime_vars, actions)
-                            break
+                    # bind the loop variable in place instead of copying runtime_vars on every pass;
+                    # the variable's previous binding is restored once the loop is left
+                    saved = runtime_vars.get(varname, _MISSING)
+                    try:
+                        for val in iterator:
+                            runtime_vars[varname] = val
+                            try:
+                                ni, nv, a = self._run_block(i+1, match-1, runtime_vars, None if max_actions is None else (max_actions - actions))
+                                actions += a
+                            except BreakLoop as ex:
+                                # inner block requested a break: consume its reported actions and stop iterating
+                                actions += ex.actions
+                                # if we've hit the max actions for a step-run, resume after the for-block
+                                if max_actions is not None and actions >= max_actions:
+                                    return (match+1, runtime_vars, actions)
+                                break
+                    finally:
+                        _restore_var(runtime_vars, varname, saved)
                     i = match + 1
                     continue
                 else:
                     i += 1
                     continue
-            elif ctrl == 'break':
+            elif kind == _K_BREAK:
                 # signal to the enclosing for-loop to stop
                 actions += 1
-                self.output_text.append("BREAK")
-                self.update_watcher(runtime_vars)
+                self._log("BREAK")
+                self._queue_watcher(runtime_vars)
                 # raise to inform the caller (the parent for-handler) to stop iterating
                 raise BreakLoop(actions=1, runtime_vars=runtime_vars)
-            elif ctrl == 'end':
+            elif kind == _K_END:
                 i += 1
                 continue
 
             # function step
-            if isinstance(step_data, StepObject):
-                if step_data.type == 'function':
-                    module_name = step_data.module
-                    func_name = step_data.function
-                    func = self.test_functions.get(module_name, {}).get(func_name)
-                else:
-                    func = None
-            else:
-                if isinstance(step_data, dict) and step_data.get('type') == 'function':
-                    module_name = step_data.get('module')
-                    func_name = step_data.get('function')
-                    func = self.test_functions.get(module_name, {}).get(func_name)
-                else:
-                    func = None
+            module_name = step_data.module
+            func_name = step_data.function
+            func = self.test_functions.get(module_name, {}).get(func_name)
 
             if func is None:
-                self.output_text.append(f"跳过未知步骤或控制: {item.text()}")
-                self.update_watcher(runtime_vars)
+                self._log(f"跳过未知步骤或控制: {self.sequence_model.index(i).data()}")
+                self._queue_watcher(runtime_vars)
                 i += 1
                 continue
 
-            self.output_text.append(f"执行: {module_name}.{func_name}...")
-            self.update_watcher(runtime_vars)
-
-            import inspect
-            sig = inspect.signature(func)
-            params = sig.parameters
-            args = {}
+            self._log(f"执行: {module_name}.{func_name}...")
+            self._queue_watcher(runtime_vars)
 
-            for param_name in params.keys():
-                if isinstance(step_data, StepObject):
-                    raw = step_data.params.get(param_name, '')
-                else:
-                    raw = self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get(param_name, '')
-                resolved = self.resolve_references(raw, runtime_vars)
-                param_type = params[param_name].annotation
-                if param_type != inspect.Parameter.empty:
-                    try:
-                        if param_type == bool:
-                            value = bool(resolved) if isinstance(resolved, bool) else str(resolved).lower() in ('true', '1', 'yes', 'on')
-                        elif param_type in (int, float):
-                            value = param_type(resolved)
-                        else:
-                            value = resolved
-                    except Exception as e:
-                        self.output_text.append(f"参数 '{param_name}' 类型转换失败: {e}")
-                        value = resolved
-                else:
-                    value = resolved
-                args[param_name] = value
+            args = self._build_args(step_data, func, runtime_vars)
 
             try:
                 result = func(**args)
-                if isinstance(step_data, StepObject):
-                    if isinstance(result, dict):
-                        step_data.outputs.update(result)
-                    else:
-                        # store generic return and also map to any param name whose passed value equals the return
-                        step_data.outputs['return'] = result
-                        try:
-                            for pn, pv in args.items():
-                                # simple equality check to map common pattern where function returns an input value
-                                if pv == result:
-                                    step_data.outputs[pn] = result
-                                # also map any predicted return names (parsed from source) to the returned value
-                                preds = self.func_return_names.get(step_data.module, {}).get(step_data.function, [])
-                                for pred in preds:
-                                    if pred not in step_data.outputs:
-                                        step_data.outputs[pred] = result
-                        except Exception:
-                            # don't break execution on mapping issues
-                            pass
+                self._store_outputs(step_data, args, result)
                 # determine success: None or truthy -> success
-                success = (result is None) or bool(result)
-                self.output_text.append(f"{'成功' if success else '失败'}")
+                success = _is_success(result)
+                self._log(f"{'成功' if success else '失败'}")
                 try:
-                    self.set_item_status(item, success)
+                    self.set_item_status(i, success)
                 except Exception:
                     pass
             except Exception as e:
-                self.output_text.append(f"错误: {str(e)}")
+                self._log(f"错误: {str(e)}")
                 try:
-                    self.set_item_status(item, False)
+                    self.set_item_status(i, False)
                 except Exception:
                     pass
 
-            self.update_watcher(runtime_vars)
+            self._queue_watcher(runtime_vars)
             actions += 1
             if max_actions is not None and actions >= max_actions:
                 return (i+1, runtime_vars, actions)
@@ -814,86 +1358,78 @@ class MainWindow(QMainWindow):
         start = self.exec_state['index']
         end = self.sequence_list.count() - 1
         if start > end:
-            self.output_text.append("已到序列末尾；请重置执行以重新开始。")
+            self._log("已到序列末尾；请重置执行以重新开始。")
             return
         # show marker at current position before executing
         self.mark_exec_index(start)
         # Helper: locate innermost loop that contains index 'start'
         def find_enclosing_loop(start_idx):
-            ls = self.exec_state.get('loop_stack', [])
+            ls = self.exec_state['loop_stack']
             for entry in reversed(ls):
-                if entry['start'] < start_idx <= entry['end']:
+                if entry.start < start_idx <= entry.end:
                     return entry
             return None
 
-        item = self.sequence_list.item(start)
-        step_data = item.data(Qt.ItemDataRole.UserRole)
+        step_data = self.sequence_list.step(start)
 
         # If the current item is a for-header and we're not already inside that for-loop,
         # initialize loop state and set the first loop variable value so the next step
         # will execute the inner block with the loop var present.
-        if isinstance(step_data, StepObject) and step_data.type == 'control' and step_data.control == 'for':
+        if step_data.kind == _K_FOR:
             # avoid double-initializing if we already have a loop stack entry for this start
             existing = None
-            for e in self.exec_state.get('loop_stack', []):
-                if e['start'] == start:
+            for e in self.exec_state['loop_stack']:
+                if e.start == start:
                     existing = e
                     break
 
-            match = self.find_matching_end(start)
-            iterable_raw = step_data.params.get('iterable', '')
-            varname = step_data.params.get('var', '_loop')
-            iterable_val = self.resolve_references(iterable_raw, dict(self.exec_state['vars']))
-            # normalize iterable same as full-run/_run_block
-            if isinstance(iterable_val, int):
-                iterator = list(range(iterable_val))
-            elif isinstance(iterable_val, (list, tuple)):
-                iterator = list(iterable_val)
-            else:
-                try:
-                    iterator = list(self._safe_eval(str(iterable_val), dict(self.exec_state['vars'])))
-                except Exception:
-                    iterator = []
-
-            # consume the 'for' header as this step
-            if not iterator:
-                # empty iterator: skip the whole for-block
-                ni = match + 1 if match != -1 else start + 1
-                self.exec_state['index'] = ni
-                self.output_text.append(f"单步执行: 空迭代对象，跳过 for-block，下一索引 {ni}")
-                if self.exec_state['index'] <= end:
-                    self.mark_exec_index(self.exec_state['index'])
-                else:
-                    self.mark_exec_index(None)
-                return
-
-            # initialize loop stack entry
+            match = self._block_pairs.get(start, -1)
             if existing is None:
-                entry = {'start': start, 'end': match, 'iterator': iterator, 'pos': 0, 'var': varname}
-                self.exec_state.setdefault('loop_stack', []).append(entry)
+                iterable_raw = step_data.params.get('iterable', '')
+                varname = step_data.params.get('var', '_loop')
+                iterable_val = self.resolve_references(iterable_raw, self.exec_state['vars'])
+                # normalize iterable same as full-run/_run_block; the result (range, list or tuple)
+                # is indexed directly, so an int count stays a lazy range
+                iterator = self._for_iterator(iterable_val, self.exec_state['vars'])
+
+                # consume the 'for' header as this step
+                if not iterator:
+                    # empty iterator: skip the whole for-block
+                    ni = match + 1 if match != -1 else start + 1
+                    self.exec_state['index'] = ni
+                    self._log(f"单步执行: 空迭代对象，跳过 for-block，下一索引 {ni}")
+                    if self.exec_state['index'] <= end:
+                        self.mark_exec_index(self.exec_state['index'])
+                    else:
+                        self.mark_exec_index(None)
+                    return
+
+                # initialize loop stack entry; the iterator is built once per loop entry
+                entry = _LoopFrame(start, match, iterator, varname)
+                self.exec_state['loop_stack'].append(entry)
             else:
+                # re-entering a loop that is still on the stack reuses its values
                 entry = existing
+                varname = entry.var
 
             # set loop var to first element and move to first inner index
-            new_vars = dict(self.exec_state['vars'])
-            new_vars[varname] = entry['iterator'][entry['pos']]
-            self.exec_state['vars'] = new_vars
+            self.exec_state['vars'][varname] = entry.iterator[entry.pos]
             self.exec_state['index'] = start + 1 if match != -1 else start + 1
             # update UI
             self.mark_exec_index(self.exec_state['index'])
-            self.output_text.append(f"进入 for: 设 {varname} = {entry['iterator'][entry['pos']]}，下一索引 {self.exec_state['index']}")
+            self._log(f"进入 for: 设 {varname} = {entry.iterator[entry.pos]}，下一索引 {self.exec_state['index']}")
             return
 
         # If we're inside a loop body, run one action within that loop and handle iteration bookkeeping
         enclosing = find_enclosing_loop(start)
         if enclosing is not None:
             try:
-                ni, nv, a = self._run_block(start, enclosing['end'], dict(self.exec_state['vars']), max_actions=1)
+                ni, nv, a = self._run_block(start, enclosing.end, self.exec_state['vars'], max_actions=1)
             except BreakLoop as ex:
                 # break breaks out of this enclosing loop: remove this loop entry and resume after it
                 # consume the break's runtime_vars if provided
                 try:
-                    self.exec_state['vars'] = ex.runtime_vars or dict(self.exec_state['vars'])
+                    self.exec_state['vars'] = ex.runtime_vars or self.exec_state['vars']
                 except Exception:
                     pass
                 # pop the loop entry
@@ -901,28 +1437,28 @@ class MainWindow(QMainWindow):
                     self.exec_state['loop_stack'].remove(enclosing)
                 except Exception:
                     pass
-                ni = enclosing['end'] + 1
+                ni = enclosing.end + 1
                 self.exec_state['index'] = ni
                 # update marker/UI
                 if self.exec_state['index'] <= end:
                     self.mark_exec_index(self.exec_state['index'])
                 else:
                     self.mark_exec_index(None)
-                self.output_text.append(f"在循环内遇到 break，跳至索引 {ni}")
+                self._log(f"在循环内遇到 break，跳至索引 {ni}")
                 return
 
             # update runtime vars
             self.exec_state['vars'] = nv
 
             # if inner block finished (ni passed the end), advance iterator
-            if ni > enclosing['end']:
-                enclosing['pos'] += 1
-                if enclosing['pos'] < len(enclosing['iterator']):
+            if ni > enclosing.end:
+                enclosing.pos += 1
+                if enclosing.pos < enclosing.length:
                     # set next loop var and point back to first inner item
-                    self.exec_state['vars'][enclosing['var']] = enclosing['iterator'][enclosing['pos']]
-                    self.exec_state['index'] = enclosing['start'] + 1
+                    self.exec_state['vars'][enclosing.var] = enclosing.iterator[enclosing.pos]
+                    self.exec_state['index'] = enclosing.start + 1
                     self.mark_exec_index(self.exec_state['index'])
-                    self.output_text.append(f"循环下次迭代: 设 {enclosing['var']} = {enclosing['iterator'][enclosing['pos']]}，下一索引 {self.exec_state['index']}")
+                    self._log(f"循环下次迭代: 设 {enclosing.var} = {enclosing.iterator[enclosing.pos]}，下一索引 {self.exec_state['index']}")
                     return
                 else:
                     # loop fully completed: pop and resume after end
@@ -930,12 +1466,12 @@ class MainWindow(QMainWindow):
                         self.exec_state['loop_stack'].remove(enclosing)
                     except Exception:
                         pass
-                    self.exec_state['index'] = enclosing['end'] + 1
+                    self.exec_state['index'] = enclosing.end + 1
                     if self.exec_state['index'] <= end:
                         self.mark_exec_index(self.exec_state['index'])
                     else:
                         self.mark_exec_index(None)
-                    self.output_text.append(f"循环完成，下一索引 {self.exec_state['index']}")
+                    self._log(f"循环完成，下一索引 {self.exec_state['index']}")
                     return
             else:
                 # still inside inner block; resume at returned index
@@ -944,17 +1480,17 @@ class MainWindow(QMainWindow):
                     self.mark_exec_index(self.exec_state['index'])
                 else:
                     self.mark_exec_index(None)
-                self.output_text.append(f"单步执行: 完成 {a} 个操作，下一索引 {ni}")
+                self._log(f"单步执行: 完成 {a} 个操作，下一索引 {ni}")
                 return
 
         # default: not a for header nor inside a loop - just execute one action normally
         try:
-            ni, nv, a = self._run_block(start, end, dict(self.exec_state['vars']), max_actions=1)
+            ni, nv, a = self._run_block(start, end, self.exec_state['vars'], max_actions=1)
         except BreakLoop as ex:
             # break encountered with no enclosing for-block in this call chain;
             # treat it as one consumed action and advance past the current index
             ni = start + 1
-            nv = ex.runtime_vars or dict(self.exec_state['vars'])
+            nv = ex.runtime_vars or self.exec_state['vars']
             a = ex.actions
         else:
             nv = nv
@@ -965,7 +1501,7 @@ class MainWindow(QMainWindow):
             self.mark_exec_index(self.exec_state['index'])
         else:
             self.mark_exec_index(None)
-        self.output_text.append(f"单步执行: 完成 {a} 个操作，下一索引 {ni}")
+        self._log(f"单步执行: 完成 {a} 个操作，下一索引 {ni}")
 
     def reset_executor(self):
         """Reset execution state and clear runtime variables and per-step outputs.
@@ -980,19 +1516,12 @@ class MainWindow(QMainWindow):
         self.exec_state = {'index': 0, 'vars': {}, 'loop_stack': []}
 
         # clear outputs collected on each step so watcher no longer shows previous run values
-        for i in range(self.sequence_list.count()):
-            it = self.sequence_list.item(i)
-            data = it.data(Qt.ItemDataRole.UserRole)
-            if isinstance(data, StepObject):
-                try:
-                    data.outputs.clear()
-                    # clear any status icon
-                    try:
-                        it.setIcon(QIcon())
-                    except Exception:
-                        pass
-                except Exception:
-                    pass
+        for data in self.sequence_list.steps():
+            data.outputs.clear()
+            data.ref_keys = None
+        self._ref_menu_version += 1
+        # clear any status icon
+        self.sequence_model.clear_status()
 
         # clear global runtime variables if present
         try:
@@ -1003,348 +1532,271 @@ class MainWindow(QMainWindow):
         # refresh watcher and execution marker
         self.update_watcher({})
         self.mark_exec_index(self.exec_state['index'])
-        self.output_text.append("执行状态已重置；已清除运行时变量与步骤输出")
+        self._log("执行状态已重置；已清除运行时变量与步骤输出")
+
+    def _log(self, msg):
+        """Queue a line for the output panel; queued lines are appended together by _flush_pending_ui."""
+        self._pending_log.append(msg)
+        if not self._ui_flush_timer.isActive():
+            self._ui_flush_timer.start()
+
+    def _queue_watcher(self, runtime_vars):
+        """Schedule a watcher refresh; only the latest state queued before the next flush is shown."""
+        self._pending_vars = runtime_vars
+        if not self._ui_flush_timer.isActive():
+            self._ui_flush_timer.start()
+
+    def _flush_pending_ui(self):
+        """Append the queued log lines in one call and apply the pending watcher refresh."""
+        self._ui_flush_timer.stop()
+        if self._pending_log:
+            self.output_text.append("\n".join(self._pending_log))
+            self._pending_log.clear()
+        if self._pending_vars is not None:
+            self.update_watcher(self._pending_vars)
 
     def update_watcher(self, runtime_vars):
         """Refresh the watcher tree showing variables organized by sequence steps."""
-        self.watcher_tree.clear()
-        
+        # a direct refresh supersedes any queued one
+        self._pending_vars = None
+        # describe the wanted tree as (text, children) pairs, then diff it against the items
+        # already shown: only changed texts are set and only the delta is inserted/removed
+        spec = []
+
+        # step titles only change with the sequence structure, so they are formatted once per change
+        steps = self.sequence_list.steps()
+        labels = self._watcher_step_labels
+        if labels is None or len(labels) != len(steps):
+            labels = self._watcher_step_labels = [
+                f"步骤 {i+1}: {data.display_text}" for i, data in enumerate(steps)]
+
         # Show variables organized by sequence steps
-        for i in range(self.sequence_list.count()):
-            it = self.sequence_list.item(i)
-            data = it.data(Qt.ItemDataRole.UserRole)
-            
-            if not isinstance(data, StepObject):
-                continue
-                
-            # Create a top-level node for this step
-            step_node = QTreeWidgetItem([f"步骤 {i+1}: {it.text()}"])
-            
+        for i, data in enumerate(steps):
+            children = []
+
             if data.type == 'function':
                 # Function steps show both inputs and outputs
-                inputs_node = QTreeWidgetItem(["输入参数"])
-                for k, v in data.params.items():
-                    inputs_node.addChild(QTreeWidgetItem([f"{k}: {v}"]))
-                step_node.addChild(inputs_node)
-                
-                outputs_node = QTreeWidgetItem(["输出结果"])
-                for k, v in data.outputs.items():
-                    outputs_node.addChild(QTreeWidgetItem([f"{k}: {v}"]))
-                step_node.addChild(outputs_node)
-                
+                children.append(("输入参数", [(f"{k}: {v}", ()) for k, v in data.params.items()]))
+                children.append(("输出结果", [(f"{k}: {v}", ()) for k, v in data.outputs.items()]))
+
             elif data.type == 'control':
                 # Control steps show their specific parameters
                 if data.control == 'if':
-                    ctrl_node = QTreeWidgetItem(["条件"])
                     condition = data.params.get('condition', '')
-                    ctrl_node.addChild(QTreeWidgetItem([f"表达式: {condition}"]))
-                    step_node.addChild(ctrl_node)
-                    
+                    children.append(("条件", [(f"表达式: {condition}", ())]))
+
                 elif data.control == 'for':
-                    ctrl_node = QTreeWidgetItem(["循环"])
                     iterable = data.params.get('iterable', '')
                     varname = data.params.get('var', '_loop')
-                    ctrl_node.addChild(QTreeWidgetItem([f"迭代对象: {iterable}"]))
-                    ctrl_node.addChild(QTreeWidgetItem([f"循环变量: {varname}"]))
-                    step_node.addChild(ctrl_node)
-                    
-            self.watcher_tree.addTopLevelItem(step_node)
+                    children.append(("循环", [(f"迭代对象: {iterable}", ()), (f"循环变量: {varname}", ())]))
+
+            spec.append((labels[i], children))
 
         # Runtime Variables (e.g., loop variables)
         if runtime_vars:
-            runtime_node = QTreeWidgetItem(["运行时变量"])
-            for k, v in runtime_vars.items():
-                runtime_node.addChild(QTreeWidgetItem([f"{k}: {v}"]))
-            self.watcher_tree.addTopLevelItem(runtime_node)
-            
+            spec.append(("运行时变量", [(f"{k}: {v}", ()) for k, v in runtime_vars.items()]))
+
         # Global Variables
         gvars = getattr(self, 'global_vars', {})
         if gvars:
-            globals_node = QTreeWidgetItem(["全局变量"])
-            for k, v in gvars.items():
-                globals_node.addChild(QTreeWidgetItem([f"{k}: {v}"]))
-            self.watcher_tree.addTopLevelItem(globals_node)
+            spec.append(("全局变量", [(f"{k}: {v}", ()) for k, v in gvars.items()]))
+
+        tree = self.watcher_tree
+        tree.setUpdatesEnabled(False)
+        tree.blockSignals(True)
+        try:
+            _sync_tree_items(tree.invisibleRootItem(), spec)
+        finally:
+            tree.blockSignals(False)
+            tree.setUpdatesEnabled(True)
         
     def mark_exec_index(self, idx):
-        """Visually mark the execution index in the sequence list by appending an arrow to the item's text.
+        """Visually mark the execution index in the sequence list with an arrow after the row's label.
 
         Args:
             idx (int|None): index to mark, or None to clear all markers.
         """
-        # Rebuild each item's displayed text to include a leading index and an optional exec marker.
-        for i in range(self.sequence_list.count()):
-            item = self.sequence_list.item(i)
-            data = item.data(Qt.ItemDataRole.UserRole)
-            # compute base label from StepObject when possible to avoid accumulating arrows
-            if isinstance(data, StepObject):
-                if data.type == 'function':
-                    base = f"{data.module}.{data.function}"
-                else:
-                    base = data.control
-            else:
-                # fallback: strip any previous arrow suffix
-                base = item.text().split('  ')[0]
-
-            display = f"{i+1}. {base}"
-            if idx is not None and i == idx:
-                display = f"{display}  <-"
-            item.setText(display)
+        # the model renders the leading index and the marker; only the old and new rows repaint
+        self.sequence_model.set_exec_index(idx)
         
     def run_sequence(self):
         """运行测试序列"""
-        output = "开始执行测试序列...\n"
-        self.output_text.setText(output)
+        # anything still queued from a previous step-run would be wiped by the restart below
+        self._pending_log.clear()
+        self.output_text.setText("开始执行测试序列...")
         QApplication.processEvents()  # 更新界面
 
-        def safe_eval(expr, local_vars=None):
-            if local_vars is None:
-                local_vars = {}
-            try:
-                import ast
-                return ast.literal_eval(expr)
-            except Exception:
-                try:
-                    safe_globals = {"__builtins__": None, 'True': True, 'False': False, 'None': None}
-                    return eval(expr, safe_globals, local_vars)
-                except Exception:
-                    return False
+        safe_eval = self._safe_eval
+        last_pump = time.monotonic()
+
+        def pump():
+            """Let Qt process events (timers, repaints, input) at most once per _PUMP_INTERVAL."""
+            nonlocal last_pump
+            now = time.monotonic()
+            if now - last_pump >= _PUMP_INTERVAL:
+                last_pump = now
+                QApplication.processEvents()
 
         def run_block(start_idx, end_idx, runtime_vars):
             """Execute items from start_idx to end_idx inclusive using runtime_vars for ${@var} replacements."""
-            nonlocal output
             # update watcher at the start of block
-            try:
-                self.update_watcher(runtime_vars)
-            except Exception:
-                pass
+            self._queue_watcher(runtime_vars)
             i = start_idx
             while i <= end_idx:
-                item = self.sequence_list.item(i)
-                step_data = item.data(Qt.ItemDataRole.UserRole)
+                step_data = self.sequence_list.step(i)
 
                 # Determine control or function
-                if isinstance(step_data, StepObject):
-                    if step_data.type == 'control':
-                        ctrl = step_data.control
-                    else:
-                        ctrl = None
-                else:
-                    ctrl = step_data.get('control') if isinstance(step_data, dict) else None
+                kind = step_data.kind
 
-                if ctrl == 'if':
+                if kind == _K_IF:
                     # find matching end
-                    match = self.find_matching_end(i)
-                    cond_raw = step_data.params.get('condition', '') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('condition', '')
+                    match = self._block_pairs.get(i, -1)
+                    cond_raw = step_data.params.get('condition', '')
                     cond_val = self.resolve_references(cond_raw, runtime_vars)
                     # evaluate boolean
                     cond_bool = cond_val if isinstance(cond_val, bool) else safe_eval(str(cond_val), runtime_vars)
-                    output += f"IF condition ({cond_raw}) -> {cond_bool}\n"
-                    self.output_text.setText(output)
+                    self._log(f"IF condition ({cond_raw}) -> {cond_bool}")
                     # update watcher after evaluating condition
-                    try:
-                        self.update_watcher(runtime_vars)
-                    except Exception:
-                        pass
-                    QApplication.processEvents()
+                    self._queue_watcher(runtime_vars)
+                    pump()
                     if cond_bool:
-                        # execute block inside
-                        if match != -1 and match > i:
-                            run_block(i+1, match-1, runtime_vars)
-                            i = match + 1
-                            continue
-                        else:
-                            i += 1
-                            continue
+                        # execute the block inside by just stepping into it; the matching 'end' is skipped over
+                        i += 1
+                        continue
                     else:
                         # skip to end
                         i = match + 1 if match != -1 else i + 1
                         continue
-                elif ctrl == 'for':
-                    match = self.find_matching_end(i)
-                    iterable_raw = step_data.params.get('iterable', '') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('iterable', '')
-                    varname = step_data.params.get('var', '_loop') if isinstance(step_data, StepObject) else self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get('var', '_loop')
+                elif kind == _K_FOR:
+                    match = self._block_pairs.get(i, -1)
+                    iterable_raw = step_data.params.get('iterable', '')
+                    varname = step_data.params.get('var', '_loop')
                     iterable_val = self.resolve_references(iterable_raw, runtime_vars)
                     # normalize iterable
-                    if isinstance(iterable_val, int):
-                        iterator = range(iterable_val)
-                    elif isinstance(iterable_val, (list, tuple)):
-                        iterator = iterable_val
-                    else:
-                        # try to eval as python expression
-                        try:
-                            iterator = list(safe_eval(str(iterable_val), runtime_vars))
-                        except Exception:
-                            iterator = []
+                    iterator = self._for_iterator(iterable_val, runtime_vars)
 
-                    output += f"FOR over {iterable_raw} -> {list(iterator)}\n"
-                    self.output_text.setText(output)
+                    self._log(f"FOR over {iterable_raw} (len={len(iterator)})")
                     # update watcher after preparing iterator
-                    try:
-                        self.update_watcher(runtime_vars)
-                    except Exception:
-                        pass
-                    QApplication.processEvents()
+                    self._queue_watcher(runtime_vars)
+                    pump()
                     if match != -1 and match > i:
-                        for val in iterator:
-                            new_vars = dict(runtime_vars)
-                            new_vars[varname] = val
-                            try:
-                                run_block(i+1, match-1, new_vars)
-                            except BreakLoop:
-                                # break out of the iterator loop and continue after the matching end
-                                break
+                        # loop variable is bound in place; see _run_block
+                        saved = runtime_vars.get(varname, _MISSING)
+                        try:
+                            for val in iterator:
+                                runtime_vars[varname] = val
+                                try:
+                                    run_block(i+1, match-1, runtime_vars)
+                                except BreakLoop:
+                                    # break out of the iterator loop and continue after the matching end
+                                    break
+                        finally:
+                            _restore_var(runtime_vars, varname, saved)
                         i = match + 1
                         continue
                     else:
                         i += 1
                         continue
-                elif ctrl == 'break':
+                elif kind == _K_BREAK:
                     # break encountered during full run: stop the innermost for loop
-                    output += "BREAK\n"
-                    self.output_text.setText(output)
-                    try:
-                        self.update_watcher(runtime_vars)
-                    except Exception:
-                        pass
-                    QApplication.processEvents()
+                    self._log("BREAK")
+                    self._queue_watcher(runtime_vars)
+                    pump()
                     # raise to inform caller to break the iterator
                     raise BreakLoop(actions=1, runtime_vars=runtime_vars)
-                elif ctrl == 'end':
+                elif kind == _K_END:
                     # should be handled by find_matching_end logic; just advance
                     i += 1
                     continue
 
                 # else, it's a function step
                 # prepare and call function
-                if isinstance(step_data, StepObject):
-                    if step_data.type == 'function':
-                        module_name = step_data.module
-                        func_name = step_data.function
-                        func = self.test_functions.get(module_name, {}).get(func_name)
-                    else:
-                        func = None
-                else:
-                    if isinstance(step_data, dict) and step_data.get('type') == 'function':
-                        module_name = step_data.get('module')
-                        func_name = step_data.get('function')
-                        func = self.test_functions.get(module_name, {}).get(func_name)
-                    else:
-                        func = None
+                module_name = step_data.module
+                func_name = step_data.function
+                func = self.test_functions.get(module_name, {}).get(func_name)
 
                 if func is None:
-                    output += f"跳过未知步骤或控制: {item.text()}\n"
-                    self.output_text.setText(output)
-                    try:
-                        self.update_watcher(runtime_vars)
-                    except Exception:
-                        pass
-                    QApplication.processEvents()
+                    self._log(f"跳过未知步骤或控制: {self.sequence_model.index(i).data()}")
+                    self._queue_watcher(runtime_vars)
+                    pump()
                     i += 1
                     continue
 
-                output += f"执行: {module_name}.{func_name}... "
-                self.output_text.setText(output)
-                QApplication.processEvents()
-
-                import inspect
-                sig = inspect.signature(func)
-                params = sig.parameters
-                args = {}
-
-                for param_name in params.keys():
-                    # get raw value string from step params or current widgets
-                    if isinstance(step_data, StepObject):
-                        raw = step_data.params.get(param_name, '')
-                    else:
-                        raw = self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {}).get(param_name, '')
-
-                    # resolve references
-                    resolved = self.resolve_references(raw, runtime_vars)
+                # header first, so conversion warnings from _build_args follow their own step
+                self._log(f"执行: {module_name}.{func_name}...")
 
-                    # type conversion
-                    param_type = params[param_name].annotation
-                    if param_type != inspect.Parameter.empty:
-                        try:
-                            if param_type == bool:
-                                value = bool(resolved) if isinstance(resolved, bool) else str(resolved).lower() in ('true', '1', 'yes', 'on')
-                            elif param_type in (int, float):
-                                value = param_type(resolved)
-                            else:
-                                value = resolved
-                        except Exception as e:
-                            output += f"参数 '{param_name}' 类型转换失败: {e}\n"
-                            self.output_text.setText(output)
-                            QApplication.processEvents()
-                            value = resolved
-                    else:
-                        value = resolved
-                    args[param_name] = value
+                # resolve references and convert types through the step's cached plan
+                args = self._build_args(step_data, func, runtime_vars)
 
                 try:
                     result = func(**args)
                     # store outputs
-                    if isinstance(step_data, StepObject):
-                        if isinstance(result, dict):
-                            step_data.outputs.update(result)
-                        else:
-                            step_data.outputs['return'] = result
-                            try:
-                                for pn, pv in args.items():
-                                    if pv == result:
-                                        step_data.outputs[pn] = result
-                                # also map any predicted return names (parsed from source) to the returned value
-                                preds = self.func_return_names.get(module_name, {}).get(func_name, [])
-                                for pred in preds:
-                                    if pred not in step_data.outputs:
-                                        step_data.outputs[pred] = result
-                            except Exception:
-                                pass
+                    self._store_outputs(step_data, args, result)
                     # determine success and set icon
-                    success = (result is None) or bool(result)
-                    output += f"{'成功' if success else '失败'}\n"
+                    success = _is_success(result)
+                    self._log(f"{'成功' if success else '失败'}")
                     try:
-                        self.set_item_status(item, success)
+                        self.set_item_status(i, success)
                     except Exception:
                         pass
                 except Exception as e:
-                    output += f"错误: {str(e)}\n"
+                    self._log(f"错误: {str(e)}")
                     try:
-                        self.set_item_status(item, False)
+                        self.set_item_status(i, False)
                     except Exception:
                         pass
 
-                self.output_text.setText(output)
                 # update watcher after executing a function step
-                try:
-                    self.update_watcher(runtime_vars)
-                except Exception:
-                    pass
-                QApplication.processEvents()
+                self._queue_watcher(runtime_vars)
+                pump()
                 i += 1
 
         try:
             run_block(0, self.sequence_list.count()-1, {})
-            output += "测试序列执行完成。\n"
-            self.output_text.setText(output)
+            self._log("测试序列执行完成。")
         except BreakLoop:
             # break outside of any for-block: ignore and finish run
-            output += "遇到 break（未在循环内），已忽略。\n"
-            self.output_text.setText(output)
+            self._log("遇到 break（未在循环内），已忽略。")
         except Exception as e:
-            output += f"执行过程中发生错误: {str(e)}\n"
-            self.output_text.setText(output)
+            self._log(f"执行过程中发生错误: {str(e)}")
+        # push the remaining queued lines and the final watcher state now
+        self._flush_pending_ui()
 
     def add_input_row(self, param_name, default_value="", read_only=False):
-        """添加一行参数输入，并输出调试信息"""
-        print(f"[DEBUG] 创建输入框: {param_name} = '{default_value}'")
-        row_layout = QHBoxLayout()
+        """添加一行参数输入
+
+        Rows come from a pool that grows on demand; clear_param_inputs only hides them,
+        so switching between steps reuses the existing label/edit/button widgets.
+        """
+        if self._param_rows_used < len(self._param_row_pool):
+            row, label, edit = self._param_row_pool[self._param_rows_used]
+        else:
+            row, label, edit = self._make_param_row()
+            self._param_row_pool.append((row, label, edit))
+        self._param_rows_used += 1
+
+        label.setText(f"{param_name}:")
+        # _on_param_editing_finished reads the parameter name back from the edit
+        edit.setProperty('param_name', param_name)
+        edit.setText(str(default_value))
+        edit.setReadOnly(read_only)
+        row.show()
+        self.current_param_widgets[param_name] = edit
+        return edit
+
+    def _make_param_row(self):
+        """Create one pooled parameter row: label, line edit and reference button."""
+        row = QWidget()
+        row_layout = QHBoxLayout(row)
         # remove spacing/margins so input rows sit flush together
         row_layout.setSpacing(0)
         row_layout.setContentsMargins(0, 0, 0, 0)
-        label = QLabel(f"{param_name}:")
+        label = QLabel()
         label.setFixedWidth(100)
-        edit = QLineEdit(str(default_value))
-        edit.setReadOnly(read_only)
+        edit = QLineEdit()
+        # values are committed when editing finishes (Enter / focus out), not on every keystroke;
+        # one bound slot serves every row
+        edit.editingFinished.connect(self._on_param_editing_finished)
         row_layout.addWidget(label)
         row_layout.addWidget(edit)
 
@@ -1353,113 +1805,131 @@ class MainWindow(QMainWindow):
         ref_btn.setToolTip("插入对前一步骤输出/参数的引用")
         ref_btn.setFixedWidth(48)
         row_layout.addWidget(ref_btn)
-        self.input_params_layout.addLayout(row_layout)
-        self.current_param_widgets[param_name] = edit
-        print(f"[DEBUG] QLineEdit.text() after set: '{edit.text()}'")
-        edit.repaint()
-        edit.update()
-        # build and show the menu when ref_btn is clicked
-        def show_ref_menu():
-            """Show a flat reference menu listing each available step/key with the step index
-            so duplicate functions are unambiguous.
-            """
+        # the row keeps its edit and button for its whole life, so this connection is made once
+        ref_btn.clicked.connect(lambda checked=False: self._show_ref_menu(edit, ref_btn))
+        self.input_params_layout.addWidget(row)
+        return (row, label, edit)
+
+    def _show_ref_menu(self, edit, ref_btn):
+        """Show a flat reference menu listing each available step/key with the step index
+        so duplicate functions are unambiguous.
+        """
+        cached = self._ref_menus.get(edit)
+        if cached is None:
+            # one QMenu per edit for the window's lifetime; stale menus are refilled in place
             menu = QMenu(self)
-            has_any = False
-            # gather steps and add actions directly so each action clearly shows the step index
-            for i in range(self.sequence_list.count()):
-                it = self.sequence_list.item(i)
-                data = it.data(Qt.ItemDataRole.UserRole)
-                if not isinstance(data, StepObject):
-                    continue
-                title = it.text()
-                # collect candidate keys: outputs (prefer) then params
-                keys = []
-                for k in data.outputs.keys():
-                    keys.append((k, 'out'))
-                for k in data.params.keys():
-                    if k not in data.outputs:
-                        keys.append((k, 'param'))
-                if data.type == 'function':
-                    preds = self.func_return_names.get(data.module, {}).get(data.function, [])
-                    for k in preds:
-                        if not any(k == ex for ex, _ in keys):
-                            keys.append((k, 'pred'))
-
-                if not keys:
-                    continue
-
-                for key, kind in keys:
-                    # label includes step index and function/control title to avoid ambiguity
-                    suffix = ''
-                    if kind == 'out' or kind == 'pred':
-                        suffix = ' (out)'
-                    action_text = f"#{i+1} {title} :: {key}{suffix}"
-                    act = menu.addAction(action_text)
-                    if kind == 'pred':
-                        act.setToolTip('预测输出（未运行）：运行后会填充真实值')
-                    def make_handler(step_index, k):
-                        return lambda checked=False: edit.insert(f"${{{'#'}{step_index}:{k}}}")
-                    act.triggered.connect(make_handler(i+1, key))
-                    has_any = True
-
-            if not has_any:
-                a = menu.addAction("无可用引用")
-                a.setEnabled(False)
-
-            menu.exec(ref_btn.mapToGlobal(ref_btn.rect().bottomLeft()))
+            # a single connection per menu; each action only carries its token as data
+            menu.triggered.connect(functools.partial(_insert_ref, edit))
+            self._fill_ref_menu(menu)
+            self._ref_menus[edit] = (self._ref_menu_version, menu)
+        else:
+            menu = cached[1]
+            if cached[0] != self._ref_menu_version:
+                menu.clear()
+                self._fill_ref_menu(menu)
+                self._ref_menus[edit] = (self._ref_menu_version, menu)
+
+        menu.exec(ref_btn.mapToGlobal(ref_btn.rect().bottomLeft()))
+
+    def _invalidate_ref_menus(self, *args):
+        """Mark every cached reference menu as stale; they are rebuilt when next opened."""
+        self._ref_menu_version += 1
+
+    def _fill_ref_menu(self, menu):
+        """Add the reference actions to an empty menu; each action carries its ${#N:key} token as data."""
+        has_any = False
+        # gather steps and add actions directly so each action clearly shows the step index
+        # walk the model's step list directly; the only per-row strings needed are built here
+        for i, data in enumerate(self.sequence_list.steps()):
+            title = data.display_text
+            keys = self._ref_keys(data)
+            if not keys:
+                continue
 
-        ref_btn.clicked.connect(show_ref_menu)
+            for key, kind in keys:
+                # label includes step index and function/control title to avoid ambiguity
+                suffix = ''
+                if kind == 'out' or kind == 'pred':
+                    suffix = ' (out)'
+                action_text = f"#{i+1} {title} :: {key}{suffix}"
+                act = menu.addAction(action_text)
+                if kind == 'pred':
+                    act.setToolTip('预测输出（未运行）：运行后会填充真实值')
+                act.setData(f"${{#{i+1}:{key}}}")
+                has_any = True
+
+        if not has_any:
+            a = menu.addAction("无可用引用")
+            a.setEnabled(False)
+
+    def _ref_keys(self, data):
+        """Return the reference-menu keys of a step as ((key, kind), ...), kind 'out'/'param'/'pred'.
+
+        Outputs come first, then params not already listed, then predicted return names.
+        The result is cached on the step; outputs/params changes reset data.ref_keys, and a
+        reload replaces func_return_names, which the cache entry is checked against.
+        """
+        cached = data.ref_keys
+        if cached is not None and cached[0] is self.func_return_names:
+            return cached[1]
+        keys = [(k, 'out') for k in data.outputs]
+        seen = set(data.outputs)
+        keys.extend((k, 'param') for k in data.params if k not in seen)
+        seen.update(data.params)
+        if data.type == 'function':
+            for k in self.func_return_names.get(data.module, {}).get(data.function, ()):
+                if k not in seen:
+                    seen.add(k)
+                    keys.append((k, 'pred'))
+        keys = tuple(keys)
+        data.ref_keys = (self.func_return_names, keys)
+        return keys
 
-        return edit
-        
     def clear_param_inputs(self):
-        """清除所有参数输入框"""
-        while self.input_params_layout.count():
-            child = self.input_params_layout.takeAt(0)
-            if child.layout():
-                while child.layout().count():
-                    widget = child.layout().takeAt(0).widget()
-                    if widget:
-                        widget.deleteLater()
+        """清除所有参数输入框（行控件隐藏后留在池中供下次复用）"""
+        # hide all rows with painting suspended so the panel repaints once, not once per row
+        parent = self.input_params_widget
+        parent.setUpdatesEnabled(False)
+        try:
+            for row, _label, _edit in self._param_row_pool[:self._param_rows_used]:
+                row.hide()
+        finally:
+            parent.setUpdatesEnabled(True)
+        self._param_rows_used = 0
         self.current_param_widgets.clear()  # 确保控件映射也被清除
         self.output_params_label.setText("-")
 
-    def save_current_params(self, item=None):
-        """保存指定 item（或当前项）的参数到缓存。
+    def save_current_params(self, step=None):
+        """保存指定步骤（或正在编辑的步骤）的参数到缓存。
 
         Args:
-            item (QListWidgetItem|None): 要保存的项；为 None 时使用当前项。
+            step (StepObject|None): 要保存的步骤；为 None 时使用正在编辑的步骤。
         """
-        current_item = item or self.sequence_list.currentItem()
-        if not current_item or not self.current_param_widgets:
+        data = step if step is not None else self._editing_step
+        if data is None or not self.current_param_widgets:
             return
 
-        # 获取item的唯一ID
-        item_id = current_item.data(Qt.ItemDataRole.UserRole + 1)
-        if not item_id:
+        # 把值保存到该步骤 StepObject 的 params（同时作废该步骤已缓存的参数计划）
+        for param_name, widget in self.current_param_widgets.items():
+            data.params[param_name] = widget.text()
+        self._step_arg_plans.pop(data.id, None)
+        data.ref_keys = None
+        self._ref_menu_version += 1
+
+    def _on_param_editing_finished(self):
+        """Commit the edited parameter to the step shown in the editor."""
+        edit = self.sender()
+        if edit is None or edit.isReadOnly():
             return
+        self.on_param_changed(self._editing_step, edit.property('param_name'), edit.text())
 
-        if item_id not in self.step_params_cache:
-            self.step_params_cache[item_id] = {}
-
-        # 如果 item 使用 StepObject，则把值保存到该对象的 params；否则回退到旧的 step_params_cache
-        data = current_item.data(Qt.ItemDataRole.UserRole)
-        if isinstance(data, StepObject):
-            for param_name, widget in self.current_param_widgets.items():
-                data.params[param_name] = widget.text()
-        else:
-            if item_id not in self.step_params_cache:
-                self.step_params_cache[item_id] = {}
-            for param_name, widget in self.current_param_widgets.items():
-                self.step_params_cache[item_id][param_name] = widget.text()
-
-    def on_param_changed(self, item, param_name, value):
-        """Callback when a parameter input changes — update the StepObject for the given item."""
-        if not item:
-            return
-        data = item.data(Qt.ItemDataRole.UserRole)
-        if isinstance(data, StepObject):
-            data.params[param_name] = value
+    def on_param_changed(self, step, param_name, value):
+        """Callback when a parameter input changes — update the given StepObject."""
+        if step is not None:
+            step.params[param_name] = value
+            self._step_arg_plans.pop(step.id, None)
+            step.ref_keys = None
+            self._ref_menu_version += 1
 
     def resolve_references(self, text, runtime_vars=None):
         """Resolve reference patterns in text.
@@ -1470,48 +1940,57 @@ class MainWindow(QMainWindow):
 
         If text isn't a string with references, return it unchanged.
         """
-        if runtime_vars is None:
-            runtime_vars = {}
-
         if not isinstance(text, str):
             return text
 
-        import re
+        # plain literals (the common case) skip the reference handling
+        if '${' not in text:
+            return _parse_literal(text)
 
-        def repl_step(m):
-            idx = int(m.group(1)) - 1
-            key = m.group(2)
-            if 0 <= idx < self.sequence_list.count():
-                item = self.sequence_list.item(idx)
-                data = item.data(Qt.ItemDataRole.UserRole)
-                # prefer outputs then params
-                if isinstance(data, StepObject):
-                    if key in data.outputs:
-                        return str(data.outputs.get(key))
-                    return str(data.params.get(key, ""))
-                else:
-                    cache = self.step_params_cache.get(item.data(Qt.ItemDataRole.UserRole + 1), {})
-                    return str(cache.get(key, ""))
-            return ""
-
-        def repl_var(m):
-            name = m.group(1)
-            return str(runtime_vars.get(name, ""))
-
-        # replace ${#N:key}
-        text2 = re.sub(r"\$\{#(\d+):([^}]+)\}", repl_step, text)
-        # replace ${@var}
-        text3 = re.sub(r"\$\{@([^}]+)\}", repl_var, text2)
+        if runtime_vars is None:
+            runtime_vars = {}
 
+        # the string is tokenized once; each call only looks the references up and joins.
+        # Steps are read from the model's Python list: no Qt calls inside the loop
+        steps = self.sequence_list.steps()
+        count = len(steps)
+        out = []
+        for part in _compile_template(text):
+            if type(part) is str:
+                out.append(part)
+            elif len(part) == 1:
+                # ${@var}
+                out.append(str(runtime_vars.get(part[0], "")))
+            else:
+                # ${#N:key}: prefer outputs then params
+                idx, key = part
+                if 0 <= idx < count:
+                    data = steps[idx]
+                    if key in data.outputs:
+                        out.append(str(data.outputs.get(key)))
+                    else:
+                        out.append(str(data.params.get(key, "")))
         # Try to interpret as literal (number, list) if possible
-        try:
-            import ast
-            val = ast.literal_eval(text3)
-            return val
-        except Exception:
-            pass
+        return _parse_literal("".join(out))
 
-        return text3
+    def _rebuild_block_pairs(self):
+        """Pair every 'if'/'for' row with its matching 'end' row in a single pass.
+
+        Rows without a matching 'end' are left out, so lookups fall back to -1.
+        """
+        pairs = {}
+        stack = []
+        for i, data in enumerate(self.sequence_list.steps()):
+            kind = data.kind
+            if kind == _K_IF or kind == _K_FOR:
+                stack.append(i)
+            elif kind == _K_END and stack:
+                pairs[stack.pop()] = i
+        self._block_pairs = pairs
+        # expressions, argument plans and watcher titles of the old layout are no longer valid
+        self._expr_code_cache.clear()
+        self._step_arg_plans.clear()
+        self._watcher_step_labels = None
 
     def find_matching_end(self, start_index):
         """Find the matching 'end' index for a control starting at start_index.
@@ -1519,26 +1998,11 @@ class MainWindow(QMainWindow):
         Accounts for nested controls.
         Returns index of the matching end, or -1 if not found.
         """
-        depth = 0
-        for i in range(start_index, self.sequence_list.count()):
-            item = self.sequence_list.item(i)
-            data = item.data(Qt.ItemDataRole.UserRole)
-            ctrl = None
-            if isinstance(data, StepObject) and data.type == "control":
-                ctrl = data.control
-            elif isinstance(data, dict) and data.get("type") == "control":
-                ctrl = data.get("control")
-
-            if ctrl in ("if", "for"):
-                depth += 1
-            elif ctrl == "end":
-                depth -= 1
-                if depth == 0:
-                    return i
-        return -1
+        return self._block_pairs.get(start_index, -1)
 
 def main():
     app = QApplication(sys.argv)
+    app.setStyleSheet(_APP_STYLE_SHEET)
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
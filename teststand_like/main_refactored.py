@@ -4,14 +4,13 @@
 import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QSplitter, QVBoxLayout, 
                              QWidget, QPushButton, QTextEdit, QHBoxLayout, QLabel)
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 
 # 导入UI组件
 from widgets import DraggableTreeWidget, DroppableListWidget, ParamEditor, WatcherWidget
 
 # 导入控制器
 from controllers import TestController
-from core import ConfigManager
 
 
 class MainWindow(QMainWindow):
@@ -20,7 +19,8 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.controller = TestController()
-        self.config_manager = ConfigManager()
+        # 与控制器共用同一个配置管理器，保证退出时写入的是同一份配置
+        self.config_manager = self.controller.config_manager
         self.init_ui()
         self.create_menu_bar()
         self.load_window_settings()
@@ -134,14 +134,10 @@ class MainWindow(QMainWindow):
         self.reset_button.clicked.connect(lambda: self.controller.reset_execution())
         self.clear_button.clicked.connect(lambda: self.controller.clear_sequence())
         
-        # === 连接序列列表选择变化信号到控制器 ===
-        self.sequence_list.itemSelectionChanged.connect(self.controller._on_item_selection_changed_wrapper)
-        
-        # === 定期更新监视器显示 ===
-        from PyQt6.QtCore import QTimer
+        # === 定期更新监视器显示（仅在数据有变化时刷新） ===
         self.watcher_timer = QTimer(self)
-        self.watcher_timer.timeout.connect(self.controller.update_watcher_display)
-        self.watcher_timer.start(1000)  # 每秒更新一次
+        self.watcher_timer.timeout.connect(self.controller.refresh_watcher_if_dirty)
+        self.watcher_timer.start(200)
         
         # 确保窗口有初始大小
         self.resize(1200, 700)
@@ -180,7 +176,7 @@ class MainWindow(QMainWindow):
             self.seq_watcher_splitter.sizes()
         )
         
-        # 保存配置
+        # 保存配置（同步写盘，同时包含控制器尚未落盘的修改）
         self.config_manager.save_config()
     
     def closeEvent(self, event):
@@ -195,7 +191,8 @@ class MainWindow(QMainWindow):
         # File 菜单
         file_menu = menu_bar.addMenu('File')
         load_action = file_menu.addAction('Load Test Functions')
-        load_action.triggered.connect(self.controller.load_test_functions)
+        # triggered信号会携带checked参数，不能直接作为directory传入
+        load_action.triggered.connect(lambda _checked=False: self.controller.load_test_functions())
         
         file_menu.addSeparator()
         save_sequence_action = file_menu.addAction('Save Sequence')
@@ -246,6 +243,7 @@ class MainWindow(QMainWindow):
 def main():
     """主函数"""
     app = QApplication(sys.argv)
+    app.setStyleSheet(ParamEditor.STYLE_SHEET)
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
@@ -10,13 +10,18 @@ Description: 这是默认设置,请设置`customMade`, 打开koroFileHeader查
 可拖拽的函数树控件
 """
 from PyQt6.QtWidgets import QTreeWidget, QTreeWidgetItem, QApplication
-from PyQt6.QtCore import Qt, QMimeData, QByteArray, QIODevice, QPoint
+from PyQt6.QtCore import Qt, QMimeData, QByteArray, QIODevice, QPoint, QDataStream
 from PyQt6.QtGui import QDrag
 import sys
 
 # 定义MIME类型
 MIME_TYPE = "application/x-test-item"
 
+# 拖拽数据流的打开模式（导入时取一次）
+_WRITE_ONLY = QIODevice.OpenModeFlag.WriteOnly
+# 拖拽记录中函数名与模块名的分隔符（需要与droppable_list.py中一致）
+DRAG_SEP = "\x1f"
+
 
 class DraggableTreeWidget(QTreeWidget):
     """可拖拽的函数列表树"""
@@ -48,18 +53,10 @@ class DraggableTreeWidget(QTreeWidget):
         if current_item and current_item.parent():  # 确保是函数而不是模块
             # 创建自定义数据格式
             item_data = QByteArray()
-            data_stream = QIODevice.WriteOnly if hasattr(QIODevice, 'WriteOnly') else QIODevice.OpenModeFlag.WriteOnly
-            
-            # 兼容不同PyQt6版本
-            try:
-                from PyQt6.QtCore import QDataStream
-                stream = QDataStream(item_data, QIODevice.OpenModeFlag.WriteOnly)
-            except:
-                from PyQt6.QtCore import QDataStream
-                stream = QDataStream(item_data, QIODevice.WriteOnly)
+            stream = QDataStream(item_data, _WRITE_ONLY)
             
-            stream.writeString(current_item.text(0).encode('utf-8'))
-            stream.writeString(current_item.parent().text(0).encode('utf-8'))
+            # 函数名和模块名打包成一条记录，只编码一次、写入一次
+            stream.writeBytes(f"{current_item.text(0)}{DRAG_SEP}{current_item.parent().text(0)}".encode('utf-8'))
             
             mime_data.setData(MIME_TYPE, item_data)
             drag.setMimeData(mime_data)
@@ -70,20 +67,28 @@ class DraggableTreeWidget(QTreeWidget):
         """从TestLoader填充树"""
         self.clear()
         
+        # 先构建脱离树的节点（构造时传入父项即完成挂接），最后一次性插入，只触发一次布局
+        top_items = []
+        
         # 添加测试模块和函数
-        for module_name in test_loader.get_all_modules():
+        for module_name, func_names in test_loader.iter_modules_and_functions():
             module_item = QTreeWidgetItem([module_name])
-            self.addTopLevelItem(module_item)
-            
-            for func_name in test_loader.get_module_functions(module_name):
-                func_item = QTreeWidgetItem([func_name])
-                module_item.addChild(func_item)
+            for func_name in func_names:
+                QTreeWidgetItem(module_item, [func_name])
+            top_items.append(module_item)
         
         # 添加流程控制分类
         control_item = QTreeWidgetItem(["流程控制"])
         for ctrl in ["if", "for", "end", "break"]:
-            child = QTreeWidgetItem([ctrl])
-            control_item.addChild(child)
-        self.addTopLevelItem(control_item)
+            QTreeWidgetItem(control_item, [ctrl])
+        top_items.append(control_item)
         
-        self.expandAll()
+        # 批量插入：期间暂停重绘和信号，结束后统一刷新一次
+        self.setUpdatesEnabled(False)
+        self.blockSignals(True)
+        try:
+            self.addTopLevelItems(top_items)
+            self.expandAll()
+        finally:
+            self.blockSignals(False)
+            self.setUpdatesEnabled(True)
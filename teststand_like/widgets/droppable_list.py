@@ -1,26 +1,171 @@
 """
 可接收拖拽的序列列表控件
 """
-from PyQt6.QtWidgets import QListWidget, QListWidgetItem, QAbstractItemView
-from PyQt6.QtCore import Qt, QMimeData, QByteArray, QIODevice, pyqtSignal
+from PyQt6.QtWidgets import QListView, QAbstractItemView
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QIODevice, pyqtSignal
 from PyQt6.QtCore import QDataStream
 from core.step_model import StepObject
 
 # 定义MIME类型（需要与draggable_tree.py中一致）
 MIME_TYPE = "application/x-test-item"
+# 拖拽记录中函数名与模块名的分隔符（需要与draggable_tree.py中一致）
+DRAG_SEP = "\x1f"
 
+# 数据角色（导入时取一次）
+_DISPLAY_ROLE = Qt.ItemDataRole.DisplayRole
+_DECORATION_ROLE = Qt.ItemDataRole.DecorationRole
+_USER_ROLE = Qt.ItemDataRole.UserRole
 
-class DroppableListWidget(QListWidget):
-    """可接收拖拽的测试序列列表"""
+
+class StepListModel(QAbstractListModel):
+    """测试序列的列表模型：每行一个步骤对象
+    
+    步骤、显示文本和状态图标分别保存在三个与行一一对应的Python列表中，
+    不为每行分配 QListWidgetItem；视图只在绘制时通过 data() 读取需要的行。
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._steps = []  # 步骤对象
+        self._texts = []  # 显示文本
+        self._icons = []  # 状态图标，None表示无图标
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._steps)
+    
+    def data(self, index, role=_DISPLAY_ROLE):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == _DISPLAY_ROLE:
+            return self._texts[row]
+        if role == _DECORATION_ROLE:
+            return self._icons[row]
+        if role == _USER_ROLE:
+            return self._steps[row]
+        return None
+    
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid():
+            return flags | Qt.ItemFlag.ItemIsDragEnabled
+        # 只能放置在行之间，不能放到某一行上
+        return flags | Qt.ItemFlag.ItemIsDropEnabled
+    
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction | Qt.DropAction.CopyAction
+    
+    def steps(self):
+        """按行顺序排列的步骤对象列表（内部列表本身，调用者不应修改）"""
+        return self._steps
+    
+    def insert_steps(self, steps, row=None):
+        """在row之前插入步骤（row为None时追加），只发出一次rowsInserted"""
+        if not steps:
+            return
+        if row is None:
+            row = len(self._steps)
+        self.beginInsertRows(QModelIndex(), row, row + len(steps) - 1)
+        self._steps[row:row] = steps
+        self._texts[row:row] = [step.display_label for step in steps]
+        self._icons[row:row] = [None] * len(steps)
+        self.endInsertRows()
+    
+    def remove_step(self, row):
+        """删除指定行"""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._steps[row]
+        del self._texts[row]
+        del self._icons[row]
+        self.endRemoveRows()
+    
+    def move_step(self, src, dst):
+        """把src行移动到当前dst行之前（dst等于行数时移到末尾）
+        
+        Returns:
+            bool: 是否发生了移动
+        """
+        if dst == src or dst == src + 1:
+            return False
+        if not self.beginMoveRows(QModelIndex(), src, src, QModelIndex(), dst):
+            return False
+        to = dst - 1 if dst > src else dst
+        for column in (self._steps, self._texts, self._icons):
+            column.insert(to, column.pop(src))
+        self.endMoveRows()
+        return True
+    
+    def clear(self):
+        """清空所有行"""
+        self.beginResetModel()
+        self._steps.clear()
+        self._texts.clear()
+        self._icons.clear()
+        self.endResetModel()
+    
+    def set_text(self, row, text):
+        """设置一行的显示文本（未变化时不发出信号）"""
+        if self._texts[row] == text:
+            return
+        self._texts[row] = text
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [_DISPLAY_ROLE])
+    
+    def set_texts(self, texts):
+        """一次设置所有行的显示文本（texts与行一一对应），只对有变化的行范围发出一次dataChanged"""
+        changed = [i for i, (old, new) in enumerate(zip(self._texts, texts)) if old != new]
+        if not changed:
+            return
+        self._texts = list(texts)
+        self.dataChanged.emit(self.index(changed[0]), self.index(changed[-1]), [_DISPLAY_ROLE])
+    
+    def set_icon(self, row, icon):
+        """设置一行的状态图标（图标对象未变化时跳过）"""
+        if self._icons[row] is icon:
+            return
+        self._icons[row] = icon
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [_DECORATION_ROLE])
+    
+    def clear_icons(self):
+        """清除所有状态图标"""
+        if not any(icon is not None for icon in self._icons):
+            return
+        self._icons = [None] * len(self._steps)
+        self.dataChanged.emit(self.index(0), self.index(len(self._steps) - 1), [_DECORATION_ROLE])
+
+
+class DroppableListWidget(QListView):
+    """可接收拖拽的测试序列列表（数据保存在 StepListModel 中）"""
     
     itemMoved = pyqtSignal()  # 当项被移动或添加时发出信号
+    currentStepChanged = pyqtSignal(int)  # 当前行改变，参数为行号（无当前行时为-1）
     
     def __init__(self):
         super().__init__()
+        self._model = StepListModel(self)
+        self.setModel(self._model)
         self.setAcceptDrops(True)
         self.setDragEnabled(True)
         self.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
         self.setDefaultDropAction(Qt.DropAction.MoveAction)
+        self.setDropIndicatorShown(True)
+        # 每行都是单行文本，所有行共用一个尺寸
+        self.setUniformItemSizes(True)
+        self.selectionModel().currentChanged.connect(self._on_current_changed)
+    
+    def _on_current_changed(self, current, previous):
+        """当前索引改变时发出 currentStepChanged"""
+        self.currentStepChanged.emit(current.row() if current.isValid() else -1)
+    
+    def count(self):
+        """步骤数"""
+        return len(self._model.steps())
+    
+    def current_row(self):
+        """当前行号，无当前行时为-1"""
+        index = self.currentIndex()
+        return index.row() if index.isValid() else -1
     
     def dragEnterEvent(self, event):
         """拖拽进入事件"""
@@ -38,77 +183,87 @@ class DroppableListWidget(QListWidget):
     
     def dropEvent(self, event):
         """放置事件"""
-        if event.mimeData().hasFormat(MIME_TYPE):
+        if event.source() is self:
+            # 内部拖拽排序：直接在模型中移动
+            src = self.current_row()
+            pos = event.position().toPoint()
+            target = self.indexAt(pos)
+            if target.isValid():
+                dst = target.row()
+                if pos.y() > self.visualRect(target).center().y():
+                    dst += 1
+            else:
+                dst = self.count()
+            if src >= 0:
+                self._model.move_step(src, dst)
+            # 行已经移动到位；若使用MoveAction，拖拽源会把该行删除
+            event.setDropAction(Qt.DropAction.CopyAction)
+            event.accept()
+            self.itemMoved.emit()
+        
+        elif event.mimeData().hasFormat(MIME_TYPE):
             item_data = event.mimeData().data(MIME_TYPE)
             
-            try:
-                data_stream = QDataStream(item_data, QIODevice.OpenModeFlag.ReadOnly)
-            except:
-                data_stream = QDataStream(item_data, QIODevice.ReadOnly)
-            
-            func_name = bytes(data_stream.readString()).decode('utf-8')
-            module_name = bytes(data_stream.readString()).decode('utf-8')
+            data_stream = QDataStream(item_data, QIODevice.OpenModeFlag.ReadOnly)
+            func_name, _, module_name = data_stream.readBytes().decode('utf-8').partition(DRAG_SEP)
             
             # 如果来自流程控制分类，创建控制步骤
             if module_name == "流程控制":
-                item = QListWidgetItem(func_name)
                 step = StepObject(type_="control", control=func_name)
             else:
-                item = QListWidgetItem(f"{module_name}.{func_name}")
                 step = StepObject(type_="function", module=module_name, function=func_name)
             
-            item.setData(Qt.ItemDataRole.UserRole, step)
-            item.setData(Qt.ItemDataRole.UserRole + 1, step.id)
-            self.addItem(item)
             event.acceptProposedAction()
-            self.itemMoved.emit()
+            self.add_steps_bulk([step])
         
         elif event.mimeData().hasText():
             text = event.mimeData().text()
             if text in ["if", "for", "end", "break"]:
-                item = QListWidgetItem(text)
-                step = StepObject(type_="control", control=text)
-                item.setData(Qt.ItemDataRole.UserRole, step)
-                item.setData(Qt.ItemDataRole.UserRole + 1, step.id)
-                self.addItem(item)
                 event.acceptProposedAction()
-                self.itemMoved.emit()
+                self.add_steps_bulk([StepObject(type_="control", control=text)])
         else:
             super().dropEvent(event)
             self.itemMoved.emit()
     
     def keyPressEvent(self, event):
         """键盘事件 - 支持Delete键删除选中项"""
-        if event.key() == Qt.Key.Key_Delete and self.currentItem():
-            row = self.currentRow()
-            item = self.takeItem(row)
-            del item
+        row = self.current_row()
+        if event.key() == Qt.Key.Key_Delete and row >= 0:
+            self._model.remove_step(row)
             self.itemMoved.emit()
         else:
             super().keyPressEvent(event)
     
+    def add_steps_bulk(self, steps):
+        """批量追加步骤
+        
+        模型一次插入全部行（只发出一次 rowsInserted），结束后只发出一次 itemMoved。
+        
+        Args:
+            steps: 要追加的步骤对象列表
+        """
+        if not steps:
+            return
+        self._model.insert_steps(steps)
+        self.itemMoved.emit()
+    
     def get_all_steps(self):
-        """获取所有步骤对象"""
-        steps = []
-        for i in range(self.count()):
-            item = self.item(i)
-            step = item.data(Qt.ItemDataRole.UserRole)
-            if isinstance(step, StepObject):
-                steps.append(step)
-        return steps
+        """获取所有步骤对象
+        
+        Returns:
+            list: 按行顺序排列的步骤对象列表（模型内部列表本身，调用者不应修改）
+        """
+        return self._model.steps()
     
     def clear_all_steps(self):
         """清空所有步骤"""
         # 先清除步骤对象的数据
-        for i in range(self.count()):
-            item = self.item(i)
-            step = item.data(Qt.ItemDataRole.UserRole)
-            if isinstance(step, StepObject):
-                step.params.clear()
-                step.outputs.clear()
+        for step in self._model.steps():
+            step.params.clear()
+            step.outputs.clear()
         
         # 清空列表
-        self.clear()
+        self._model.clear()
         self.itemMoved.emit()
     
     def update_item_display(self, index, text):
@@ -119,5 +274,26 @@ class DroppableListWidget(QListWidget):
             text: 新的显示文本
         """
         if 0 <= index < self.count():
-            item = self.item(index)
-            item.setText(text)
+            self._model.set_text(index, text)
+    
+    def set_all_displays(self, texts):
+        """一次更新所有项的显示文本
+        
+        Args:
+            texts: 与行一一对应的显示文本列表
+        """
+        self._model.set_texts(texts)
+    
+    def set_status_icon(self, index, icon):
+        """设置指定索引项的状态图标
+        
+        Args:
+            index: 项索引
+            icon: 图标，None表示清除
+        """
+        if 0 <= index < self.count():
+            self._model.set_icon(index, icon)
+    
+    def clear_status_icons(self):
+        """清除所有项的状态图标"""
+        self._model.clear_icons()
@@ -3,11 +3,58 @@
 """
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                             QLineEdit, QPushButton, QMenu)
-from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtCore import pyqtSignal, QTimer
 from core.step_model import StepObject
+from contextlib import contextmanager
+import functools
 import inspect
 
 
+@contextmanager
+def _batch_ui(widget):
+    """暂停控件重绘，退出时恢复并统一刷新一次
+    
+    可以嵌套使用：只有最外层负责恢复重绘。
+    """
+    if not widget.updatesEnabled():
+        yield
+        return
+    widget.setUpdatesEnabled(False)
+    try:
+        yield
+    finally:
+        widget.setUpdatesEnabled(True)
+        widget.update()
+
+
+@functools.lru_cache(maxsize=512)
+def _sig_info(func):
+    """获取测试函数的参数名和输出类型名（按函数对象缓存）
+    
+    重新加载模块后函数对象不同，缓存自然失效。
+    
+    Returns:
+        tuple: (参数名元组, 输出类型名)，无返回注解时输出类型名为None
+    """
+    sig = inspect.signature(func)
+    ret = sig.return_annotation
+    if ret is inspect.Signature.empty:
+        output_name = None
+    elif hasattr(ret, '__name__'):
+        output_name = ret.__name__
+    else:
+        output_name = str(ret)
+    return (tuple(sig.parameters.keys()), output_name)
+
+
+def _insert_ref(edit, action):
+    """引用菜单的处理函数（每个菜单只连接一次 QMenu.triggered）：
+    在输入框光标处插入动作数据中预先生成的 ${#N:key} 引用"""
+    token = action.data()
+    if token:
+        edit.insert(token)
+
+
 class ParamEditor(QWidget):
     """参数编辑器
     
@@ -16,6 +63,12 @@ class ParamEditor(QWidget):
     
     paramChanged = pyqtSignal(str, str)  # 参数名, 新值
     
+    # 连续输入时参数写回的合并间隔（毫秒）
+    COMMIT_DELAY_MS = 80
+    
+    # 应用级样式表中本控件使用的部分，由主程序在创建QApplication后设置一次
+    STYLE_SHEET = "QLabel#outputParams { background-color: #f0f0f0; padding: 5px; border: 1px solid #ccc; }"
+    
     def __init__(self):
         super().__init__()
         self.current_step = None
@@ -25,6 +78,22 @@ class ParamEditor(QWidget):
         
         self.param_widgets = {}  # 参数名 -> QLineEdit映射
         
+        # 参数行池：[(row_widget, label, edit, ref_btn), ...]，前 _rows_used 行正在使用
+        self._row_pool = []
+        self._rows_used = 0
+        
+        # 输入中尚未写回步骤的参数 {参数名: 值}，停止输入 COMMIT_DELAY_MS 后统一提交
+        self._pending = {}
+        self._commit_timer = QTimer(self)
+        self._commit_timer.setSingleShot(True)
+        self._commit_timer.setInterval(self.COMMIT_DELAY_MS)
+        self._commit_timer.timeout.connect(self.flush_pending_params)
+        
+        # 引用菜单条目 [(菜单文本, 引用文本, 是否预测输出), ...]，为None表示需要重建；
+        # 版本号在条目失效时递增，输入框上缓存的菜单据此判断是否需要重新填充
+        self._ref_index = None
+        self._ref_version = 0
+        
         self.init_ui()
     
     def init_ui(self):
@@ -32,7 +101,12 @@ class ParamEditor(QWidget):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
         
-        layout.addWidget(QLabel("<b>步骤设置</b>"))
+        # 纯文本标签加粗体字体，不需要解析富文本
+        title = QLabel("步骤设置")
+        font = title.font()
+        font.setBold(True)
+        title.setFont(font)
+        layout.addWidget(title)
         
         # 输入参数区
         layout.addWidget(QLabel("输入参数:"))
@@ -42,12 +116,15 @@ class ParamEditor(QWidget):
         self.input_params_layout.setContentsMargins(0, 0, 0, 0)
         layout.addWidget(self.input_params_widget)
         
+        # 预先创建常用数量的参数行，首次选择步骤时无需新建控件
+        for _ in range(8):
+            self._row_pool.append(self._make_param_row())
+        
         # 输出参数区
         layout.addWidget(QLabel("输出参数:"))
         self.output_params_label = QLabel("-")
-        self.output_params_label.setStyleSheet(
-            "QLabel { background-color: #f0f0f0; padding: 5px; border: 1px solid #ccc; }"
-        )
+        # 样式由应用级样式表 STYLE_SHEET 按对象名匹配
+        self.output_params_label.setObjectName("outputParams")
         layout.addWidget(self.output_params_label)
     
     def set_test_loader(self, loader):
@@ -55,8 +132,54 @@ class ParamEditor(QWidget):
         self.test_loader = loader
     
     def set_all_steps(self, steps):
-        """设置所有步骤的引用（用于引用功能）"""
+        """设置所有步骤的引用（用于引用功能）
+        
+        传入的仍是同一份步骤快照时不使引用条目失效。
+        """
+        if steps is self.all_steps:
+            return
         self.all_steps = steps
+        self.invalidate_references()
+    
+    def invalidate_references(self):
+        """使引用菜单条目失效（步骤、输出或加载的函数变化时调用），下次打开菜单时重建"""
+        self._ref_index = None
+        self._ref_version += 1
+    
+    def _ref_entries(self):
+        """获取引用菜单条目（带缓存）
+        
+        Returns:
+            list: [(菜单文本, 引用文本, 是否预测输出), ...]
+        """
+        if self._ref_index is not None:
+            return self._ref_index
+        
+        entries = []
+        get_return_names = self.test_loader.get_return_names if self.test_loader else None
+        for i, step in enumerate(self.all_steps):
+            if not isinstance(step, StepObject):
+                continue
+            
+            # 获取步骤标题
+            title = step.display_label
+            
+            # 收集键：优先输出，然后参数，最后是预测的返回值名称
+            outputs = step.outputs
+            keys = [(k, 'out') for k in outputs]
+            keys.extend((k, 'param') for k in step.params if k not in outputs)
+            if step.type == 'function' and get_return_names is not None:
+                seen = {k for k, _ in keys}
+                keys.extend((k, 'pred') for k in get_return_names(step.module, step.function)
+                            if k not in seen)
+            
+            for key, kind in keys:
+                suffix = ' (out)' if kind in ('out', 'pred') else ''
+                # 引用文本在建条目时生成一次，点击时直接插入
+                entries.append((f"#{i+1} {title} :: {key}{suffix}", f"${{#{i+1}:{key}}}", kind == 'pred'))
+        
+        self._ref_index = entries
+        return entries
     
     def load_step(self, step: StepObject, step_index: int):
         """加载步骤进行编辑
@@ -65,18 +188,23 @@ class ParamEditor(QWidget):
             step: 要编辑的步骤对象
             step_index: 步骤在序列中的索引
         """
+        # 上一个步骤中还未提交的输入先写回
+        self.flush_pending_params()
         self.current_step = step
         self.current_step_index = step_index
-        self.clear_params()
         
-        if not step:
-            self.output_params_label.setText("-")
-            return
-        
-        if step.type == 'function':
-            self._load_function_params(step)
-        elif step.type == 'control':
-            self._load_control_params(step)
+        # 清除旧行、填充新行期间暂停参数区重绘，结束后只刷新一次
+        with _batch_ui(self.input_params_widget):
+            self.clear_params()
+            
+            if not step:
+                self.output_params_label.setText("-")
+                return
+            
+            if step.type == 'function':
+                self._load_function_params(step)
+            elif step.type == 'control':
+                self._load_control_params(step)
     
     def _load_function_params(self, step: StepObject):
         """加载函数参数"""
@@ -104,9 +232,8 @@ class ParamEditor(QWidget):
             # 直接添加调试信息，确保函数信息正确显示
             self.add_param_row("function_debug", f"加载函数: {step.module}.{step.function}", read_only=True)
 
-            # 获取函数签名
-            sig = inspect.signature(func)
-            params = list(sig.parameters.keys())
+            # 获取函数签名（按函数对象缓存）
+            params, output_name = _sig_info(func)
             
             # 添加参数数量调试信息
             self.add_param_row("param_count", f"参数数量: {len(params)}", read_only=True)
@@ -116,32 +243,17 @@ class ParamEditor(QWidget):
                 # 清除之前的调试行，只保留实际参数行
                 self.clear_params()
                 
+                # 输入框的修改由行控件创建时连接的 _on_row_text_changed 写回参数
                 for param_name in params:
                     cached_value = step.params.get(param_name, "")
-                    # 确保创建的输入框能够正确显示
-                    edit = self.add_param_row(param_name, cached_value)
-                    # 确保输入框可见
-                    edit.setVisible(True)
-                    # 连接信号
-                    edit.textChanged.connect(
-                        lambda val, pn=param_name: self._on_param_changed(pn, val)
-                    )
-                
-                # 强制布局更新
-                self.input_params_widget.updateGeometry()
-                self.input_params_widget.show()
+                    self.add_param_row(param_name, cached_value)
             else:
                 # 没有参数时显示提示
                 self.add_param_row("提示", "该函数无输入参数", read_only=True)
 
             # 显示输出参数
             # 方法1: 使用函数返回注解
-            return_annotation = sig.return_annotation
-            if return_annotation != inspect.Signature.empty:
-                if hasattr(return_annotation, '__name__'):
-                    output_name = return_annotation.__name__
-                else:
-                    output_name = str(return_annotation)
+            if output_name is not None:
                 self.output_params_label.setText(output_name)
             else:
                 # 方法2: 尝试从test_loader获取预测的返回值名称
@@ -163,16 +275,13 @@ class ParamEditor(QWidget):
         """加载控制流参数"""
         if step.control == "if":
             cond = step.params.get("condition", "")
-            edit = self.add_param_row("condition", cond)
-            edit.textChanged.connect(lambda val: self._on_param_changed("condition", val))
+            self.add_param_row("condition", cond)
         
         elif step.control == "for":
             iterable = step.params.get("iterable", "")
             varname = step.params.get("var", "_loop")
-            edit1 = self.add_param_row("iterable", iterable)
-            edit2 = self.add_param_row("var", varname)
-            edit1.textChanged.connect(lambda val: self._on_param_changed("iterable", val))
-            edit2.textChanged.connect(lambda val: self._on_param_changed("var", val))
+            self.add_param_row("iterable", iterable)
+            self.add_param_row("var", varname)
         
         else:
             self.output_params_label.setText("-")
@@ -180,13 +289,45 @@ class ParamEditor(QWidget):
     def add_param_row(self, param_name: str, default_value: str = "", read_only: bool = False):
         """添加一行参数输入
         
+        行控件取自行池，池中不够时才新建；clear_params 只隐藏行，
+        切换步骤时复用已有的标签、输入框和按钮。
+        
         Args:
             param_name: 参数名
             default_value: 默认值
             read_only: 是否只读
         
         Returns:
-            QLineEdit: 创建的输入框
+            QLineEdit: 该行的输入框
+        """
+        if self._rows_used < len(self._row_pool):
+            row_widget, label, edit, ref_btn = self._row_pool[self._rows_used]
+        else:
+            row_widget, label, edit, ref_btn = self._make_param_row()
+            self._row_pool.append((row_widget, label, edit, ref_btn))
+        self._rows_used += 1
+        
+        label.setText(f"{param_name}:")
+        # _on_row_text_changed 从输入框读回参数名
+        edit.setProperty('param_name', param_name)
+        # 填入初始值时不触发参数修改
+        edit.blockSignals(True)
+        edit.setText(str(default_value))
+        edit.blockSignals(False)
+        edit.setReadOnly(read_only)
+        # 只有非只读项才显示引用按钮
+        ref_btn.setVisible(not read_only)
+        row_widget.show()
+        
+        # 保存输入框引用
+        self.param_widgets[param_name] = edit
+        return edit
+    
+    def _make_param_row(self):
+        """新建一行参数控件（标签、输入框、引用按钮）并加入参数布局
+        
+        Returns:
+            tuple: (row_widget, label, edit, ref_btn)
         """
         # 创建一个容器widget来容纳这一行的所有元素，确保整行能够正确显示
         row_widget = QWidget()
@@ -195,96 +336,76 @@ class ParamEditor(QWidget):
         row_layout.setContentsMargins(2, 2, 2, 2)  # 增加边距
         
         # 创建标签
-        label = QLabel(f"{param_name}:")
+        label = QLabel()
         label.setFixedWidth(100)
         label.setWordWrap(True)  # 允许标签文本换行
-        label.setVisible(True)  # 确保标签可见
         
         # 创建输入框
-        edit = QLineEdit(str(default_value))
-        edit.setReadOnly(read_only)
+        edit = QLineEdit()
         edit.setMinimumWidth(200)  # 设置最小宽度，确保有足够空间输入
-        edit.setVisible(True)  # 确保输入框可见
+        # 信号只连接一次，参数名在复用时通过属性更新
+        edit.textChanged.connect(functools.partial(self._on_row_text_changed, edit))
         
         # 将控件添加到布局
         row_layout.addWidget(label)
         row_layout.addWidget(edit, 1)  # 设置伸展系数，使输入框能够占据剩余空间
         
-        # 只有非只读项才添加引用按钮
-        if not read_only:
-            ref_btn = QPushButton("引用")
-            ref_btn.setToolTip("插入对前一步骤输出/参数的引用")
-            ref_btn.setFixedWidth(48)
-            ref_btn.clicked.connect(lambda: self._show_ref_menu(edit))
-            row_layout.addWidget(ref_btn)
-        
-        # 确保行widget可见
-        row_widget.setVisible(True)
+        ref_btn = QPushButton("引用")
+        ref_btn.setToolTip("插入对前一步骤输出/参数的引用")
+        ref_btn.setFixedWidth(48)
+        ref_btn.clicked.connect(functools.partial(self._on_ref_clicked, edit))
+        row_layout.addWidget(ref_btn)
         
+        row_widget.hide()
         # 将整行widget添加到参数布局中
         self.input_params_layout.addWidget(row_widget)
-        
-        # 保存输入框引用
-        self.param_widgets[param_name] = edit
-        
-        # 强制更新布局
-        self.input_params_widget.update()
-        self.input_params_widget.repaint()
-        
-        return edit
+        return (row_widget, label, edit, ref_btn)
+    
+    def _on_row_text_changed(self, edit, value):
+        """行输入框内容改变：暂存最新值并重新计时，只读行（提示、错误信息）不写回参数"""
+        if not edit.isReadOnly():
+            self._pending[edit.property('param_name')] = value
+            self._commit_timer.start()
+    
+    def flush_pending_params(self):
+        """立即把暂存的输入写回当前步骤（每个参数只提交最后一次的值）"""
+        self._commit_timer.stop()
+        if not self._pending:
+            return
+        pending = self._pending
+        self._pending = {}
+        for param_name, value in pending.items():
+            self._on_param_changed(param_name, value)
+    
+    def _on_ref_clicked(self, edit, checked=False):
+        """引用按钮点击"""
+        self._show_ref_menu(edit)
     
     def _show_ref_menu(self, target_edit: QLineEdit):
-        """显示引用菜单"""
-        menu = QMenu(self)
-        has_any = False
+        """显示引用菜单
         
-        # 遍历所有步骤，收集可引用的键
-        for i, step in enumerate(self.all_steps):
-            if not isinstance(step, StepObject):
-                continue
-            
-            # 获取步骤标题
-            if step.type == 'function':
-                title = f"{step.module}.{step.function}"
-            else:
-                title = step.control
-            
-            # 收集键：优先输出，然后参数
-            keys = []
-            for k in step.outputs.keys():
-                keys.append((k, 'out'))
-            for k in step.params.keys():
-                if k not in step.outputs:
-                    keys.append((k, 'param'))
-            
-            # 添加预测的返回值名称
-            if step.type == 'function' and self.test_loader:
-                preds = self.test_loader.get_return_names(step.module, step.function)
-                for k in preds:
-                    if not any(k == ex for ex, _ in keys):
-                        keys.append((k, 'pred'))
-            
-            if not keys:
-                continue
-            
-            for key, kind in keys:
-                suffix = ' (out)' if kind in ('out', 'pred') else ''
-                action_text = f"#{i+1} {title} :: {key}{suffix}"
-                act = menu.addAction(action_text)
-                
-                if kind == 'pred':
+        每个输入框只创建一次菜单（随输入框一起销毁）；引用条目没有变化时直接复用已建好的动作，
+        变化后才清空并重新填充。
+        """
+        menu = getattr(target_edit, '_ref_menu', None)
+        if menu is None:
+            menu = QMenu(target_edit)
+            # 每个菜单只连接一次，动作只携带各自的引用文本
+            menu.triggered.connect(functools.partial(_insert_ref, target_edit))
+            target_edit._ref_menu = menu
+            target_edit._ref_menu_version = None
+        if target_edit._ref_menu_version != self._ref_version:
+            menu.clear()
+            entries = self._ref_entries()
+            for text, token, predicted in entries:
+                act = menu.addAction(text)
+                if predicted:
                     act.setToolTip('预测输出（未运行）：运行后会填充真实值')
-                
-                # 创建闭包以捕获正确的值
-                def make_handler(step_index, k):
-                    return lambda: target_edit.insert(f"${{{'#'}{step_index}:{k}}}")
-                
-                act.triggered.connect(make_handler(i+1, key))
-                has_any = True
-        
-        if not has_any:
-            a = menu.addAction("无可用引用")
-            a.setEnabled(False)
+                act.setData(token)
+            if not entries:
+                a = menu.addAction("无可用引用")
+                a.setEnabled(False)
+            target_edit._ref_menu_version = self._ref_version
         
         menu.exec(ref_btn.mapToGlobal(ref_btn.rect().bottomLeft()) 
                  if hasattr(self, 'ref_btn') else self.mapToGlobal(self.rect().center()))
@@ -292,37 +413,25 @@ class ParamEditor(QWidget):
     def _on_param_changed(self, param_name: str, value: str):
         """参数值改变"""
         if self.current_step:
+            if param_name not in self.current_step.params:
+                # 新增的参数会成为可引用的键
+                self.invalidate_references()
             self.current_step.params[param_name] = value
             self.paramChanged.emit(param_name, value)
     
     def clear_params(self):
-        """清除所有参数输入框"""
-        # 遍历并移除所有子部件
-        while self.input_params_layout.count() > 0:
-            item = self.input_params_layout.takeAt(0)
-            widget = item.widget()
-            
-            if widget:
-                # 如果是widget，直接删除
-                widget.deleteLater()
-            elif item.layout():
-                # 如果是layout，删除其中的所有widget
-                layout = item.layout()
-                while layout.count() > 0:
-                    sub_item = layout.takeAt(0)
-                    sub_widget = sub_item.widget()
-                    if sub_widget:
-                        sub_widget.deleteLater()
-                # 删除layout本身
-                layout.deleteLater()
+        """清除所有参数输入框
         
-        # 清空参数映射
-        self.param_widgets.clear()
-        
-        # 重置输出参数标签
-        self.output_params_label.setText("-")
-        
-        # 强制更新布局
-        self.input_params_widget.update()
-        self.input_params_widget.repaint()
-        self.updateGeometry()
+        行控件只隐藏并留在行池中供下次复用；隐藏期间暂停参数区的重绘，
+        恢复重绘时只刷新一次。
+        """
+        with _batch_ui(self.input_params_widget):
+            for row_widget, _label, _edit, _ref_btn in self._row_pool[:self._rows_used]:
+                row_widget.hide()
+            self._rows_used = 0
+            
+            # 清空参数映射
+            self.param_widgets.clear()
+            
+            # 重置输出参数标签
+            self.output_params_label.setText("-")
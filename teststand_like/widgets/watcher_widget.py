@@ -13,6 +13,43 @@ from PyQt6.QtWidgets import QTreeWidget, QTreeWidgetItem
 from core.step_model import StepObject
 
 
+# 初始提示信息的树结构
+_INITIAL_INFO = [("使用说明", [
+    ("1. 添加测试步骤到序列", []),
+    ("2. 运行测试查看变量状态", []),
+    ("3. 监视输入参数和输出结果", []),
+])]
+
+
+def _build_tree_item(text, children, parent=None):
+    """按 (text, children) 结构创建树节点及其子树（给定parent时直接挂接）"""
+    item = QTreeWidgetItem([text]) if parent is None else QTreeWidgetItem(parent, [text])
+    for child_text, grandchildren in children:
+        _build_tree_item(child_text, grandchildren, item)
+    return item
+
+
+def _sync_tree_items(parent, spec):
+    """使parent的子节点与spec（(text, children) 列表）一致，只改动有差异的部分
+    
+    已有节点按位置对应：文本变化时才调用setText，多余的节点移除，
+    缺少的节点先脱离树构建好再一次性加入。
+    """
+    count = parent.childCount()
+    n = len(spec)
+    for idx in range(min(count, n)):
+        text, children = spec[idx]
+        item = parent.child(idx)
+        if item.text(0) != text:
+            item.setText(0, text)
+        if children or item.childCount():
+            _sync_tree_items(item, children)
+    for idx in range(count - 1, n - 1, -1):
+        parent.takeChild(idx)
+    if n > count:
+        parent.addChildren([_build_tree_item(text, children) for text, children in spec[count:]])
+
+
 class WatcherWidget(QTreeWidget):
     """变量监视器
     
@@ -23,107 +60,110 @@ class WatcherWidget(QTreeWidget):
         super().__init__()
         self.setHeaderLabel("变量")
         self.all_steps = []
+        # 上次显示时的数据版本号和运行时变量快照
+        self._last_version = None
+        self._last_runtime = None
         # 添加初始提示信息，让用户知道监视器的功能
         self._show_initial_info()
     
     def _show_initial_info(self):
         """显示初始信息"""
-        info_node = QTreeWidgetItem(["使用说明"])
-        info_node.addChild(QTreeWidgetItem(["1. 添加测试步骤到序列"]))
-        info_node.addChild(QTreeWidgetItem(["2. 运行测试查看变量状态"]))
-        info_node.addChild(QTreeWidgetItem(["3. 监视输入参数和输出结果"]))
-        self.addTopLevelItem(info_node)
+        _sync_tree_items(self.invisibleRootItem(), _INITIAL_INFO)
         self.expandAll()
     
     def set_all_steps(self, steps):
         """设置所有步骤的引用"""
         self.all_steps = steps
+        self._last_version = None
         
-    def update_watcher(self, runtime_vars=None):
+    def update_watcher(self, runtime_vars=None, version=None):
         """更新监视器显示
+        
+        先按步骤生成完整的树结构，再与现有节点逐个比较，只修改文本有变化的节点，
+        不再每次清空后重建全部节点。
             
         Args:
             runtime_vars: 运行时变量字典（如循环变量）
+            version: 调用方的数据版本号；与上次相同且运行时变量未变时直接返回，为None时总是刷新
         """
-        if runtime_vars is None:
-            runtime_vars = {}
-            
-        self.clear()
+        runtime = dict(runtime_vars) if runtime_vars else {}
+        if version is not None and version == self._last_version:
+            try:
+                unchanged = bool(runtime == self._last_runtime)
+            except Exception:
+                # 无法比较的变量值按已变化处理
+                unchanged = False
+            if unchanged:
+                return
+        self._last_version = version
+        self._last_runtime = runtime
+        
+        spec = []
             
         # 显示按序列步骤组织的变量
         for i, step in enumerate(self.all_steps):
             if not isinstance(step, StepObject):
                 continue
                 
+            # 每个步骤的属性只读取一次
+            step_type = step.type
+            control = step.control
+            params = step.params
+            
             # 获取步骤标题
-            if step.type == 'function':
+            if step_type == 'function':
                 title = f"{step.module}.{step.function}" if step.module and step.function else "未知函数"
             else:
-                title = step.control if step.control else "未知控制"
+                title = control if control else "未知控制"
                 
-            # 创建步骤节点
-            step_node = QTreeWidgetItem([f"步骤 {i+1}: {title}"])
-                
-            if step.type == 'function':
+            children = []
+            if step_type == 'function':
                 # 函数步骤显示输入参数和输出结果
-                if step.params:
-                    inputs_node = QTreeWidgetItem(["输入参数"])
-                    for k, v in step.params.items():
-                        inputs_node.addChild(QTreeWidgetItem([f"{k}: {v}"]))
-                    step_node.addChild(inputs_node)
+                if params:
+                    children.append(("输入参数", [(f"{k}: {v}", []) for k, v in params.items()]))
                 else:
-                    inputs_node = QTreeWidgetItem(["输入参数"])
-                    inputs_node.addChild(QTreeWidgetItem(["无参数"]))
-                    step_node.addChild(inputs_node)
-                    
-                if step.outputs:
-                    outputs_node = QTreeWidgetItem(["输出结果"])
-                    for k, v in step.outputs.items():
-                        outputs_node.addChild(QTreeWidgetItem([f"{k}: {v}"]))
-                    step_node.addChild(outputs_node)
+                    children.append(("输入参数", [("无参数", [])]))
+                
+                outputs = step.outputs
+                if outputs:
+                    children.append(("输出结果", [(f"{k}: {v}", []) for k, v in outputs.items()]))
                 else:
-                    outputs_node = QTreeWidgetItem(["输出结果"])
-                    outputs_node.addChild(QTreeWidgetItem(["无输出"]))
-                    step_node.addChild(outputs_node)
+                    children.append(("输出结果", [("无输出", [])]))
                 
-            elif step.type == 'control':
+            elif step_type == 'control':
                 # 控制步骤显示特定参数
-                if step.control == 'if':
-                    ctrl_node = QTreeWidgetItem(["条件"])
-                    condition = step.params.get('condition', '')
-                    ctrl_node.addChild(QTreeWidgetItem([f"表达式: {condition}"]))
-                    step_node.addChild(ctrl_node)
+                if control == 'if':
+                    condition = params.get('condition', '')
+                    children.append(("条件", [(f"表达式: {condition}", [])]))
                     
-                elif step.control == 'for':
-                    ctrl_node = QTreeWidgetItem(["循环"])
-                    iterable = step.params.get('iterable', '')
-                    varname = step.params.get('var', '_loop')
-                    ctrl_node.addChild(QTreeWidgetItem([f"迭代对象: {iterable}"]))
-                    ctrl_node.addChild(QTreeWidgetItem([f"循环变量: {varname}"]))
-                    step_node.addChild(ctrl_node)
+                elif control == 'for':
+                    iterable = params.get('iterable', '')
+                    varname = params.get('var', '_loop')
+                    children.append(("循环", [(f"迭代对象: {iterable}", []),
+                                             (f"循环变量: {varname}", [])]))
                     
-                elif step.control in ['end', 'break']:
-                    ctrl_node = QTreeWidgetItem(["控制语句"])
-                    ctrl_node.addChild(QTreeWidgetItem([f"类型: {step.control}"]))
-                    step_node.addChild(ctrl_node)
+                elif control in ('end', 'break'):
+                    children.append(("控制语句", [(f"类型: {control}", [])]))
                 
-            self.addTopLevelItem(step_node)
+            spec.append((f"步骤 {i+1}: {title}", children))
             
         # 运行时变量（如循环变量）
         if runtime_vars:
-            runtime_node = QTreeWidgetItem(["运行时变量"])
-            for k, v in runtime_vars.items():
-                runtime_node.addChild(QTreeWidgetItem([f"{k}: {v}"]))
-            self.addTopLevelItem(runtime_node)
+            spec.append(("运行时变量", [(f"{k}: {v}", []) for k, v in runtime_vars.items()]))
+        elif self.all_steps:
+            # 如果没有运行时变量，添加提示信息（只有在有步骤时才显示此提示）
+            spec.append(("运行时变量", [("暂无运行时变量", [])]))
         else:
-            # 如果没有运行时变量，添加提示信息
-            if self.all_steps:  # 只有在有步骤时才显示此提示
-                runtime_node = QTreeWidgetItem(["运行时变量"])
-                runtime_node.addChild(QTreeWidgetItem(["暂无运行时变量"]))
-                self.addTopLevelItem(runtime_node)
-            else:
-                # 没有步骤时显示初始信息
-                self._show_initial_info()
-            
-        # 展开所有节点
-        self.expandAll()
\ No newline at end of file
+            # 没有步骤时显示初始信息
+            spec.extend(_INITIAL_INFO)
+        
+        # 按差异更新：期间暂停重绘和信号，结束后统一刷新一次
+        self.setUpdatesEnabled(False)
+        self.blockSignals(True)
+        try:
+            _sync_tree_items(self.invisibleRootItem(), spec)
+            # 展开所有节点
+            self.expandAll()
+        finally:
+            self.blockSignals(False)
+            self.setUpdatesEnabled(True)